@@ -0,0 +1,54 @@
+"""add search next_run_at and watermarks
+
+Revision ID: e61c1f89ccf6
+Revises:
+Create Date: 2026-10-16 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e61c1f89ccf6'
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _columns(table: str) -> set:
+    return {column["name"] for column in sa.inspect(op.get_bind()).get_columns(table)}
+
+
+def _indexes(table: str) -> set:
+    return {index["name"] for index in sa.inspect(op.get_bind()).get_indexes(table)}
+
+
+def upgrade() -> None:
+    if not sa.inspect(op.get_bind()).has_table('searches'):
+        # Fresh database: init_db() creates the full schema on startup
+        return
+
+    # Databases created with init_db() may already have the new columns
+    columns = _columns('searches')
+    if 'watermarks' not in columns:
+        op.add_column('searches', sa.Column('watermarks', sa.JSON(), nullable=True))
+    if 'next_run_at' not in columns:
+        op.add_column(
+            'searches',
+            sa.Column('next_run_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True)
+        )
+
+    # Existing searches become due on the scheduler's next pass
+    op.execute("UPDATE searches SET next_run_at = CURRENT_TIMESTAMP WHERE next_run_at IS NULL")
+
+    if 'idx_status_next_run' not in _indexes('searches'):
+        op.create_index('idx_status_next_run', 'searches', ['status', 'next_run_at'])
+
+
+def downgrade() -> None:
+    op.drop_index('idx_status_next_run', table_name='searches')
+    op.drop_column('searches', 'next_run_at')
+    op.drop_column('searches', 'watermarks')
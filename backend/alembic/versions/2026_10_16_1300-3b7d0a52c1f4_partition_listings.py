@@ -0,0 +1,192 @@
+"""partition listings by week (optional, PostgreSQL)
+
+Converts `listings` into a table partitioned by LIST (is_saved) and, for
+unsaved listings, by weekly RANGE (created_at); (marketplace, external_id)
+uniqueness moves to `listing_keys`. Only runs on PostgreSQL with
+LISTINGS_PARTITIONED=true, and rewrites the whole table: run it in a
+maintenance window.
+
+A partitioned table has no unique key on id alone, so foreign keys from
+other tables to listings (search_listings on a database created by
+init_db()) are dropped; partition drops delete those rows instead.
+
+Revision ID: 3b7d0a52c1f4
+Revises: e61c1f89ccf6
+Create Date: 2026-10-16 13:00:00.000000
+
+"""
+from datetime import datetime, timedelta
+from typing import List, Sequence, Tuple, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.config import settings
+from app.core.partitions import (
+    RECENT_PARTITION,
+    SAVED_PARTITION,
+    create_partition_sql,
+    week_start,
+)
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3b7d0a52c1f4'
+down_revision: Union[str, None] = 'e61c1f89ccf6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+COLUMNS = (
+    "id, search_id, external_id, marketplace, title, description, price, currency, location, url, "
+    "image_urls, seller_name, seller_rating, is_featured, is_saved, metadata, posted_at, scraped_at, "
+    "created_at"
+)
+
+INDEXES = (
+    "CREATE INDEX ix_listings_id ON listings (id)",
+    "CREATE INDEX ix_listings_marketplace ON listings (marketplace)",
+    "CREATE INDEX ix_listings_price ON listings (price)",
+    "CREATE INDEX ix_listings_is_saved ON listings (is_saved)",
+    "CREATE INDEX idx_search_marketplace ON listings (search_id, marketplace)",
+    "CREATE INDEX idx_marketplace_external ON listings (marketplace, external_id)",
+    "CREATE INDEX idx_price ON listings (price)",
+    "CREATE INDEX idx_posted_at ON listings (posted_at)",
+)
+
+# Only present on databases created by init_db() with full-text search
+SEARCH_VECTOR_INDEX = "CREATE INDEX idx_listings_search_vector ON listings USING GIN (search_vector)"
+
+
+def _is_partitioned() -> bool:
+    return bool(op.get_bind().execute(sa.text(
+        "SELECT 1 FROM pg_partitioned_table pt JOIN pg_class c ON c.oid = pt.partrelid "
+        "WHERE c.relname = 'listings'"
+    )).scalar())
+
+
+def _foreign_keys(column: str) -> List[Tuple[str, str, str]]:
+    """(table, name, definition) of foreign keys from (conrelid) or to (confrelid) listings"""
+    return [tuple(row) for row in op.get_bind().execute(sa.text(
+        "SELECT conrelid::regclass::text, conname, pg_get_constraintdef(oid) FROM pg_constraint "
+        f"WHERE contype = 'f' AND {column} = 'listings'::regclass"
+    ))]
+
+
+def _has_search_vector() -> bool:
+    columns = sa.inspect(op.get_bind()).get_columns('listings')
+    return any(column["name"] == "search_vector" for column in columns)
+
+
+def _enabled() -> bool:
+    bind = op.get_bind()
+    return (
+        settings.LISTINGS_PARTITIONED
+        and bind.dialect.name == "postgresql"
+        and sa.inspect(bind).has_table('listings')
+    )
+
+
+def upgrade() -> None:
+    if not _enabled() or _is_partitioned():
+        return
+
+    bind = op.get_bind()
+    oldest = bind.execute(sa.text("SELECT min(created_at) FROM listings")).scalar() or datetime.utcnow()
+    today = datetime.utcnow().date()
+
+    # Kept as they are (e.g. ON DELETE SET NULL once search_listings exists)
+    own_foreign_keys = _foreign_keys("conrelid")
+    search_vector = _has_search_vector()
+
+    op.execute("UPDATE listings SET is_saved = false WHERE is_saved IS NULL")
+    op.execute("UPDATE listings SET created_at = now() WHERE created_at IS NULL")
+
+    # Nothing can reference the partitioned table's id alone
+    for table, name, _ in _foreign_keys("confrelid"):
+        op.execute(f"ALTER TABLE {table} DROP CONSTRAINT {name}")
+
+    # New parent; the partition key has to be part of the primary key
+    op.execute(
+        "CREATE TABLE listings_partitioned (LIKE listings INCLUDING DEFAULTS INCLUDING GENERATED) "
+        "PARTITION BY LIST (is_saved)"
+    )
+    op.execute("ALTER TABLE listings_partitioned ALTER COLUMN is_saved SET NOT NULL")
+    op.execute("ALTER TABLE listings_partitioned ALTER COLUMN is_saved SET DEFAULT false")
+    op.execute("ALTER TABLE listings_partitioned ALTER COLUMN created_at SET NOT NULL")
+    op.execute(
+        "ALTER TABLE listings_partitioned ADD CONSTRAINT listings_partitioned_pkey "
+        "PRIMARY KEY (id, is_saved, created_at)"
+    )
+    op.execute(f"CREATE TABLE {SAVED_PARTITION} PARTITION OF listings_partitioned FOR VALUES IN (true)")
+    op.execute(
+        f"CREATE TABLE {RECENT_PARTITION} PARTITION OF listings_partitioned "
+        f"FOR VALUES IN (false) PARTITION BY RANGE (created_at)"
+    )
+    start = week_start(oldest.date())
+    while start <= today + timedelta(weeks=settings.LISTINGS_PARTITION_WEEKS_AHEAD):
+        op.execute(create_partition_sql(start))
+        start += timedelta(weeks=1)
+
+    # Uniqueness of (marketplace, external_id) across all partitions
+    op.execute(
+        "CREATE TABLE listing_keys ("
+        "marketplace marketplace NOT NULL, "
+        "external_id VARCHAR(255) NOT NULL, "
+        "created_at TIMESTAMP WITH TIME ZONE DEFAULT now(), "
+        "PRIMARY KEY (marketplace, external_id))"
+    )
+    op.execute(
+        "INSERT INTO listing_keys (marketplace, external_id, created_at) "
+        "SELECT marketplace, external_id, created_at FROM listings"
+    )
+    op.execute(f"INSERT INTO listings_partitioned ({COLUMNS}) SELECT {COLUMNS} FROM listings")
+
+    # Swap tables, keeping the ID sequence
+    op.execute("ALTER SEQUENCE listings_id_seq OWNED BY NONE")
+    op.execute("DROP TABLE listings")
+    op.execute("ALTER TABLE listings_partitioned RENAME TO listings")
+    op.execute("ALTER TABLE listings RENAME CONSTRAINT listings_partitioned_pkey TO listings_pkey")
+    op.execute("ALTER SEQUENCE listings_id_seq OWNED BY listings.id")
+    for _, name, definition in own_foreign_keys:
+        op.execute(f"ALTER TABLE listings ADD CONSTRAINT {name} {definition}")
+    for statement in INDEXES:
+        op.execute(statement)
+    if search_vector:
+        op.execute(SEARCH_VECTOR_INDEX)
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != "postgresql" or not _is_partitioned():
+        return
+
+    own_foreign_keys = _foreign_keys("conrelid")
+    search_vector = _has_search_vector()
+
+    op.execute("CREATE TABLE listings_plain (LIKE listings INCLUDING DEFAULTS INCLUDING GENERATED)")
+    op.execute(f"INSERT INTO listings_plain ({COLUMNS}) SELECT {COLUMNS} FROM listings")
+    op.execute("ALTER SEQUENCE listings_id_seq OWNED BY NONE")
+    op.execute("DROP TABLE listings CASCADE")
+    op.execute("DROP TABLE listing_keys")
+    op.execute("ALTER TABLE listings_plain RENAME TO listings")
+    op.execute("ALTER SEQUENCE listings_id_seq OWNED BY listings.id")
+    op.execute("ALTER TABLE listings ALTER COLUMN is_saved DROP NOT NULL")
+    op.execute("ALTER TABLE listings ALTER COLUMN created_at DROP NOT NULL")
+    op.execute("ALTER TABLE listings ADD PRIMARY KEY (id)")
+    op.execute(
+        "ALTER TABLE listings ADD CONSTRAINT uq_marketplace_external_id UNIQUE (marketplace, external_id)"
+    )
+    for _, name, definition in own_foreign_keys:
+        op.execute(f"ALTER TABLE listings ADD CONSTRAINT {name} {definition}")
+    for statement in INDEXES:
+        op.execute(statement)
+    if search_vector:
+        op.execute(SEARCH_VECTOR_INDEX)
+    if sa.inspect(op.get_bind()).has_table('search_listings'):
+        # Without the foreign key nothing removed links to deleted listings
+        op.execute(
+            "DELETE FROM search_listings s WHERE NOT EXISTS (SELECT 1 FROM listings l WHERE l.id = s.listing_id)"
+        )
+        op.execute(
+            "ALTER TABLE search_listings ADD CONSTRAINT search_listings_listing_id_fkey "
+            "FOREIGN KEY (listing_id) REFERENCES listings (id) ON DELETE CASCADE"
+        )
@@ -0,0 +1,49 @@
+"""add hourly task log rollups
+
+Revision ID: 8c2e4f6a9d13
+Revises: 3b7d0a52c1f4
+Create Date: 2026-10-16 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8c2e4f6a9d13'
+down_revision: Union[str, None] = '3b7d0a52c1f4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table('task_logs'):
+        # Fresh database: init_db() creates the full schema on startup
+        return
+    if inspector.has_table('task_log_rollups'):
+        return
+
+    op.create_table(
+        'task_log_rollups',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('hour', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('task_name', sa.String(255), nullable=False),
+        sa.Column('marketplace', sa.String(50), nullable=False),
+        sa.Column('runs', sa.Integer(), nullable=True),
+        sa.Column('failures', sa.Integer(), nullable=True),
+        sa.Column('listings_found', sa.Integer(), nullable=True),
+        sa.Column('duration_p50', sa.Float(), nullable=True),
+        sa.Column('duration_p95', sa.Float(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.UniqueConstraint('hour', 'task_name', 'marketplace', name='uq_rollup_hour_task_marketplace'),
+    )
+    op.create_index('ix_task_log_rollups_id', 'task_log_rollups', ['id'])
+    op.create_index('idx_rollup_marketplace_hour', 'task_log_rollups', ['marketplace', 'hour'])
+
+
+def downgrade() -> None:
+    if sa.inspect(op.get_bind()).has_table('task_log_rollups'):
+        op.drop_table('task_log_rollups')
@@ -0,0 +1,93 @@
+"""link searches and listings many-to-many
+
+Listings are stored once however many searches match them; which search
+matched which listing moves to `search_listings`, seeded from
+listings.search_id. listings.search_id stays as the search that found the
+listing first and no longer deletes it along with that search.
+
+Revision ID: 5f1a7c3e2b94
+Revises: 8c2e4f6a9d13
+Create Date: 2026-10-16 15:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5f1a7c3e2b94'
+down_revision: Union[str, None] = '8c2e4f6a9d13'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _listings_partitioned() -> bool:
+    if op.get_bind().dialect.name != "postgresql":
+        return False
+    return bool(op.get_bind().execute(sa.text(
+        "SELECT 1 FROM pg_partitioned_table pt JOIN pg_class c ON c.oid = pt.partrelid "
+        "WHERE c.relname = 'listings'"
+    )).scalar())
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table('listings'):
+        # Fresh database: init_db() creates the full schema on startup
+        return
+
+    if not inspector.has_table('search_listings'):
+        # A partitioned listings table has no unique key on id alone to
+        # reference; partition drops clean up links instead
+        listing_fk = [] if _listings_partitioned() else [
+            sa.ForeignKeyConstraint(['listing_id'], ['listings.id'], ondelete='CASCADE')
+        ]
+        op.create_table(
+            'search_listings',
+            sa.Column('id', sa.Integer(), primary_key=True),
+            sa.Column('search_id', sa.Integer(), nullable=False),
+            sa.Column('listing_id', sa.Integer(), nullable=False),
+            sa.Column('first_seen_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+            sa.Column('is_saved', sa.Boolean(), nullable=True),
+            sa.ForeignKeyConstraint(['search_id'], ['searches.id'], ondelete='CASCADE'),
+            *listing_fk,
+            sa.UniqueConstraint('search_id', 'listing_id', name='uq_search_listing'),
+        )
+        op.create_index('ix_search_listings_id', 'search_listings', ['id'])
+        op.create_index('idx_search_listing_first_seen', 'search_listings', ['search_id', 'first_seen_at'])
+        op.create_index('idx_search_listing_listing', 'search_listings', ['listing_id'])
+
+    op.execute(
+        "INSERT INTO search_listings (search_id, listing_id, first_seen_at, is_saved) "
+        "SELECT l.search_id, l.id, l.created_at, COALESCE(l.is_saved, false) FROM listings l "
+        "WHERE l.search_id IS NOT NULL AND NOT EXISTS ("
+        "SELECT 1 FROM search_listings s WHERE s.search_id = l.search_id AND s.listing_id = l.id)"
+    )
+
+    # SQLite can't alter constraints in place; local databases are
+    # recreated with init_db() instead
+    if op.get_bind().dialect.name == "postgresql":
+        op.execute("ALTER TABLE listings ALTER COLUMN search_id DROP NOT NULL")
+        op.execute("ALTER TABLE listings DROP CONSTRAINT IF EXISTS listings_search_id_fkey")
+        op.execute(
+            "ALTER TABLE listings ADD CONSTRAINT listings_search_id_fkey "
+            "FOREIGN KEY (search_id) REFERENCES searches (id) ON DELETE SET NULL"
+        )
+
+
+def downgrade() -> None:
+    if not sa.inspect(op.get_bind()).has_table('search_listings'):
+        return
+
+    if op.get_bind().dialect.name == "postgresql":
+        # Listings whose first search is gone can't be kept under the old schema
+        op.execute("DELETE FROM listings WHERE search_id IS NULL")
+        op.execute("ALTER TABLE listings DROP CONSTRAINT IF EXISTS listings_search_id_fkey")
+        op.execute(
+            "ALTER TABLE listings ADD CONSTRAINT listings_search_id_fkey "
+            "FOREIGN KEY (search_id) REFERENCES searches (id) ON DELETE CASCADE"
+        )
+        op.execute("ALTER TABLE listings ALTER COLUMN search_id SET NOT NULL")
+    op.drop_table('search_listings')
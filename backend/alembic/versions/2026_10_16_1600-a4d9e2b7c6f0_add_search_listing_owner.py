@@ -0,0 +1,64 @@
+"""add owner column to search listings
+
+Copies each search's user_id onto its search_listings rows so listing
+feeds, saved lists and dashboard counts are a range scan on
+(user_id, ...) instead of a join through searches.
+
+Revision ID: a4d9e2b7c6f0
+Revises: 5f1a7c3e2b94
+Create Date: 2026-10-16 16:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a4d9e2b7c6f0'
+down_revision: Union[str, None] = '5f1a7c3e2b94'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table('search_listings'):
+        # Fresh database: init_db() creates the full schema on startup
+        return
+    if 'user_id' in {column['name'] for column in inspector.get_columns('search_listings')}:
+        return
+
+    op.add_column('search_listings', sa.Column('user_id', sa.Integer(), nullable=True))
+    op.execute(
+        "UPDATE search_listings SET user_id = "
+        "(SELECT s.user_id FROM searches s WHERE s.id = search_listings.search_id)"
+    )
+
+    # SQLite can't add constraints in place; local databases are
+    # recreated with init_db() instead
+    if op.get_bind().dialect.name == "postgresql":
+        op.alter_column('search_listings', 'user_id', nullable=False)
+        op.create_foreign_key(
+            'search_listings_user_id_fkey', 'search_listings', 'users', ['user_id'], ['id'], ondelete='CASCADE'
+        )
+
+    op.create_index('idx_search_listing_user_first_seen', 'search_listings', ['user_id', 'first_seen_at'])
+    op.create_index(
+        'idx_search_listing_user_saved_first_seen', 'search_listings', ['user_id', 'is_saved', 'first_seen_at']
+    )
+
+
+def downgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table('search_listings'):
+        return
+    if 'user_id' not in {column['name'] for column in inspector.get_columns('search_listings')}:
+        return
+
+    op.drop_index('idx_search_listing_user_saved_first_seen', table_name='search_listings')
+    op.drop_index('idx_search_listing_user_first_seen', table_name='search_listings')
+    if op.get_bind().dialect.name == "postgresql":
+        op.drop_constraint('search_listings_user_id_fkey', 'search_listings', type_='foreignkey')
+    op.drop_column('search_listings', 'user_id')
@@ -0,0 +1,70 @@
+"""add keyset pagination indexes
+
+Collection endpoints page newest first on (created_at, id), or
+(first_seen_at, id) for search listings; each owner-scoped index now ends
+in those columns so any page is an index range scan.
+
+Revision ID: c7b3f1e8a2d5
+Revises: a4d9e2b7c6f0
+Create Date: 2026-10-16 17:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c7b3f1e8a2d5'
+down_revision: Union[str, None] = 'a4d9e2b7c6f0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# name -> (old columns, new columns)
+LINK_INDEXES = {
+    'idx_search_listing_first_seen': (['search_id', 'first_seen_at'], ['search_id', 'first_seen_at', 'id']),
+    'idx_search_listing_user_first_seen': (['user_id', 'first_seen_at'], ['user_id', 'first_seen_at', 'id']),
+    'idx_search_listing_user_saved_first_seen': (
+        ['user_id', 'is_saved', 'first_seen_at'], ['user_id', 'is_saved', 'first_seen_at', 'id']
+    ),
+}
+
+
+def _index_names(table: str) -> set:
+    return {index['name'] for index in sa.inspect(op.get_bind()).get_indexes(table)}
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table('search_listings'):
+        # Fresh database: init_db() creates the full schema on startup
+        return
+
+    if 'idx_search_user_created' not in _index_names('searches'):
+        op.create_index('idx_search_user_created', 'searches', ['user_id', 'created_at', 'id'])
+    if 'idx_alert_user_created' not in _index_names('alerts'):
+        op.create_index('idx_alert_user_created', 'alerts', ['user_id', 'created_at', 'id'])
+
+    existing = _index_names('search_listings')
+    for name, (_, columns) in LINK_INDEXES.items():
+        if name in existing:
+            op.drop_index(name, table_name='search_listings')
+        op.create_index(name, 'search_listings', columns)
+
+
+def downgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table('search_listings'):
+        return
+
+    existing = _index_names('search_listings')
+    for name, (columns, _) in LINK_INDEXES.items():
+        if name in existing:
+            op.drop_index(name, table_name='search_listings')
+        op.create_index(name, 'search_listings', columns)
+
+    if 'idx_alert_user_created' in _index_names('alerts'):
+        op.drop_index('idx_alert_user_created', table_name='alerts')
+    if 'idx_search_user_created' in _index_names('searches'):
+        op.drop_index('idx_search_user_created', table_name='searches')
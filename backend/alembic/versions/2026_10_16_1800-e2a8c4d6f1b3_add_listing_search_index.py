@@ -0,0 +1,60 @@
+"""add full-text search index on listings
+
+PostgreSQL: a generated tsvector column over title + description with a
+GIN index. Adding the column rewrites the listings table: run it in a
+maintenance window. SQLite: an FTS5 table kept in sync by triggers,
+built from the existing rows.
+
+Revision ID: e2a8c4d6f1b3
+Revises: c7b3f1e8a2d5
+Create Date: 2026-10-16 18:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.core.fulltext import LISTING_SEARCH_DDL
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e2a8c4d6f1b3'
+down_revision: Union[str, None] = 'c7b3f1e8a2d5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _installed() -> bool:
+    inspector = sa.inspect(op.get_bind())
+    if op.get_bind().dialect.name == "postgresql":
+        return 'search_vector' in {column['name'] for column in inspector.get_columns('listings')}
+    return inspector.has_table('listings_fts')
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table('listings'):
+        # Fresh database: init_db() creates the full schema on startup
+        return
+    dialect = op.get_bind().dialect.name
+    if dialect not in LISTING_SEARCH_DDL or _installed():
+        return
+
+    for statement in LISTING_SEARCH_DDL[dialect]:
+        op.execute(statement)
+    if dialect == "sqlite":
+        op.execute("INSERT INTO listings_fts (listings_fts) VALUES ('rebuild')")
+
+
+def downgrade() -> None:
+    if not sa.inspect(op.get_bind()).has_table('listings') or not _installed():
+        return
+
+    if op.get_bind().dialect.name == "postgresql":
+        op.execute("DROP INDEX IF EXISTS idx_listings_search_vector")
+        op.execute("ALTER TABLE listings DROP COLUMN search_vector")
+    else:
+        for trigger in ("listings_fts_insert", "listings_fts_delete", "listings_fts_update"):
+            op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+        op.execute("DROP TABLE listings_fts")
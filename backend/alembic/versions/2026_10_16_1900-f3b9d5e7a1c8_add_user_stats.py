@@ -0,0 +1,64 @@
+"""add per-user dashboard counters
+
+Existing users get a row here, seeded from their searches and listings;
+new users get one at registration. The nightly reconcile_dashboard_stats
+task then keeps them exact (and fills in today's new listing counts).
+
+Revision ID: f3b9d5e7a1c8
+Revises: e2a8c4d6f1b3
+Create Date: 2026-10-16 19:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f3b9d5e7a1c8'
+down_revision: Union[str, None] = 'e2a8c4d6f1b3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table('users'):
+        # Fresh database: init_db() creates the full schema on startup
+        return
+    if inspector.has_table('user_stats'):
+        return
+
+    op.create_table(
+        'user_stats',
+        sa.Column('user_id', sa.Integer(), primary_key=True),
+        sa.Column('total_searches', sa.Integer(), nullable=False),
+        sa.Column('active_searches', sa.Integer(), nullable=False),
+        sa.Column('total_listings', sa.Integer(), nullable=False),
+        sa.Column('saved_listings', sa.Integer(), nullable=False),
+        sa.Column('new_listings_today', sa.Integer(), nullable=False),
+        sa.Column('new_listings_day', sa.Date(), nullable=True),
+        sa.Column('reconciled_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    )
+
+    # Seed existing users so the dashboard has their counters right away
+    op.execute(
+        "INSERT INTO user_stats (user_id, total_searches, active_searches, total_listings, "
+        "saved_listings, new_listings_today) "
+        "SELECT users.id, "
+        "(SELECT count(*) FROM searches WHERE searches.user_id = users.id), "
+        "(SELECT count(*) FROM searches WHERE searches.user_id = users.id AND searches.status = 'ACTIVE'), "
+        "(SELECT count(DISTINCT listing_id) FROM search_listings WHERE search_listings.user_id = users.id), "
+        "(SELECT count(DISTINCT listing_id) FROM search_listings "
+        "WHERE search_listings.user_id = users.id AND search_listings.is_saved), "
+        "0 "
+        "FROM users"
+    )
+
+
+def downgrade() -> None:
+    if sa.inspect(op.get_bind()).has_table('user_stats'):
+        op.drop_table('user_stats')
@@ -1,6 +1,6 @@
 # app/agents/__init__.py
 
-from app.agents.base import BaseAgent
+from app.agents.base import BaseAgent, AsyncBaseAgent, HTMLAgent, ScrapeResult
 from app.agents.ebay import EbayAgent
 from app.agents.facebook import FacebookAgent
 from app.agents.gumtree import GumtreeAgent
@@ -8,6 +8,9 @@ from app.agents.craigslist import CraigslistAgent
 
 __all__ = [
     'BaseAgent',
+    'AsyncBaseAgent',
+    'HTMLAgent',
+    'ScrapeResult',
     'EbayAgent',
     'FacebookAgent',
     'GumtreeAgent',
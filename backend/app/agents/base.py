@@ -1,16 +1,79 @@
 # app/agents/base.py
 
 from abc import ABC, abstractmethod
-from typing import List, Dict, Any
-from datetime import datetime
-import time
-import random
+from dataclasses import dataclass, field
+from typing import List, Dict, Any, Optional, Iterator, AsyncIterator, Collection, Iterable
+from datetime import datetime, timedelta
+from urllib.parse import urlparse
+import asyncio
+import logging
+import re
+
+import httpx
+
 from app.config import settings
+from app.agents.http import get_async_client, run_coroutine
+from app.core.rate_limit import scrape_rate_limiter
+from app.core.resilience import (
+    CircuitOpenError,
+    backoff_delay,
+    is_transient,
+    marketplace_breaker,
+    retry_after_seconds,
+)
+from app.core.monitoring import track_fetch_retry
+
+logger = logging.getLogger(__name__)
+
+# "5 mins ago", "3 hours ago", "1 day ago", ...
+AGE_PATTERN = re.compile(r"(\d+)\s*(min|hour|hr|day|week|month)s?\b", re.IGNORECASE)
+AGE_UNITS = {
+    "min": timedelta(minutes=1),
+    "hour": timedelta(hours=1),
+    "hr": timedelta(hours=1),
+    "day": timedelta(days=1),
+    "week": timedelta(weeks=1),
+    "month": timedelta(days=30),
+}
+
+
+@dataclass
+class ScrapeResult:
+    """Listings from one marketplace fetch plus what's needed to detect repeats"""
+    listings: List[Dict[str, Any]] = field(default_factory=list)
+    unchanged: bool = False  # Page is the same as the last successful run
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    content_hash: Optional[str] = None
+    stop_id: Optional[str] = None  # Known listing where paging stopped early
+    error: Optional[str] = None  # Why the marketplace couldn't be scraped
+
+    def covers(self, known_ids: Collection[str]) -> bool:
+        """
+        Whether this result reaches back far enough for a reader that has
+        already stored `known_ids` (always true unless paging stopped early).
+        """
+        if self.stop_id is None or self.stop_id in known_ids:
+            return True
+        return any(listing["external_id"] in known_ids for listing in self.listings)
+
+    @property
+    def fingerprint(self) -> Dict[str, str]:
+        """Validators and content hash worth remembering for the next run"""
+        values = {
+            "etag": self.etag,
+            "last_modified": self.last_modified,
+            "content_hash": self.content_hash,
+        }
+        return {key: value for key, value in values.items() if value}
 
 
 class BaseAgent(ABC):
     """Base class for marketplace scraper agents"""
 
+    # Whether posted_at is precise enough to drive the incremental watermark
+    exact_timestamps: bool = False
+
     def __init__(self):
         self.user_agent = settings.SCRAPING_USER_AGENT
         self.timeout = settings.SCRAPING_TIMEOUT
@@ -30,10 +93,33 @@ class BaseAgent(ABC):
         """
         pass
 
-    def random_delay(self):
-        """Add random delay between requests"""
-        delay = self.delay + random.uniform(0, 2)
-        time.sleep(delay)
+    def scrape_page(self, search, fingerprint: Optional[Dict[str, str]] = None) -> ScrapeResult:
+        """
+        Scrape listings, reporting whether the page changed since `fingerprint`.
+
+        Agents that can't tell just return their listings; the caller then
+        compares content hashes instead.
+        """
+        return ScrapeResult(listings=self.scrape(search))
+
+    def scrape_pages(self, search, fingerprint: Optional[Dict[str, str]] = None) -> Iterator[ScrapeResult]:
+        """
+        Yield results page by page, newest first.
+
+        Consumers can stop early (e.g. on reaching a known listing) and no
+        further pages are fetched. Agents without paging yield one page.
+        """
+        yield self.scrape_page(search, fingerprint)
+
+    @property
+    def rate_limit_key(self) -> str:
+        """Rate limiter key; requests are throttled per marketplace host"""
+        base_url = getattr(self, "base_url", "")
+        return urlparse(base_url).netloc or self.__class__.__name__
+
+    def throttle(self) -> float:
+        """Wait for a fleet-wide request slot for this marketplace"""
+        return scrape_rate_limiter.acquire(self.rate_limit_key)
 
     def extract_price(self, price_str: str) -> float:
         """Extract numeric price from string"""
@@ -43,3 +129,253 @@ class BaseAgent(ABC):
             return float(price) if price else 0.0
         except:
             return 0.0
+
+    def extract_datetime(self, value: Optional[str], formats: Iterable[str]) -> Optional[datetime]:
+        """Parse an absolute timestamp, trying each format in turn"""
+        if not value:
+            return None
+        value = value.strip()
+        for fmt in formats:
+            try:
+                return datetime.strptime(value, fmt)
+            except ValueError:
+                continue
+        return None
+
+    def extract_age(self, text: Optional[str], now: Optional[datetime] = None) -> Optional[datetime]:
+        """Turn a relative age such as "3 hours ago" into a (UTC) timestamp"""
+        if not text:
+            return None
+        now = now or datetime.utcnow()
+        text = text.strip().lower()
+        if text in ("just now", "now", "today"):
+            return now
+        match = AGE_PATTERN.search(text)
+        if not match:
+            return None
+        return now - int(match.group(1)) * AGE_UNITS[match.group(2).lower()]
+
+
+class AsyncBaseAgent(BaseAgent):
+    """
+    Base class for marketplace agents that fetch over asyncio.
+
+    Subclasses implement `scrape_async()`, which lets several marketplaces
+    be fetched concurrently on one event loop. The blocking `scrape()` is
+    kept for callers that still expect the synchronous interface.
+    """
+
+    @abstractmethod
+    async def scrape_async(self, search) -> List[Dict[str, Any]]:
+        """
+        Scrape listings for a given search without blocking the event loop.
+
+        Args:
+            search: Search model instance
+
+        Returns:
+            List of listing dictionaries
+        """
+        pass
+
+    def scrape(self, search) -> List[Dict[str, Any]]:
+        """Run `scrape_async()` to completion on the worker's event loop"""
+        return run_coroutine(self.scrape_async(search))
+
+    async def scrape_page(self, search, fingerprint: Optional[Dict[str, str]] = None) -> ScrapeResult:
+        """Async counterpart of `BaseAgent.scrape_page()`"""
+        return ScrapeResult(listings=await self.scrape_async(search))
+
+    async def scrape_pages(self, search, fingerprint: Optional[Dict[str, str]] = None) -> AsyncIterator[ScrapeResult]:
+        """Async counterpart of `BaseAgent.scrape_pages()`"""
+        yield await self.scrape_page(search, fingerprint)
+
+    async def throttle_async(self) -> float:
+        """Wait for a fleet-wide request slot without blocking the loop"""
+        return await scrape_rate_limiter.acquire_async(self.rate_limit_key)
+
+
+class HTMLAgent(AsyncBaseAgent):
+    """
+    Base class for agents that fetch paginated HTML results and parse them.
+
+    Subclasses set `base_url` and implement `build_params()`, `page_params()`
+    and `parse()`; throttling, retries, the circuit breaker, paging and
+    conditional requests are handled here.
+    """
+
+    base_url: str = ""
+    name: str = "marketplace"
+
+    @property
+    def breaker_key(self) -> str:
+        """Circuit breaker name; one circuit per marketplace"""
+        return self.name.lower()
+
+    @abstractmethod
+    def build_params(self, search) -> Dict[str, Any]:
+        """
+        Build the results page query parameters for a search.
+
+        Args:
+            search: Search model instance
+
+        Returns:
+            Query parameters
+        """
+        pass
+
+    def page_params(self, page: int) -> Dict[str, Any]:
+        """
+        Extra query parameters that select a results page.
+
+        Args:
+            page: 1-based page number
+
+        Returns:
+            Query parameters (none by default, i.e. no paging)
+        """
+        return {}
+
+    @abstractmethod
+    def parse(self, html: str) -> List[Dict[str, Any]]:
+        """
+        Parse listings from a results page.
+
+        Args:
+            html: Results page markup
+
+        Returns:
+            List of listing dictionaries
+        """
+        pass
+
+    async def _request(self, search, headers: Optional[Dict[str, str]], page: int) -> httpx.Response:
+        await self.throttle_async()
+        client = get_async_client()
+        response = await client.get(
+            self.base_url,
+            params={**self.build_params(search), **self.page_params(page)},
+            headers={"User-Agent": self.user_agent, **(headers or {})},
+            timeout=self.timeout
+        )
+        if response.status_code != 304:
+            response.raise_for_status()
+        return response
+
+    async def fetch(self, search, headers: Optional[Dict[str, str]] = None, page: int = 1) -> httpx.Response:
+        """
+        Fetch a results page for a search.
+
+        Transient errors (timeouts, connection errors, 429 and 5xx) are
+        retried up to `max_retries` times with jittered exponential backoff.
+        A fetch that still fails counts towards opening the marketplace's
+        circuit.
+
+        Args:
+            search: Search model instance
+            headers: Extra request headers
+            page: 1-based page number
+
+        Returns:
+            HTTP response (a 304 is returned as-is, other errors raise)
+
+        Raises:
+            CircuitOpenError: If the marketplace's circuit is open
+        """
+        await asyncio.to_thread(marketplace_breaker.allow, self.breaker_key)
+
+        attempt = 0
+        while True:
+            try:
+                response = await self._request(search, headers, page)
+            except Exception as e:
+                if not is_transient(e):
+                    if isinstance(e, httpx.HTTPStatusError):
+                        # The marketplace answered; it's up
+                        await asyncio.to_thread(marketplace_breaker.record_success, self.breaker_key)
+                    raise
+                if attempt >= self.max_retries:
+                    await asyncio.to_thread(marketplace_breaker.record_failure, self.breaker_key)
+                    raise
+                delay = backoff_delay(attempt, retry_after_seconds(e))
+                logger.warning(
+                    f"{self.name} fetch failed ({e!r}), retry {attempt + 1}/{self.max_retries} in {delay:.1f}s"
+                )
+                track_fetch_retry(self.breaker_key)
+                await asyncio.sleep(delay)
+                attempt += 1
+                continue
+
+            await asyncio.to_thread(marketplace_breaker.record_success, self.breaker_key)
+            return response
+
+    async def scrape_page(
+        self,
+        search,
+        fingerprint: Optional[Dict[str, str]] = None,
+        page: int = 1
+    ) -> ScrapeResult:
+        """
+        Fetch and parse a results page, skipping the parse when the
+        marketplace confirms it hasn't changed since `fingerprint`.
+
+        Fetch failures (exhausted retries, rate limit refusals, error
+        responses) propagate, so the run records the marketplace as failed
+        rather than as having nothing new; `parse()` only skips bad items.
+        """
+        fingerprint = fingerprint or {}
+        headers = {}
+        if fingerprint.get("etag"):
+            headers["If-None-Match"] = fingerprint["etag"]
+        if fingerprint.get("last_modified"):
+            headers["If-Modified-Since"] = fingerprint["last_modified"]
+
+        response = await self.fetch(search, headers, page)
+        if response.status_code == 304:
+            return ScrapeResult(
+                unchanged=True,
+                etag=fingerprint.get("etag"),
+                last_modified=fingerprint.get("last_modified"),
+                content_hash=fingerprint.get("content_hash")
+            )
+
+        return ScrapeResult(
+            listings=self.parse(response.text),
+            etag=response.headers.get("ETag"),
+            last_modified=response.headers.get("Last-Modified")
+        )
+
+    async def scrape_pages(self, search, fingerprint: Optional[Dict[str, str]] = None) -> AsyncIterator[ScrapeResult]:
+        """
+        Yield results pages, newest first, up to SCRAPING_MAX_PAGES.
+
+        Only the first page is requested conditionally; paging ends early
+        when it is unchanged or a page comes back empty.
+        """
+        for page in range(1, settings.SCRAPING_MAX_PAGES + 1):
+            try:
+                result = await self.scrape_page(search, fingerprint if page == 1 else None, page)
+            except CircuitOpenError:
+                # Keep what earlier pages returned
+                if page == 1:
+                    raise
+                break
+            yield result
+            if result.unchanged or not result.listings:
+                break
+
+    async def scrape_async(self, search) -> List[Dict[str, Any]]:
+        """
+        Scrape listings for a given search.
+
+        Args:
+            search: Search model instance
+
+        Returns:
+            List of listing dictionaries
+        """
+        listings = []
+        async for page in self.scrape_pages(search):
+            listings.extend(page.listings)
+        return listings
@@ -0,0 +1,191 @@
+# app/agents/coalescing.py
+
+import asyncio
+import hashlib
+import json
+import logging
+from datetime import datetime
+from typing import Awaitable, Callable, Collection, Optional
+
+from redis import Redis
+from redis.exceptions import RedisError
+
+from app.config import settings
+from app.database import redis_client
+from app.agents.base import ScrapeResult
+from app.core.monitoring import track_coalesced_scrape
+
+logger = logging.getLogger(__name__)
+
+
+def _normalize_price(price: Optional[float]) -> Optional[float]:
+    # Agents treat 0 the same as "no bound"
+    return float(price) if price else None
+
+
+def _normalize_text(value: Optional[str]) -> Optional[str]:
+    if not value:
+        return None
+    return " ".join(value.lower().split())
+
+
+def query_key(marketplace: str, search) -> str:
+    """
+    Build the canonical key for what a search asks of one marketplace.
+
+    Searches that differ only in case, whitespace or equivalent empty
+    values map to the same key and can share one fetch.
+
+    Args:
+        marketplace: Marketplace name
+        search: Search model instance
+
+    Returns:
+        Stable query key
+    """
+    query = {
+        "marketplace": marketplace,
+        "keywords": _normalize_text(search.keywords),
+        "min_price": _normalize_price(search.min_price),
+        "max_price": _normalize_price(search.max_price),
+        "location": _normalize_text(search.location),
+        "radius_km": search.radius_km or None,
+        "filters": search.filters or {},
+    }
+    canonical = json.dumps(query, sort_keys=True, separators=(",", ":"), default=str)
+    digest = hashlib.sha1(canonical.encode()).hexdigest()
+    return f"{marketplace}:{digest}"
+
+
+def _encode_result(result: ScrapeResult) -> str:
+    payload = {"listings": result.listings, "stop_id": result.stop_id}
+    return json.dumps(payload, default=lambda v: v.isoformat() if isinstance(v, datetime) else str(v))
+
+
+def _decode_result(payload: str) -> ScrapeResult:
+    data = json.loads(payload)
+    for listing in data["listings"]:
+        if isinstance(listing.get("posted_at"), str):
+            listing["posted_at"] = datetime.fromisoformat(listing["posted_at"])
+    return ScrapeResult(listings=data["listings"], stop_id=data.get("stop_id"))
+
+
+class QueryCoalescer:
+    """
+    Share one marketplace fetch between all searches asking the same query.
+
+    The first search to ask for a query key takes a short Redis lock, fetches
+    and publishes the parsed listings for SCRAPING_COALESCE_TTL seconds.
+    Searches arriving meanwhile wait for that result instead of fetching
+    again; later ones read it straight from Redis.
+
+    A result whose paging stopped early at the fetching search's newest
+    known listing is only reused by searches it reaches back far enough for.
+    """
+
+    def __init__(
+        self,
+        redis: Optional[Redis] = None,
+        ttl: Optional[int] = None,
+        wait_timeout: Optional[float] = None,
+        poll_interval: float = 0.5,
+        prefix: str = "scrape:query",
+    ):
+        self.redis = redis or redis_client
+        self.ttl = ttl or settings.SCRAPING_COALESCE_TTL
+        self.wait_timeout = wait_timeout or settings.SCRAPING_COALESCE_WAIT
+        self.poll_interval = poll_interval
+        self.prefix = prefix
+
+    def _get_cached(self, key: str) -> Optional[ScrapeResult]:
+        try:
+            payload = self.redis.get(f"{self.prefix}:results:{key}")
+        except RedisError as e:
+            logger.warning(f"Query cache unavailable: {e}")
+            return None
+        return _decode_result(payload) if payload else None
+
+    def _store(self, key: str, result: ScrapeResult) -> None:
+        try:
+            self.redis.set(f"{self.prefix}:results:{key}", _encode_result(result), ex=self.ttl)
+        except RedisError as e:
+            logger.warning(f"Could not publish coalesced results for {key}: {e}")
+
+    def _lock(self, key: str) -> bool:
+        try:
+            return bool(self.redis.set(
+                f"{self.prefix}:lock:{key}", "1", nx=True, ex=settings.SCRAPING_MARKETPLACE_TIMEOUT
+            ))
+        except RedisError:
+            # Can't coordinate, so just fetch ourselves
+            return True
+
+    def _is_locked(self, key: str) -> bool:
+        try:
+            return bool(self.redis.exists(f"{self.prefix}:lock:{key}"))
+        except RedisError:
+            return False
+
+    def _unlock(self, key: str) -> None:
+        try:
+            self.redis.delete(f"{self.prefix}:lock:{key}")
+        except RedisError:
+            pass
+
+    async def fetch(
+        self,
+        marketplace: str,
+        search,
+        scrape: Callable[[], Awaitable[ScrapeResult]],
+        known_ids: Collection[str] = (),
+    ) -> ScrapeResult:
+        """
+        Get listings for a search's marketplace query, fetching at most once.
+
+        Args:
+            marketplace: Marketplace name
+            search: Search model instance
+            scrape: Performs the actual fetch when no shared result exists
+            known_ids: External IDs the search already has stored
+
+        Returns:
+            Scrape result (shared results carry listings and stop_id only)
+        """
+        key = query_key(marketplace, search)
+
+        cached = await asyncio.to_thread(self._get_cached, key)
+        if cached is not None and cached.covers(known_ids):
+            track_coalesced_scrape(marketplace, "hit")
+            return cached
+
+        locked = await asyncio.to_thread(self._lock, key)
+        if not locked:
+            # Another worker is fetching this query right now; wait for it
+            loop = asyncio.get_running_loop()
+            deadline = loop.time() + self.wait_timeout
+            while loop.time() < deadline:
+                await asyncio.sleep(self.poll_interval)
+                cached = await asyncio.to_thread(self._get_cached, key)
+                if cached is not None and cached.covers(known_ids):
+                    track_coalesced_scrape(marketplace, "waited")
+                    return cached
+                if not await asyncio.to_thread(self._is_locked, key):
+                    # The other fetch finished without sharing a result
+                    break
+
+        try:
+            result = await scrape()
+            # Empty results may be a swallowed fetch error, and an unchanged
+            # page carries no listings; don't share either
+            if result.listings and not result.unchanged:
+                await asyncio.to_thread(self._store, key, result)
+        finally:
+            if locked:
+                await asyncio.to_thread(self._unlock, key)
+
+        track_coalesced_scrape(marketplace, "miss")
+        return result
+
+
+# Shared coalescer for the scrape path
+query_coalescer = QueryCoalescer()
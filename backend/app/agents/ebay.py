@@ -1,100 +1,106 @@
 # app/agents/ebay.py
 
-import httpx
-from bs4 import BeautifulSoup
-from typing import List, Dict, Any
-from datetime import datetime
+from typing import List, Dict, Any, Optional
+from datetime import datetime, timedelta
 import logging
 
-from app.agents.base import BaseAgent
+from app.agents.base import HTMLAgent
+from app.agents.parsing import FieldSelector, SelectorSpec, get_parser
 
 logger = logging.getLogger(__name__)
 
 
-class EbayAgent(BaseAgent):
+class EbayAgent(HTMLAgent):
     """eBay marketplace scraper"""
 
+    name = "eBay"
+    exact_timestamps = True
+
+    selectors = SelectorSpec(
+        item="li.s-item",
+        fields={
+            "title": FieldSelector("h3.s-item__title"),
+            "price": FieldSelector("span.s-item__price"),
+            "url": FieldSelector("a.s-item__link", attr="href"),
+            "image": FieldSelector("img", attr="src"),
+            # Shown when sorting by newly listed, e.g. "Oct-16 14:30"
+            "listed": FieldSelector("span.s-item__listingDate"),
+        },
+        limit=None,  # Whole page; depth is bounded by SCRAPING_MAX_PAGES
+    )
+
     def __init__(self):
         super().__init__()
         self.base_url = "https://www.ebay.com/sch/i.html"
 
-    def scrape(self, search) -> List[Dict[str, Any]]:
+    def build_params(self, search) -> Dict[str, Any]:
+        """Build eBay search query parameters"""
+        params = {
+            "_nkw": search.keywords,
+            "_sop": 10,  # Sort by newly listed
+        }
+
+        # Add price filters
+        if search.min_price:
+            params["_udlo"] = search.min_price
+        if search.max_price:
+            params["_udhi"] = search.max_price
+
+        return params
+
+    def page_params(self, page: int) -> Dict[str, Any]:
+        """Select an eBay results page"""
+        return {"_pgn": page} if page > 1 else {}
+
+    def parse_listing_date(self, text: Optional[str], now: Optional[datetime] = None) -> Optional[datetime]:
+        """Parse eBay's year-less listing date, assuming the most recent such date"""
+        if not text:
+            return None
+        now = now or datetime.utcnow()
+        posted_at = self.extract_datetime(f"{now.year} {text.strip()}", ["%Y %b-%d %H:%M"])
+        if posted_at and posted_at > now + timedelta(days=1):
+            posted_at = posted_at.replace(year=now.year - 1)
+        return posted_at
+
+    def parse(self, html: str) -> List[Dict[str, Any]]:
         """
-        Scrape eBay listings.
+        Parse eBay listings.
 
         Args:
-            search: Search model instance
+            html: Search results page markup
 
         Returns:
             List of listing dictionaries
         """
         listings = []
 
-        try:
-            # Build search URL
-            params = {
-                "_nkw": search.keywords,
-                "_sop": 10,  # Sort by ending soonest
-            }
-
-            # Add price filters
-            if search.min_price:
-                params["_udlo"] = search.min_price
-            if search.max_price:
-                params["_udhi"] = search.max_price
-
-            # Make request
-            headers = {"User-Agent": self.user_agent}
-            response = httpx.get(
-                self.base_url,
-                params=params,
-                headers=headers,
-                timeout=self.timeout
-            )
-            response.raise_for_status()
-
-            # Parse HTML
-            soup = BeautifulSoup(response.text, 'html.parser')
-            items = soup.find_all('li', class_='s-item')
-
-            for item in items[:50]:  # Limit to 50 items
-                try:
-                    # Extract listing data
-                    title_elem = item.find('h3', class_='s-item__title')
-                    price_elem = item.find('span', class_='s-item__price')
-                    link_elem = item.find('a', class_='s-item__link')
-                    image_elem = item.find('img')
-
-                    if not all([title_elem, price_elem, link_elem]):
-                        continue
-
-                    # Extract external ID from URL
-                    url = link_elem.get('href', '')
-                    external_id = url.split('/itm/')[-1].split('?')[0] if '/itm/' in url else ''
-
-                    if not external_id:
-                        continue
-
-                    listing = {
-                        "external_id": external_id,
-                        "title": title_elem.text.strip(),
-                        "price": self.extract_price(price_elem.text),
-                        "currency": "USD",
-                        "url": url,
-                        "image_urls": [image_elem.get('src', '')] if image_elem else [],
-                        "posted_at": datetime.utcnow(),
-                        "metadata": {}
-                    }
-
-                    listings.append(listing)
-
-                except Exception as e:
-                    logger.error(f"Error parsing eBay item: {e}")
+        for item in get_parser().extract(html, self.selectors):
+            try:
+                if item["title"] is None or item["price"] is None or item["url"] is None:
                     continue
 
-            self.random_delay()
+                # Extract external ID from URL
+                url = item["url"]
+                external_id = url.split('/itm/')[-1].split('?')[0] if '/itm/' in url else ''
+
+                if not external_id:
+                    continue
 
-        except Exception as e:
-            logger.error(f"Error scraping eBay: {e}")
+                listing = {
+                    "external_id": external_id,
+                    "title": item["title"].strip(),
+                    "price": self.extract_price(item["price"]),
+                    "currency": "USD",
+                    "url": url,
+                    "image_urls": [item["image"]] if item["image"] else [],
+                    "posted_at": self.parse_listing_date(item["listed"]),
+                    "metadata": {}
+                }
+
+                listings.append(listing)
+
+            except Exception as e:
+                logger.error(f"Error parsing eBay item: {e}")
+                continue
 
         return listings
@@ -0,0 +1,70 @@
+# app/agents/fingerprint.py
+
+import hashlib
+import logging
+from typing import Any, Dict, List, Optional
+
+from redis import Redis
+from redis.exceptions import RedisError
+
+from app.config import settings
+from app.database import redis_client
+
+logger = logging.getLogger(__name__)
+
+
+def content_hash(listings: List[Dict[str, Any]]) -> str:
+    """
+    Hash the parts of a result list that matter to a search.
+
+    Order is ignored so a marketplace reshuffling the same items doesn't
+    count as a change.
+    """
+    entries = sorted(
+        f"{listing.get('external_id')}|{listing.get('price')}|{listing.get('title')}"
+        for listing in listings
+    )
+    return hashlib.sha1("\n".join(entries).encode()).hexdigest()
+
+
+class FingerprintStore:
+    """
+    Remembers what each (search, marketplace) page looked like last run.
+
+    Holds the HTTP validators (ETag / Last-Modified) for conditional
+    requests and a content hash of the parsed result list as a fallback.
+    """
+
+    def __init__(self, redis: Optional[Redis] = None, ttl: Optional[int] = None, prefix: str = "scrape:fingerprint"):
+        self.redis = redis or redis_client
+        self.ttl = ttl or settings.SCRAPING_FINGERPRINT_TTL
+        self.prefix = prefix
+
+    def _key(self, search_id: int, marketplace: str) -> str:
+        return f"{self.prefix}:{search_id}:{marketplace}"
+
+    def get(self, search_id: int, marketplace: str) -> Dict[str, str]:
+        """Get the fingerprint from the last successful run, if any"""
+        try:
+            return self.redis.hgetall(self._key(search_id, marketplace)) or {}
+        except RedisError as e:
+            logger.warning(f"Fingerprint store unavailable: {e}")
+            return {}
+
+    def save(self, search_id: int, marketplace: str, fingerprint: Dict[str, str]) -> None:
+        """Replace the stored fingerprint (call only once results are persisted)"""
+        if not fingerprint:
+            return
+        key = self._key(search_id, marketplace)
+        try:
+            pipe = self.redis.pipeline()
+            pipe.delete(key)
+            pipe.hset(key, mapping=fingerprint)
+            pipe.expire(key, self.ttl)
+            pipe.execute()
+        except RedisError as e:
+            logger.warning(f"Could not save fingerprint for search {search_id} on {marketplace}: {e}")
+
+
+# Shared fingerprint store for the scrape path
+fingerprint_store = FingerprintStore()
@@ -0,0 +1,119 @@
+# app/agents/http.py
+
+import asyncio
+import logging
+import threading
+from typing import Any, Awaitable, Dict, List, Optional, TypeVar
+
+import httpx
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+_client: Optional[httpx.Client] = None
+_async_clients: Dict[asyncio.AbstractEventLoop, httpx.AsyncClient] = {}
+_local = threading.local()
+_loops: List[asyncio.AbstractEventLoop] = []
+
+
+def _http2_enabled() -> bool:
+    """HTTP/2 needs the optional `h2` package; fall back to HTTP/1.1 without it"""
+    if not settings.HTTP_HTTP2_ENABLED:
+        return False
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        logger.warning("HTTP_HTTP2_ENABLED is set but 'h2' is not installed, using HTTP/1.1")
+        return False
+    return True
+
+
+def _client_kwargs() -> Dict[str, Any]:
+    """Shared pool configuration for sync and async clients"""
+    return {
+        "limits": httpx.Limits(
+            max_connections=settings.HTTP_POOL_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.HTTP_POOL_MAX_KEEPALIVE,
+            keepalive_expiry=settings.HTTP_POOL_KEEPALIVE_EXPIRY,
+        ),
+        "timeout": settings.SCRAPING_TIMEOUT,
+        "http2": _http2_enabled(),
+        "headers": {"User-Agent": settings.SCRAPING_USER_AGENT},
+        "follow_redirects": True,
+    }
+
+
+def get_client() -> httpx.Client:
+    """
+    Get the process-wide pooled client for blocking agents.
+
+    Created lazily so prefork children never inherit a pool from the parent.
+    """
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.Client(**_client_kwargs())
+    return _client
+
+
+def get_async_client() -> httpx.AsyncClient:
+    """
+    Get the pooled async client for the running event loop.
+
+    Async connections are bound to the loop that opened them, so one client
+    is kept per loop; in workers that is always the loop from `get_loop()`.
+    """
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(**_client_kwargs())
+        _async_clients[loop] = client
+    return client
+
+
+def get_loop() -> asyncio.AbstractEventLoop:
+    """
+    Get the long-lived event loop of this worker thread.
+
+    One loop per thread, so tasks of a threads-pool worker can run their
+    coroutines side by side.
+    """
+    loop = getattr(_local, "loop", None)
+    if loop is None or loop.is_closed():
+        loop = asyncio.new_event_loop()
+        _local.loop = loop
+        _loops.append(loop)
+    return loop
+
+
+def run_coroutine(coro: Awaitable[T]) -> T:
+    """
+    Run a coroutine to completion on the worker's long-lived event loop.
+
+    Unlike `asyncio.run()`, the loop (and the pooled async client bound to
+    it) survives between tasks, so keep-alive connections are reused.
+    """
+    return get_loop().run_until_complete(coro)
+
+
+def close_clients() -> None:
+    """Close all pooled clients and worker loops (call on process exit)"""
+    global _client
+
+    if _client is not None:
+        _client.close()
+        _client = None
+
+    for loop, client in list(_async_clients.items()):
+        if not loop.is_closed() and not loop.is_running():
+            loop.run_until_complete(client.aclose())
+    _async_clients.clear()
+
+    for loop in _loops:
+        if not loop.is_closed() and not loop.is_running():
+            loop.run_until_complete(loop.shutdown_asyncgens())
+            loop.close()
+    _loops.clear()
+    _local.loop = None
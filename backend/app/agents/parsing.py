@@ -0,0 +1,171 @@
+# app/agents/parsing.py
+
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Dict, List, Optional
+import logging
+
+import lxml.html
+from bs4 import BeautifulSoup
+from lxml.cssselect import CSSSelector
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Raw field values pulled out of one result item, before agent post-processing
+RawItem = Dict[str, Optional[str]]
+
+
+@dataclass(frozen=True)
+class FieldSelector:
+    """Where to find one field inside a result item"""
+    css: str
+    attr: Optional[str] = None  # Read this attribute instead of the text
+
+
+@dataclass(frozen=True)
+class SelectorSpec:
+    """
+    Declarative extraction rules for one marketplace's results page.
+
+    Selectors are plain CSS so every backend can run the same spec; each
+    backend compiles them once and caches the compiled form.
+    """
+    item: str
+    fields: Dict[str, FieldSelector] = field(default_factory=dict)
+    limit: Optional[int] = 50
+
+
+class ParserBackend(ABC):
+    """Runs a SelectorSpec against an HTML document"""
+
+    name: str = ""
+
+    @abstractmethod
+    def extract(self, html: str, spec: SelectorSpec) -> List[RawItem]:
+        """
+        Extract raw field values for each result item.
+
+        Args:
+            html: Results page markup
+            spec: Extraction rules
+
+        Returns:
+            One dict per item mapping field name to text/attribute (or None)
+        """
+        pass
+
+
+@lru_cache(maxsize=None)
+def _compile_css(css: str) -> CSSSelector:
+    return CSSSelector(css)
+
+
+class LxmlBackend(ParserBackend):
+    """libxml2-backed parser with selectors compiled to XPath once"""
+
+    name = "lxml"
+
+    def extract(self, html: str, spec: SelectorSpec) -> List[RawItem]:
+        if not html.strip():
+            return []
+        root = lxml.html.fromstring(html)
+        items = _compile_css(spec.item)(root)[:spec.limit]
+        compiled = {name: (_compile_css(sel.css), sel.attr) for name, sel in spec.fields.items()}
+
+        results = []
+        for item in items:
+            raw = {}
+            for name, (selector, attr) in compiled.items():
+                matches = selector(item)
+                if not matches:
+                    raw[name] = None
+                elif attr:
+                    raw[name] = matches[0].get(attr)
+                else:
+                    raw[name] = matches[0].text_content()
+            results.append(raw)
+        return results
+
+
+class SelectolaxBackend(ParserBackend):
+    """Lexbor-backed parser (optional `selectolax` package)"""
+
+    name = "selectolax"
+
+    def extract(self, html: str, spec: SelectorSpec) -> List[RawItem]:
+        from selectolax.lexbor import LexborHTMLParser
+
+        tree = LexborHTMLParser(html)
+        items = tree.css(spec.item)[:spec.limit]
+
+        results = []
+        for item in items:
+            raw = {}
+            for name, sel in spec.fields.items():
+                node = item.css_first(sel.css)
+                if node is None:
+                    raw[name] = None
+                elif sel.attr:
+                    raw[name] = node.attributes.get(sel.attr)
+                else:
+                    raw[name] = node.text()
+            results.append(raw)
+        return results
+
+
+class SoupBackend(ParserBackend):
+    """Pure-Python BeautifulSoup parser, kept as a reference and fallback"""
+
+    name = "html.parser"
+
+    def extract(self, html: str, spec: SelectorSpec) -> List[RawItem]:
+        soup = BeautifulSoup(html, 'html.parser')
+        items = soup.select(spec.item, limit=spec.limit or None)
+
+        results = []
+        for item in items:
+            raw = {}
+            for name, sel in spec.fields.items():
+                node = item.select_one(sel.css)
+                if node is None:
+                    raw[name] = None
+                elif sel.attr:
+                    raw[name] = node.get(sel.attr)
+                else:
+                    raw[name] = node.text
+            results.append(raw)
+        return results
+
+
+PARSER_BACKENDS = {
+    backend.name: backend
+    for backend in (LxmlBackend, SelectolaxBackend, SoupBackend)
+}
+
+
+def available_backends() -> List[str]:
+    """Names of the backends whose libraries are installed"""
+    names = [LxmlBackend.name, SoupBackend.name]
+    try:
+        import selectolax  # noqa: F401
+        names.insert(1, SelectolaxBackend.name)
+    except ImportError:
+        pass
+    return names
+
+
+@lru_cache(maxsize=None)
+def get_parser(name: Optional[str] = None) -> ParserBackend:
+    """
+    Get a parser backend by name (defaults to SCRAPING_PARSER_BACKEND).
+
+    Unknown or uninstalled backends fall back to lxml.
+    """
+    name = name or settings.SCRAPING_PARSER_BACKEND
+    if name not in available_backends():
+        logger.warning(f"Parser backend '{name}' is not available, using lxml")
+        name = LxmlBackend.name
+    return PARSER_BACKENDS[name]()
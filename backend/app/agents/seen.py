@@ -0,0 +1,159 @@
+# app/agents/seen.py
+
+import calendar
+import logging
+import time
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Set
+
+from redis import Redis
+from redis.exceptions import RedisError
+from sqlalchemy.orm import Session
+
+from app.core.retention import retention_windows
+from app.database import redis_client
+from app.models import Listing, Marketplace, SearchListing
+
+logger = logging.getLogger(__name__)
+
+
+class SeenFilter:
+    """
+    Fleet-wide record of which listings each search already has stored.
+
+    Lets the scrape path drop a search's already-stored listings before
+    they reach the database. Listings are stored once for all searches, so
+    membership is per search: "search_id:external_id" members live in one
+    Redis sorted set per marketplace, scored by when they expire. Members
+    expire after the longest tier's retention window from the day the
+    search found them, so membership never ages out before
+    `cleanup_old_listings` retires the link. A check is a single ZMSCORE
+    however long the window is; expired members are trimmed on `add()`,
+    and a set nobody adds to expires with its newest member.
+
+    The filter can only say "seen" for IDs it was told about, so misses are
+    always safe; a warm-up via `rebuild()` just saves database lookups.
+    """
+
+    def __init__(
+        self,
+        redis: Optional[Redis] = None,
+        retention_days: Optional[int] = None,
+        prefix: str = "seen:listing"
+    ):
+        self.redis = redis or redis_client
+        self.retention_days = retention_days or max(retention_windows().values())
+        self.prefix = prefix
+
+    def _key(self, marketplace: str) -> str:
+        return f"{self.prefix}:{marketplace}"
+
+    def _expires_at(self, day: date) -> int:
+        """Unix time a member found on `day` stops counting as seen"""
+        expires = datetime.combine(day + timedelta(days=self.retention_days + 1), datetime.min.time())
+        return calendar.timegm(expires.timetuple())
+
+    @staticmethod
+    def _member(search_id: int, external_id: str) -> str:
+        return f"{search_id}:{external_id}"
+
+    def seen(self, search_id: int, marketplace: str, external_ids: List[str]) -> Set[str]:
+        """
+        Get which of `external_ids` a search already has stored for a marketplace.
+
+        Args:
+            search_id: Search ID
+            marketplace: Marketplace name
+            external_ids: Candidate external IDs
+
+        Returns:
+            The IDs the filter has seen (empty if Redis is unavailable)
+        """
+        if not external_ids:
+            return set()
+        members = [self._member(search_id, external_id) for external_id in external_ids]
+        try:
+            expiries = self.redis.zmscore(self._key(marketplace), members)
+        except RedisError as e:
+            logger.warning(f"Seen filter unavailable: {e}")
+            return set()
+
+        now = time.time()
+        return {
+            external_id
+            for external_id, expires_at in zip(external_ids, expiries)
+            if expires_at is not None and expires_at > now
+        }
+
+    def add(self, search_id: int, marketplace: str, external_ids: Iterable[str], day: Optional[date] = None) -> None:
+        """Record a search's stored listings (call only once they're committed)"""
+        today = datetime.utcnow().date()
+        expires_at = self._expires_at(day or today)
+        mapping = {self._member(search_id, external_id): expires_at for external_id in external_ids}
+        if not mapping:
+            return
+        key = self._key(marketplace)
+        try:
+            pipe = self.redis.pipeline(transaction=False)
+            pipe.zremrangebyscore(key, "-inf", time.time())
+            pipe.zadd(key, mapping, gt=True)
+            pipe.expireat(key, max(expires_at, self._expires_at(today)))
+            pipe.execute()
+        except RedisError as e:
+            logger.warning(f"Could not update seen filter for {marketplace}: {e}")
+
+    def rebuild(self, db: Session, batch_size: int = 5000) -> int:
+        """
+        Reload the filter from the search-listing links.
+
+        Clears the filter and re-adds every link made within the window,
+        walking the table in primary-key batches.
+
+        Args:
+            db: Database session
+            batch_size: Listings read per query
+
+        Returns:
+            Number of search-listing links loaded
+        """
+        self.redis.delete(*(self._key(marketplace.value) for marketplace in Marketplace))
+
+        today = datetime.utcnow().date()
+        expires_at = self._expires_at(today)
+        cutoff = datetime.combine(today - timedelta(days=self.retention_days), datetime.min.time())
+        last_id = 0
+        loaded = 0
+        while True:
+            rows = db.query(
+                SearchListing.id, SearchListing.search_id, Listing.marketplace, Listing.external_id,
+                SearchListing.first_seen_at
+            ).join(
+                Listing, Listing.id == SearchListing.listing_id
+            ).filter(
+                SearchListing.id > last_id,
+                SearchListing.first_seen_at >= cutoff
+            ).order_by(SearchListing.id).limit(batch_size).all()
+            if not rows:
+                break
+
+            batches: Dict[str, Dict[str, int]] = defaultdict(dict)
+            for _, search_id, marketplace, external_id, first_seen_at in rows:
+                batches[Marketplace(marketplace).value][self._member(search_id, external_id)] = \
+                    self._expires_at(first_seen_at.date())
+            pipe = self.redis.pipeline(transaction=False)
+            for marketplace, mapping in batches.items():
+                key = self._key(marketplace)
+                pipe.zadd(key, mapping, gt=True)
+                pipe.expireat(key, expires_at)
+            pipe.execute()
+
+            last_id = rows[-1].id
+            loaded += len(rows)
+
+        logger.info(f"Rebuilt seen filter with {loaded} search listings")
+        return loaded
+
+
+# Shared seen-listing filter for the scrape path
+seen_filter = SeenFilter()
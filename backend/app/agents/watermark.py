@@ -0,0 +1,82 @@
+# app/agents/watermark.py
+
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Dict, FrozenSet, Iterable, Optional
+
+
+def _as_utc(value: Optional[datetime]) -> Optional[datetime]:
+    """Aware UTC form of a timestamp; naive ones are taken to be UTC already"""
+    if value is None:
+        return None
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+@dataclass(frozen=True)
+class Watermark:
+    """
+    Newest listing a search has processed on one marketplace.
+
+    Holds the newest posted_at seen plus the external IDs posted at exactly
+    that time, so listings sharing the boundary timestamp aren't dropped.
+    Listings without a posted_at are never considered covered. Times are
+    kept in aware UTC, as agents and the shared results cache may hand
+    over either naive or aware ones.
+    """
+    posted_at: Optional[datetime] = None
+    external_ids: FrozenSet[str] = field(default_factory=frozenset)
+
+    def __post_init__(self):
+        object.__setattr__(self, "posted_at", _as_utc(self.posted_at))
+
+    def covers(self, listing: Dict[str, Any]) -> bool:
+        """Whether a listing is at or below the watermark (i.e. already processed)"""
+        posted_at = _as_utc(listing.get("posted_at"))
+        if self.posted_at is None or posted_at is None:
+            return False
+        if posted_at < self.posted_at:
+            return True
+        return posted_at == self.posted_at and listing["external_id"] in self.external_ids
+
+    def advance(self, listings: Iterable[Dict[str, Any]]) -> "Watermark":
+        """
+        Move the watermark up to the newest of `listings`.
+
+        Args:
+            listings: Listings processed in this run
+
+        Returns:
+            New watermark (self when nothing newer was seen)
+        """
+        posted_at, external_ids = self.posted_at, set(self.external_ids)
+        for listing in listings:
+            listing_posted_at = _as_utc(listing.get("posted_at"))
+            if listing_posted_at is None:
+                continue
+            if posted_at is None or listing_posted_at > posted_at:
+                posted_at, external_ids = listing_posted_at, {listing["external_id"]}
+            elif listing_posted_at == posted_at:
+                external_ids.add(listing["external_id"])
+
+        if posted_at == self.posted_at and external_ids == self.external_ids:
+            return self
+        return Watermark(posted_at, frozenset(external_ids))
+
+    def to_dict(self) -> Dict[str, Any]:
+        """JSON-serializable form stored on the search"""
+        return {
+            "posted_at": self.posted_at.isoformat() if self.posted_at else None,
+            "external_ids": sorted(self.external_ids),
+        }
+
+    @classmethod
+    def from_dict(cls, data: Optional[Dict[str, Any]]) -> "Watermark":
+        """Rebuild a watermark from its stored form (empty when missing)"""
+        if not data or not data.get("posted_at"):
+            return cls()
+        return cls(
+            posted_at=datetime.fromisoformat(data["posted_at"]),
+            external_ids=frozenset(data.get("external_ids") or ()),
+        )
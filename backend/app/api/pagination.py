@@ -0,0 +1,109 @@
+# app/api/pagination.py
+
+import base64
+import json
+from datetime import datetime
+from typing import Any, Callable, List, Optional, Tuple, Union
+
+from fastapi import HTTPException, Response, status
+from sqlalchemy import DateTime, desc, func, tuple_
+from sqlalchemy.orm import Query
+
+# Response header carrying the cursor of the next page; absent on the last page
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+# SQLite keeps timestamps as text, with or without fractional seconds
+# depending on who wrote them; both sides are compared in one format there
+SQLITE_TIMESTAMP = "%Y-%m-%d %H:%M:%f"
+
+
+# A row's position: its sort value (a timestamp or a relevance score) and ID
+SortValue = Union[datetime, float]
+
+
+def encode_cursor(sort_value: SortValue, row_id: int) -> str:
+    """Opaque cursor pointing just past a row"""
+    if isinstance(sort_value, datetime):
+        sort_value = sort_value.isoformat()
+    payload = json.dumps([sort_value, row_id]).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[SortValue, int]:
+    """
+    Read a cursor made by `encode_cursor`.
+
+    Raises:
+        HTTPException: If the cursor is malformed
+    """
+    try:
+        payload = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        sort_value, row_id = json.loads(payload)
+        if isinstance(sort_value, str):
+            return datetime.fromisoformat(sort_value), int(row_id)
+        return float(sort_value), int(row_id)
+    except (ValueError, TypeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+
+
+def paginate(
+    query: Query,
+    response: Response,
+    sort_column: Any,
+    id_column: Any,
+    key: Callable[[Any], Tuple[SortValue, int]],
+    cursor: Optional[str] = None,
+    skip: int = 0,
+    limit: int = 100,
+) -> List[Any]:
+    """
+    Fetch one page of `query`, newest (or highest ranked) first.
+
+    With a cursor, the page starts right after the row it points to; for
+    a timestamp sort that is a range scan on an index ending in
+    (sort_column, id_column), however deep the page. Without one, `skip` is applied as a plain OFFSET for
+    older clients. Either way, the cursor of the following page is set in
+    the NEXT_CURSOR_HEADER response header when there is one.
+
+    Args:
+        query: Query to page through
+        response: Response to set the next cursor on
+        sort_column: Creation time (or relevance) column to order by
+        id_column: Unique column breaking ties
+        key: Returns a fetched row's (sort_column, id_column) values
+        cursor: Cursor from a previous page
+        skip: Rows to skip when no cursor is given
+        limit: Rows per page
+
+    Returns:
+        The rows of the page
+    """
+    timestamps = isinstance(sort_column.type, DateTime)
+    sqlite_timestamps = timestamps and query.session.get_bind().dialect.name == "sqlite"
+    if sqlite_timestamps:
+        sort_column = func.strftime(SQLITE_TIMESTAMP, sort_column)
+
+    query = query.order_by(desc(sort_column), desc(id_column))
+    if cursor:
+        sort_value, row_id = decode_cursor(cursor)
+        if isinstance(sort_value, datetime) != timestamps:
+            # A cursor from a differently sorted collection
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid cursor"
+            )
+        if sqlite_timestamps:
+            sort_value = func.strftime(SQLITE_TIMESTAMP, sort_value.isoformat(sep=" "))
+        query = query.filter(tuple_(sort_column, id_column) < tuple_(sort_value, row_id))
+    elif skip:
+        query = query.offset(skip)
+
+    # One extra row tells whether another page follows
+    rows = query.limit(limit + 1).all()
+    if len(rows) > limit:
+        rows = rows[:limit]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(*key(rows[-1]))
+    return rows
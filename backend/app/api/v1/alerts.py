@@ -1,25 +1,34 @@
 # app/api/v1/alerts.py
 
-from typing import Any, List
-from fastapi import APIRouter, Depends, HTTPException, status
+from typing import Any, List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
 from sqlalchemy.orm import Session
 
 from app.database import get_db
 from app.models import User, Alert, Search
 from app.schemas import Alert as AlertSchema, AlertCreate, AlertUpdate, Message
 from app.api.deps import get_current_active_user
+from app.api.pagination import paginate
 
 router = APIRouter()
 
 
 @router.get("", response_model=List[AlertSchema])
 def get_alerts(
+    response: Response,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: User = Depends(get_current_active_user),
+    cursor: Optional[str] = None,
+    skip: int = 0,
+    limit: int = Query(100, ge=1, le=500)
 ) -> Any:
-    """Get all alerts for current user"""
-    alerts = db.query(Alert).filter(Alert.user_id == current_user.id).all()
-    return alerts
+    """Get alerts for current user, newest first"""
+    query = db.query(Alert).filter(Alert.user_id == current_user.id)
+    return paginate(
+        query, response, Alert.created_at, Alert.id,
+        key=lambda alert: (alert.created_at, alert.id),
+        cursor=cursor, skip=skip, limit=limit
+    )
 
 
 @router.get("/{alert_id}", response_model=AlertSchema)
@@ -7,7 +7,7 @@ from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
 
 from app.database import get_db
-from app.models import User
+from app.models import User, UserStats
 from app.schemas import Token, UserCreate, User as UserSchema, Message
 from app.core.security import (
     verify_password,
@@ -53,7 +53,8 @@ def register(
         full_name=user_in.full_name,
         hashed_password=get_password_hash(user_in.password),
         is_active=True,
-        is_verified=False
+        is_verified=False,
+        stats=UserStats()  # Nothing to count yet
     )
 
     db.add(user)
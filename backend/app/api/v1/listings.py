@@ -1,76 +1,188 @@
 # app/api/v1/listings.py
 
 from typing import Any, Optional, List
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
-from sqlalchemy import func, desc
+from fastapi import APIRouter, Depends, HTTPException, Response, status, Query
+from sqlalchemy.orm import Query as DBQuery, Session, aliased
+from sqlalchemy import exists, inspect
 from datetime import datetime, timedelta
 
 from app.database import get_db
-from app.models import User, Listing, Search, Marketplace
-from app.schemas import Listing as ListingSchema, ListingUpdate, Message
+from app.models import User, Listing, Search, SearchListing, Marketplace
+from app.schemas import Listing as ListingSchema, ListingUpdate
 from app.api.deps import get_current_active_user
+from app.api.pagination import paginate
+from app.core.fulltext import listing_matches
+from app.core.user_stats import adjust_user_stats
 
 router = APIRouter()
 
 
+def _user_listings(db: Session, user: User) -> DBQuery:
+    """(Listing, SearchListing) pairs of the user's searches, scoped by the links' owner column"""
+    return db.query(Listing, SearchListing).join(
+        SearchListing, SearchListing.listing_id == Listing.id
+    ).filter(SearchListing.user_id == user.id)
+
+
+def _one_per_listing(query: DBQuery) -> DBQuery:
+    """Keep only the user's first link to each listing, so one matched by several of their searches shows once"""
+    earlier = aliased(SearchListing)
+    return query.filter(~exists().where(
+        earlier.user_id == SearchListing.user_id,
+        earlier.listing_id == SearchListing.listing_id,
+        earlier.id < SearchListing.id
+    ))
+
+
+def _page(query: DBQuery, response: Response, cursor: Optional[str], skip: int, limit: int) -> List[tuple]:
+    """One page of (Listing, SearchListing) pairs, newest link first"""
+    return paginate(
+        query, response, SearchListing.first_seen_at, SearchListing.id,
+        key=lambda row: (row[1].first_seen_at, row[1].id),
+        cursor=cursor, skip=skip, limit=limit
+    )
+
+
+def _as_seen_by(listing: Listing, link: SearchListing) -> ListingSchema:
+    """
+    A listing as one of the user's searches sees it: its search and saved flag.
+
+    The listing's own search_id is the search that found it first, which
+    is NULL once that search is deleted, so the view is built from the
+    link's values rather than validated from the listing as is.
+    """
+    columns = {attr.columns[0].name: getattr(listing, attr.key) for attr in inspect(listing).mapper.column_attrs}
+    return ListingSchema.model_validate({
+        **columns,
+        "search_id": link.search_id,
+        "is_saved": bool(link.is_saved),
+    })
+
+
+def _user_listing(db: Session, user: User, listing_id: int) -> List[tuple]:
+    """The user's links to a listing; 404/403 if it doesn't exist or isn't theirs"""
+    if not db.query(Listing.id).filter(Listing.id == listing_id).first():
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Listing not found"
+        )
+
+    # Verify user has access to this listing
+    rows = _user_listings(db, user).filter(Listing.id == listing_id).order_by(SearchListing.id).all()
+    if not rows:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Access denied"
+        )
+    return rows
+
+
 @router.get("", response_model=List[ListingSchema])
 def get_listings(
+    response: Response,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user),
     search_id: Optional[int] = None,
     marketplace: Optional[Marketplace] = None,
     is_saved: Optional[bool] = None,
+    cursor: Optional[str] = None,
     skip: int = 0,
-    limit: int = 100
+    limit: int = Query(100, ge=1, le=500)
 ) -> Any:
-    """Get listings with optional filters"""
-    # Get user's search IDs
-    user_search_ids = db.query(Search.id).filter(
-        Search.user_id == current_user.id
-    ).all()
-    user_search_ids = [s[0] for s in user_search_ids]
+    """
+    Get listings with optional filters, a page at a time (next page cursor in X-Next-Cursor).
 
-    query = db.query(Listing).filter(Listing.search_id.in_(user_search_ids))
+    Each listing shows once, as its first search saw it; filtered by
+    search_id, it shows as that search saw it.
+    """
+    query = _user_listings(db, current_user)
 
     if search_id:
-        if search_id not in user_search_ids:
+        owned = db.query(Search.id).filter(
+            Search.id == search_id,
+            Search.user_id == current_user.id
+        ).first()
+        if not owned:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="Access denied"
             )
-        query = query.filter(Listing.search_id == search_id)
+        query = query.filter(SearchListing.search_id == search_id)
+    else:
+        query = _one_per_listing(query)
 
     if marketplace:
         query = query.filter(Listing.marketplace == marketplace)
 
     if is_saved is not None:
-        query = query.filter(Listing.is_saved == is_saved)
+        query = query.filter(SearchListing.is_saved == is_saved)
 
-    listings = query.order_by(desc(Listing.created_at)).offset(skip).limit(limit).all()
-    return listings
+    rows = _page(query, response, cursor, skip, limit)
+    return [_as_seen_by(listing, link) for listing, link in rows]
 
 
 @router.get("/recent", response_model=List[ListingSchema])
 def get_recent_listings(
+    response: Response,
     hours: int = Query(24, ge=1, le=168),
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: User = Depends(get_current_active_user),
+    cursor: Optional[str] = None,
+    skip: int = 0,
+    limit: int = Query(100, ge=1, le=500)
 ) -> Any:
     """Get recent listings from the last N hours"""
-    user_search_ids = db.query(Search.id).filter(
-        Search.user_id == current_user.id
-    ).all()
-    user_search_ids = [s[0] for s in user_search_ids]
-
     cutoff_time = datetime.utcnow() - timedelta(hours=hours)
 
-    listings = db.query(Listing).filter(
-        Listing.search_id.in_(user_search_ids),
-        Listing.created_at >= cutoff_time
-    ).order_by(desc(Listing.created_at)).limit(100).all()
+    query = _one_per_listing(_user_listings(db, current_user)).filter(
+        SearchListing.first_seen_at >= cutoff_time
+    )
+    rows = _page(query, response, cursor, skip, limit)
+
+    return [_as_seen_by(listing, link) for listing, link in rows]
+
 
-    return listings
+@router.get("/search", response_model=List[ListingSchema])
+def search_listings(
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=200),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user),
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=500)
+) -> Any:
+    """Full-text search over the user's listings' titles and descriptions, best match first"""
+    matches = listing_matches(db, q)
+    if matches is None:
+        return []
+
+    query = _one_per_listing(_user_listings(db, current_user)).join(
+        matches, matches.c.listing_id == Listing.id
+    ).add_columns(matches.c.relevance)
+    rows = paginate(
+        query, response, matches.c.relevance, SearchListing.id,
+        key=lambda row: (row.relevance, row[1].id),
+        cursor=cursor, limit=limit
+    )
+    return [_as_seen_by(listing, link) for listing, link, _ in rows]
+
+
+@router.get("/saved", response_model=List[ListingSchema])
+def get_saved_listings(
+    response: Response,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user),
+    cursor: Optional[str] = None,
+    skip: int = 0,
+    limit: int = Query(100, ge=1, le=500)
+) -> Any:
+    """Get saved listings for current user"""
+    query = _one_per_listing(_user_listings(db, current_user)).filter(
+        SearchListing.is_saved.is_(True)
+    )
+    rows = _page(query, response, cursor, skip, limit)
+
+    return [_as_seen_by(listing, link) for listing, link in rows]
 
 
 @router.get("/{listing_id}", response_model=ListingSchema)
@@ -80,27 +192,8 @@ def get_listing(
     current_user: User = Depends(get_current_active_user)
 ) -> Any:
     """Get specific listing by ID"""
-    listing = db.query(Listing).filter(Listing.id == listing_id).first()
-
-    if not listing:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Listing not found"
-        )
-
-    # Verify user has access to this listing
-    search = db.query(Search).filter(
-        Search.id == listing.search_id,
-        Search.user_id == current_user.id
-    ).first()
-
-    if not search:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Access denied"
-        )
-
-    return listing
+    listing, link = _user_listing(db, current_user, listing_id)[0]
+    return _as_seen_by(listing, link)
 
 
 @router.patch("/{listing_id}", response_model=ListingSchema)
@@ -111,50 +204,27 @@ def update_listing(
     current_user: User = Depends(get_current_active_user)
 ) -> Any:
     """Update listing (e.g., toggle saved status)"""
-    listing = db.query(Listing).filter(Listing.id == listing_id).first()
-
-    if not listing:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Listing not found"
-        )
-
-    # Verify access
-    search = db.query(Search).filter(
-        Search.id == listing.search_id,
-        Search.user_id == current_user.id
-    ).first()
-
-    if not search:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Access denied"
-        )
+    rows = _user_listing(db, current_user, listing_id)
+    listing = rows[0][0]
 
+    # Saving is per user: it applies to the user's own searches' links
     update_data = listing_in.model_dump(exclude_unset=True)
-    for field, value in update_data.items():
-        setattr(listing, field, value)
+    if "is_saved" in update_data:
+        was_saved = any(link.is_saved for _, link in rows)
+        adjust_user_stats(
+            db, current_user.id,
+            saved_listings=int(bool(update_data["is_saved"])) - int(was_saved)
+        )
+        for _, link in rows:
+            link.is_saved = update_data["is_saved"]
+        db.flush()
+        # The listing itself stays saved while any search has it saved
+        listing.is_saved = db.query(SearchListing.id).filter(
+            SearchListing.listing_id == listing.id,
+            SearchListing.is_saved.is_(True)
+        ).first() is not None
 
     db.commit()
     db.refresh(listing)
 
-    return listing
-
-
-@router.get("/saved", response_model=List[ListingSchema])
-def get_saved_listings(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
-) -> Any:
-    """Get all saved listings for current user"""
-    user_search_ids = db.query(Search.id).filter(
-        Search.user_id == current_user.id
-    ).all()
-    user_search_ids = [s[0] for s in user_search_ids]
-
-    listings = db.query(Listing).filter(
-        Listing.search_id.in_(user_search_ids),
-        Listing.is_saved == True
-    ).order_by(desc(Listing.created_at)).all()
-
-    return listings
+    return _as_seen_by(listing, rows[0][1])
@@ -1,15 +1,26 @@
 # app/api/v1/monitoring.py
 
-from typing import Any, Dict
-from fastapi import APIRouter, Depends
+from typing import Any, Dict, List, Optional
+import asyncio
+from fastapi import APIRouter, Depends, Query
 from sqlalchemy.orm import Session
 from sqlalchemy import func, text
 from datetime import datetime, timedelta
 import psutil
 
 from app.database import get_db, get_redis, engine
-from app.models import Search, Listing, TaskLog, SearchStatus
-from app.core.monitoring import metrics_endpoint, active_searches, database_connections
+from app.models import Search, Listing, SearchStatus, Marketplace, TaskLogRollup, User
+from app.schemas import TaskRollup
+from app.api.deps import get_current_superuser
+from app.core.monitoring import (
+    metrics_endpoint,
+    active_searches,
+    database_connections,
+    track_circuit_state,
+)
+from app.core.resilience import CIRCUIT_CLOSED, marketplace_breaker
+from app.core.task_logs import ALL_MARKETPLACES, failed_tasks_since, hour_start, task_log_sink
+from app.tasks.queues import refresh_queue_metrics
 
 router = APIRouter()
 
@@ -17,6 +28,8 @@ router = APIRouter()
 @router.get("/metrics")
 async def get_metrics():
     """Prometheus metrics endpoint"""
+    # Queue metrics live in the broker and Redis, not in this process
+    await asyncio.to_thread(refresh_queue_metrics)
     return metrics_endpoint()
 
 
@@ -30,6 +43,7 @@ async def detailed_health_check(db: Session = Depends(get_db)) -> Dict[str, Any]
     - Database connectivity
     - Redis connectivity
     - Celery workers
+    - Marketplace circuit breakers
     - System resources
     """
     health_status = {
@@ -97,6 +111,25 @@ async def detailed_health_check(db: Session = Depends(get_db)) -> Dict[str, Any]
             "error": str(e)
         }
 
+    # Marketplace circuit breakers
+    try:
+        circuits = marketplace_breaker.states(marketplace.value for marketplace in Marketplace)
+        for marketplace, state in circuits.items():
+            track_circuit_state(marketplace, state, transition=False)
+
+        tripped = [marketplace for marketplace, state in circuits.items() if state != CIRCUIT_CLOSED]
+        health_status["components"]["marketplaces"] = {
+            "status": "degraded" if tripped else "healthy",
+            "circuits": circuits
+        }
+        if tripped and health_status["status"] == "healthy":
+            health_status["status"] = "degraded"
+    except Exception as e:
+        health_status["components"]["marketplaces"] = {
+            "status": "unknown",
+            "error": str(e)
+        }
+
     # System resources
     try:
         cpu_percent = psutil.cpu_percent(interval=1)
@@ -130,16 +163,16 @@ async def detailed_health_check(db: Session = Depends(get_db)) -> Dict[str, Any]
             Listing.created_at >= datetime.utcnow() - timedelta(hours=24)
         ).scalar()
 
-        failed_tasks = db.query(func.count(TaskLog.id)).filter(
-            TaskLog.status == "failed",
-            TaskLog.created_at >= datetime.utcnow() - timedelta(hours=1)
-        ).scalar()
+        # Exactly the last hour; rolled-up hours don't rescan raw task logs
+        failed_tasks = failed_tasks_since(db, datetime.utcnow() - timedelta(hours=1))
 
         health_status["components"]["application"] = {
             "status": "healthy",
             "active_searches": active_search_count,
             "listings_last_24h": recent_listings,
-            "failed_tasks_last_hour": failed_tasks
+            "failed_tasks_last_hour": failed_tasks,
+            # Task logs buffered but not yet written (TASK_LOG_SINK=redis)
+            "task_logs_pending": task_log_sink.backlog()
         }
 
         active_searches.set(active_search_count)
@@ -158,6 +191,24 @@ async def detailed_health_check(db: Session = Depends(get_db)) -> Dict[str, Any]
     return health_status
 
 
+@router.get("/tasks", response_model=List[TaskRollup])
+def get_task_rollups(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_superuser),
+    hours: int = Query(24, ge=1, le=24 * 90),
+    task_name: Optional[str] = None,
+    marketplace: str = ALL_MARKETPLACES
+) -> Any:
+    """Hourly task statistics for dashboards, newest first"""
+    query = db.query(TaskLogRollup).filter(
+        TaskLogRollup.marketplace == marketplace,
+        TaskLogRollup.hour >= hour_start(datetime.utcnow() - timedelta(hours=hours - 1))
+    )
+    if task_name:
+        query = query.filter(TaskLogRollup.task_name == task_name)
+    return query.order_by(TaskLogRollup.hour.desc(), TaskLogRollup.task_name).all()
+
+
 @router.get("/health/ready")
 async def readiness_check(db: Session = Depends(get_db)) -> Dict[str, Any]:
     """
@@ -1,13 +1,11 @@
 # app/api/v1/searches.py
 
 from typing import Any, Optional, List
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, Response, status, Query
 from sqlalchemy.orm import Session
-from sqlalchemy import func
-from datetime import datetime
 
 from app.database import get_db
-from app.models import User, Search, Listing, SearchStatus
+from app.models import User, Search, SearchStatus
 from app.schemas import (
     SearchCreate,
     SearchUpdate,
@@ -15,22 +13,29 @@ from app.schemas import (
     Message
 )
 from app.api.deps import get_current_active_user
+from app.api.pagination import paginate
+from app.core.scheduling import search_scheduler
+from app.core.user_stats import adjust_user_stats, record_search_removed
 
 router = APIRouter()
 
 
 @router.get("", response_model=List[SearchSchema])
 def get_searches(
+    response: Response,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user),
+    cursor: Optional[str] = None,
     skip: int = 0,
-    limit: int = 100
+    limit: int = Query(100, ge=1, le=500)
 ) -> Any:
-    """Get all searches for current user"""
-    searches = db.query(Search).filter(
-        Search.user_id == current_user.id
-    ).offset(skip).limit(limit).all()
-    return searches
+    """Get searches for current user, newest first"""
+    query = db.query(Search).filter(Search.user_id == current_user.id)
+    return paginate(
+        query, response, Search.created_at, Search.id,
+        key=lambda search: (search.created_at, search.id),
+        cursor=cursor, skip=skip, limit=limit
+    )
 
 
 @router.get("/{search_id}", response_model=SearchSchema)
@@ -67,8 +72,15 @@ def create_search(
     )
 
     db.add(search)
+    db.flush()
+    adjust_user_stats(
+        db, current_user.id,
+        total_searches=1,
+        active_searches=int(search.status == SearchStatus.ACTIVE)
+    )
     db.commit()
     db.refresh(search)
+    search_scheduler.update(search)
 
     return search
 
@@ -92,12 +104,22 @@ def update_search(
             detail="Search not found"
         )
 
+    was_active = search.status == SearchStatus.ACTIVE
     update_data = search_in.model_dump(exclude_unset=True)
     for field, value in update_data.items():
         setattr(search, field, value)
+    adjust_user_stats(
+        db, current_user.id,
+        active_searches=int(search.status == SearchStatus.ACTIVE) - int(was_active)
+    )
+
+    # A new interval (or reactivation) moves the next scheduled run
+    if {"check_interval_minutes", "status"} & update_data.keys():
+        search.schedule_next_run()
 
     db.commit()
     db.refresh(search)
+    search_scheduler.update(search)
 
     return search
 
@@ -120,8 +142,10 @@ def delete_search(
             detail="Search not found"
         )
 
+    record_search_removed(db, search)
     db.delete(search)
     db.commit()
+    search_scheduler.unschedule(search_id)
 
     return {"message": "Search deleted successfully"}
 
@@ -144,8 +168,8 @@ def trigger_search(
             detail="Search not found"
         )
 
-    # TODO: Trigger Celery task
-    # from app.tasks.scraping import run_search_task
-    # task = run_search_task.delay(search.id)
+    # A run already in progress absorbs this one (see run_search_task)
+    from app.tasks.scraping import run_search_task
+    run_search_task.delay(search.id)
 
     return {"message": "Search triggered successfully"}
@@ -1,7 +1,7 @@
 # app/config.py
 
 from pydantic_settings import BaseSettings
-from typing import List
+from typing import Dict, List
 from functools import lru_cache
 
 
@@ -38,15 +38,20 @@ class Settings(BaseSettings):
     CORS_ORIGINS: str = "http://localhost:3000"
     CORS_ALLOW_CREDENTIALS: bool = True
 
-    @property
-    def cors_origins_list(self) -> List[str]:
-        return [origin.strip() for origin in self.CORS_ORIGINS.split(",")]
-
     # Celery
     CELERY_BROKER_URL: str
     CELERY_RESULT_BACKEND: str
     CELERY_TASK_ALWAYS_EAGER: bool = False
 
+    # Worker profiles (python -m app.tasks.worker <queue>)
+    CELERY_SCRAPE_POOL: str = "threads"  # threads or gevent (needs the gevent package)
+    CELERY_SCRAPE_CONCURRENCY: int = 50
+    CELERY_SCRAPE_PREFETCH: int = 4
+    CELERY_ALERTS_CONCURRENCY: int = 10
+    CELERY_ALERTS_PREFETCH: int = 4
+    CELERY_MAINTENANCE_CONCURRENCY: int = 2
+    CELERY_MAINTENANCE_PREFETCH: int = 1
+
     # Email
     SMTP_HOST: str = "smtp.gmail.com"
     SMTP_PORT: int = 587
@@ -66,11 +71,65 @@ class Settings(BaseSettings):
     RATE_LIMIT_PER_MINUTE: int = 60
     RATE_LIMIT_PER_HOUR: int = 1000
 
+    # Scheduling
+    SEARCH_SCHEDULER: str = "redis"  # "redis" (scheduler service) or "beat" (15-minute database poll)
+    SCHEDULER_BATCH_SIZE: int = 500  # Due searches claimed per query
+    SCHEDULER_RETRY_SECONDS: int = 900  # Dispatched searches that never finish are retried after this
+    SCHEDULER_MAX_SLEEP_SECONDS: float = 1.0  # Longest pause between scheduler passes
+    SEARCH_RUN_LOCK_TTL: int = 120  # Lease of a running search's lock, renewed while it runs
+    SEARCH_RUN_FOLLOW_UP: bool = True  # A duplicate dispatch queues one more run after the current one
+
+    # Task logs
+    TASK_LOG_SINK: str = "redis"  # "redis" (buffered in a stream, written in batches) or "database" (written inline)
+    TASK_LOG_FLUSH_SECONDS: float = 5.0  # How often buffered task logs are written
+    TASK_LOG_FLUSH_BATCH_SIZE: int = 500  # Buffered task logs written per transaction
+    TASK_LOG_CLAIM_IDLE_SECONDS: int = 60  # Logs a crashed flush read but never wrote are retried after this
+    TASK_LOG_STREAM_MAXLEN: int = 100000  # Cap on buffered task logs if flushing stops
+    TASK_LOG_ROLLUP_LOOKBACK_HOURS: int = 2  # Recent hours re-summarized on each rollup, for late-finishing tasks
+    TASK_LOG_RETENTION_DAYS: int = 7  # Raw task logs older than this are deleted once summarized
+
+    # Dashboard
+    USER_STATS_RECONCILE_BATCH_SIZE: int = 500  # Users whose dashboard counters are recomputed per transaction
+
+    # Listing retention
+    LISTING_RETENTION_DAYS: int = 30  # Listings older than this are cleaned up
+    LISTING_RETENTION_DAYS_BY_TIER: str = ""  # Per-tier overrides, e.g. "free:14,business:90"
+    RETENTION_BATCH_SIZE: int = 2000  # Listings deleted per transaction
+    RETENTION_BATCH_PAUSE_SECONDS: float = 0.2  # Pause between batches to let replicas catch up
+    RETENTION_MAX_RUNTIME_SECONDS: int = 1200  # Stop (and resume on the next run) well within the task time limit
+    LISTINGS_PARTITIONED: bool = False  # PostgreSQL only; must match the partition_listings migration
+    LISTINGS_PARTITION_WEEKS_AHEAD: int = 4  # Weekly listings partitions created in advance
+
     # Scraping
+    SEEN_FILTER_ENABLED: bool = True  # Skip DB dedup for listings Redis knows are stored
+    SEEN_FILTER_VERIFY_RATE: float = 0.01  # Share of filter hits double-checked against the DB
     SCRAPING_USER_AGENT: str = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
     SCRAPING_TIMEOUT: int = 30
     SCRAPING_MAX_RETRIES: int = 3
-    SCRAPING_DELAY_SECONDS: int = 2
+    SCRAPING_DELAY_SECONDS: int = 2  # Fallback delay when the rate limiter is unavailable
+    SCRAPING_RATE_LIMIT_PER_MINUTE: int = 30  # Per marketplace host, across all workers
+    SCRAPING_RATE_LIMIT_BURST: int = 1
+    SCRAPING_RATE_LIMIT_MAX_WAIT: int = 30  # Give up instead of queueing longer than this
+    SCRAPING_COALESCE_TTL: int = 600  # How long identical queries reuse one fetch
+    SCRAPING_COALESCE_WAIT: int = 20  # Max wait for an in-flight fetch of the same query
+    SCRAPING_PARSER_BACKEND: str = "lxml"  # lxml, selectolax (optional) or html.parser
+    SCRAPING_FINGERPRINT_TTL: int = 7 * 24 * 3600  # Forget page fingerprints of idle searches
+    SCRAPING_MARKETPLACE_TIMEOUT: int = 60  # Per-marketplace budget within one search run
+    SCRAPING_MAX_PAGES: int = 5  # Deepest results page fetched per marketplace
+    SCRAPING_STOP_AFTER_KNOWN: int = 3  # Consecutive already-stored listings that end paging
+    SCRAPING_KNOWN_IDS_LIMIT: int = 500  # Recent external IDs per search checked for early stop
+    SCRAPING_RETRY_BACKOFF_BASE: float = 1.0  # First retry waits up to this long, doubling after
+    SCRAPING_RETRY_BACKOFF_MAX: float = 30.0
+    SCRAPING_BREAKER_FAILURE_THRESHOLD: int = 5  # Consecutive failed fetches that open a circuit
+    SCRAPING_BREAKER_RECOVERY_SECONDS: int = 120  # How long an open circuit fast-fails before probing
+    SCRAPING_FANOUT: bool = False  # Run each marketplace of a search as its own task
+    SCRAPING_MARKETPLACE_QUEUES: str = ""  # Fan-out queue per marketplace, e.g. "facebook:scrape.facebook"
+
+    # Outbound HTTP connection pool (per worker process)
+    HTTP_POOL_MAX_CONNECTIONS: int = 100
+    HTTP_POOL_MAX_KEEPALIVE: int = 20
+    HTTP_POOL_KEEPALIVE_EXPIRY: float = 30.0
+    HTTP_HTTP2_ENABLED: bool = False  # Requires the optional 'h2' package
 
     # Marketplace API Keys
     EBAY_APP_ID: str = ""
@@ -82,6 +141,20 @@ class Settings(BaseSettings):
     LOG_LEVEL: str = "INFO"
     LOG_FORMAT: str = "json"
 
+    @property
+    def cors_origins_list(self) -> List[str]:
+        return [origin.strip() for origin in self.CORS_ORIGINS.split(",")]
+
+    @property
+    def retention_days_by_tier(self) -> Dict[str, int]:
+        pairs = (item.split(":", 1) for item in self.LISTING_RETENTION_DAYS_BY_TIER.split(",") if ":" in item)
+        return {tier.strip(): int(days) for tier, days in pairs}
+
+    @property
+    def marketplace_queues(self) -> Dict[str, str]:
+        pairs = (item.split(":", 1) for item in self.SCRAPING_MARKETPLACE_QUEUES.split(",") if ":" in item)
+        return {marketplace.strip(): queue.strip() for marketplace, queue in pairs}
+
     class Config:
         env_file = ".env"
         case_sensitive = True
@@ -0,0 +1,97 @@
+# app/core/fulltext.py
+
+from typing import Optional
+
+from sqlalchemy import DDL, Float, Table, cast, column, event, func, literal_column, select, table, text
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import Subquery
+
+# Text search configuration for stemming and stop words
+SEARCH_CONFIG = "english"
+
+# The listing search index lives next to the listings table and is kept
+# up to date by the database on every insert, update and delete:
+# PostgreSQL gets a generated tsvector column (title weighted above
+# description) with a GIN index, SQLite an external-content FTS5 table
+# synced by triggers
+LISTING_SEARCH_DDL = {
+    "postgresql": (
+        "ALTER TABLE listings ADD COLUMN search_vector tsvector GENERATED ALWAYS AS ("
+        f"setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(title, '')), 'A') || "
+        f"setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(description, '')), 'B')"
+        ") STORED",
+        "CREATE INDEX idx_listings_search_vector ON listings USING GIN (search_vector)",
+    ),
+    "sqlite": (
+        "CREATE VIRTUAL TABLE IF NOT EXISTS listings_fts USING fts5("
+        "title, description, content='listings', content_rowid='id', tokenize='porter')",
+        "CREATE TRIGGER IF NOT EXISTS listings_fts_insert AFTER INSERT ON listings BEGIN "
+        "INSERT INTO listings_fts (rowid, title, description) VALUES (new.id, new.title, new.description); "
+        "END",
+        "CREATE TRIGGER IF NOT EXISTS listings_fts_delete AFTER DELETE ON listings BEGIN "
+        "INSERT INTO listings_fts (listings_fts, rowid, title, description) "
+        "VALUES ('delete', old.id, old.title, old.description); "
+        "END",
+        "CREATE TRIGGER IF NOT EXISTS listings_fts_update AFTER UPDATE OF title, description ON listings BEGIN "
+        "INSERT INTO listings_fts (listings_fts, rowid, title, description) "
+        "VALUES ('delete', old.id, old.title, old.description); "
+        "INSERT INTO listings_fts (rowid, title, description) VALUES (new.id, new.title, new.description); "
+        "END",
+    ),
+}
+
+# Dropped along with the listings table (the triggers go by themselves)
+LISTING_SEARCH_DROP_DDL = {
+    "sqlite": ("DROP TABLE IF EXISTS listings_fts",),
+}
+
+
+def attach_listing_search(listings: Table) -> None:
+    """Create (and drop) the listing search index along with the listings table"""
+    for dialect, statements in LISTING_SEARCH_DDL.items():
+        for statement in statements:
+            event.listen(listings, "after_create", DDL(statement).execute_if(dialect=dialect))
+    for dialect, statements in LISTING_SEARCH_DROP_DDL.items():
+        for statement in statements:
+            event.listen(listings, "after_drop", DDL(statement).execute_if(dialect=dialect))
+
+
+def _fts5_query(q: str) -> str:
+    """Terms of a user query as FTS5 phrases, so its syntax characters are matched literally"""
+    return " ".join('"' + term.replace('"', '""') + '"' for term in q.split())
+
+
+def listing_matches(db: Session, q: str) -> Optional[Subquery]:
+    """
+    Listings matching a search query, with their relevance.
+
+    Terms are stemmed and all have to match; on PostgreSQL the query
+    follows web search syntax ("quoted phrases", -excluded, or).
+
+    Args:
+        db: Database session
+        q: Search query as typed by the user
+
+    Returns:
+        Subquery of (listing_id, relevance), most relevant highest, or None if `q`
+        has no terms
+    """
+    if not q.split():
+        return None
+
+    if db.get_bind().dialect.name == "postgresql":
+        listings = table("listings", column("id"), column("search_vector"))
+        query = func.websearch_to_tsquery(literal_column(f"'{SEARCH_CONFIG}'"), q)
+        # ts_rank is a real; as double precision it round-trips through the cursor exactly
+        return select(
+            listings.c.id.label("listing_id"),
+            cast(func.ts_rank(listings.c.search_vector, query), Float(53)).label("relevance")
+        ).where(listings.c.search_vector.op("@@")(query)).subquery("matches")
+
+    # bm25() scores better matches lower; titles count more than descriptions
+    return select(
+        literal_column("rowid").label("listing_id"),
+        (-func.bm25(literal_column("listings_fts"), 1.0, 0.4)).label("relevance")
+    ).select_from(text("listings_fts")).where(
+        literal_column("listings_fts").op("MATCH")(_fts5_query(q))
+    ).subquery("matches")
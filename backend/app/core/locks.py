@@ -0,0 +1,151 @@
+# app/core/locks.py
+
+import logging
+import secrets
+import threading
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+from redis import Redis
+from redis.exceptions import RedisError
+
+from app.config import settings
+from app.database import redis_client
+
+logger = logging.getLogger(__name__)
+
+# Extend the lease only while we still hold it
+#
+# KEYS[1]: lock key
+# ARGV[1]: holder token
+# ARGV[2]: lease length in milliseconds
+# Returns: 1 if renewed, 0 if the lease was lost
+RENEW_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('PEXPIRE', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+# Release the lock only if we still hold it
+#
+# KEYS[1]: lock key
+# ARGV[1]: holder token
+# Returns: 1 if released, 0 if someone else holds it now
+RELEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+class LeaseLock:
+    """
+    Redis lease lock with an optional follow-up request.
+
+    The holder renews its lease while working, so a crashed holder frees
+    the lock within one lease. Callers that find the lock taken can ask
+    for one follow-up run instead of running concurrently; the holder
+    takes that request when it finishes.
+    """
+
+    def __init__(
+        self,
+        redis: Optional[Redis] = None,
+        ttl: Optional[int] = None,
+        prefix: str = "lock",
+        follow_up_ttl: int = 3600,
+    ):
+        self.redis = redis or redis_client
+        self.ttl = ttl or settings.SEARCH_RUN_LOCK_TTL
+        self.prefix = prefix
+        self.follow_up_ttl = follow_up_ttl
+        self._renew = None
+        self._release = None
+
+    def _key(self, name) -> str:
+        return f"{self.prefix}:{name}"
+
+    def acquire(self, name) -> Optional[str]:
+        """
+        Take the lock.
+
+        Args:
+            name: Lock name, e.g. a search ID
+
+        Returns:
+            Holder token, or None if someone else holds the lock. Without
+            Redis we can't coordinate, so the caller gets a token anyway.
+        """
+        token = secrets.token_hex(16)
+        try:
+            if self.redis.set(self._key(name), token, nx=True, px=self.ttl * 1000):
+                return token
+            return None
+        except RedisError as e:
+            logger.warning(f"Lock {self._key(name)} unavailable, proceeding unlocked: {e}")
+            return token
+
+    def renew(self, name, token: str, ttl: Optional[int] = None) -> bool:
+        """Extend the lease (by `ttl` seconds, default one lease); False once it has been lost"""
+        try:
+            if self._renew is None:
+                self._renew = self.redis.register_script(RENEW_SCRIPT)
+            return bool(self._renew(keys=[self._key(name)], args=[token, (ttl or self.ttl) * 1000]))
+        except RedisError as e:
+            logger.warning(f"Could not renew lock {self._key(name)}: {e}")
+            return True
+
+    def release(self, name, token: str) -> bool:
+        """Give the lock up if we still hold it"""
+        try:
+            if self._release is None:
+                self._release = self.redis.register_script(RELEASE_SCRIPT)
+            return bool(self._release(keys=[self._key(name)], args=[token]))
+        except RedisError as e:
+            logger.warning(f"Could not release lock {self._key(name)}: {e}")
+            return False
+
+    def request_follow_up(self, name) -> bool:
+        """
+        Ask the current holder to run once more when it is done.
+
+        Returns:
+            True if this call queued the follow-up, False if one was already queued
+        """
+        try:
+            return bool(self.redis.set(f"{self._key(name)}:follow-up", "1", nx=True, ex=self.follow_up_ttl))
+        except RedisError as e:
+            logger.warning(f"Could not request follow-up for {self._key(name)}: {e}")
+            return False
+
+    def take_follow_up(self, name) -> bool:
+        """Consume a pending follow-up request"""
+        try:
+            return bool(self.redis.delete(f"{self._key(name)}:follow-up"))
+        except RedisError:
+            return False
+
+    @contextmanager
+    def keep_alive(self, name, token: str) -> Iterator[None]:
+        """Renew the lease in the background every third of it while the block runs"""
+        stop = threading.Event()
+
+        def renew() -> None:
+            while not stop.wait(self.ttl / 3):
+                if not self.renew(name, token):
+                    logger.warning(f"Lost lock {self._key(name)} while holding it")
+                    return
+
+        thread = threading.Thread(target=renew, name=f"lease-{self._key(name)}", daemon=True)
+        thread.start()
+        try:
+            yield
+        finally:
+            stop.set()
+            thread.join()
+
+
+# Shared per-search run lock
+search_run_lock = LeaseLock(prefix="lock:search-run")
@@ -5,11 +5,12 @@ from sentry_sdk.integrations.fastapi import FastApiIntegration
 from sentry_sdk.integrations.sqlalchemy import SqlalchemyIntegration
 from sentry_sdk.integrations.redis import RedisIntegration
 from sentry_sdk.integrations.celery import CeleryIntegration
-from prometheus_client import Counter, Histogram, Gauge, generate_latest, CONTENT_TYPE_LATEST
+from prometheus_client import Counter, Histogram, Gauge, generate_latest, CONTENT_TYPE_LATEST, REGISTRY
+from prometheus_client.core import CounterMetricFamily
 from fastapi import Response
 import time
 from functools import wraps
-from typing import Callable
+from typing import Callable, Dict, Tuple
 import logging
 
 from app.config import settings
@@ -53,6 +54,127 @@ marketplace_listings_scraped = Counter(
     ['marketplace']
 )
 
+scraping_rate_limit_wait_seconds = Histogram(
+    'scraping_rate_limit_wait_seconds',
+    'Time spent waiting for a marketplace rate limit slot',
+    ['host'],
+    buckets=(0, 0.1, 0.5, 1, 2.5, 5, 10, 30, 60)
+)
+
+marketplace_coalesced_scrapes = Counter(
+    'marketplace_coalesced_scrapes_total',
+    'Marketplace queries by coalescing outcome (hit, waited, miss)',
+    ['marketplace', 'result']
+)
+
+marketplace_fetch_retries = Counter(
+    'marketplace_fetch_retries_total',
+    'Marketplace page fetches retried after a transient error',
+    ['marketplace']
+)
+
+marketplace_circuit_state = Gauge(
+    'marketplace_circuit_state',
+    'Marketplace circuit breaker state (0 closed, 1 half-open, 2 open)',
+    ['marketplace']
+)
+
+marketplace_circuit_transitions = Counter(
+    'marketplace_circuit_transitions_total',
+    'Marketplace circuit breaker state changes',
+    ['marketplace', 'state']
+)
+
+seen_filter_checks = Counter(
+    'seen_filter_checks_total',
+    'Scraped listings checked against the seen filter (hit, miss, false_positive)',
+    ['marketplace', 'result']
+)
+
+celery_queue_depth = Gauge(
+    'celery_queue_depth',
+    'Messages waiting in a Celery queue',
+    ['queue']
+)
+
+
+class QueueWaitCollector:
+    """
+    Fleet-wide queue wait totals, exported as counters.
+
+    The totals are summed in Redis by every worker, so they are set here
+    as read rather than incremented; a plain Counter can't do that, and a
+    Gauge would make rate() over them invalid.
+    """
+
+    def __init__(self):
+        self.totals: Dict[str, Tuple[float, int]] = {}
+
+    def collect(self):
+        wait_seconds = CounterMetricFamily(
+            'celery_queue_wait_seconds',
+            'Total time tasks waited in a queue before starting (fleet-wide)',
+            labels=['queue']
+        )
+        started = CounterMetricFamily(
+            'celery_queue_tasks_started',
+            'Tasks started from a queue (fleet-wide)',
+            labels=['queue']
+        )
+        for queue, (seconds, count) in sorted(self.totals.items()):
+            wait_seconds.add_metric([queue], seconds)
+            started.add_metric([queue], count)
+        yield wait_seconds
+        yield started
+
+
+celery_queue_waits = QueueWaitCollector()
+REGISTRY.register(celery_queue_waits)
+
+retention_deleted = Counter(
+    'listings_retention_deleted_total',
+    'Search listings retired by retention, per subscription tier',
+    ['tier']
+)
+
+retention_batch_seconds = Histogram(
+    'listings_retention_batch_seconds',
+    'Duration of one retention delete batch'
+)
+
+retention_throughput = Gauge(
+    'listings_retention_rows_per_second',
+    'Delete throughput of the last retention run'
+)
+
+listings_partition_changes = Counter(
+    'listings_partition_changes_total',
+    'Weekly listings partitions created or dropped',
+    ['action']
+)
+
+search_runs_deduplicated = Counter(
+    'search_runs_deduplicated_total',
+    'Search runs avoided because the search was already running (collapsed, follow_up)',
+    ['outcome']
+)
+
+scheduler_dispatch_lag = Histogram(
+    'scheduler_dispatch_lag_seconds',
+    'Delay between a search falling due and its dispatch',
+    buckets=(0.1, 0.5, 1, 2, 5, 15, 30, 60, 300, 900)
+)
+
+scheduler_queue_size = Gauge(
+    'scheduler_queue_size',
+    'Searches waiting in the scheduler queue'
+)
+
+scheduler_overdue = Gauge(
+    'scheduler_overdue_seconds',
+    'How long the most overdue queued search has been due'
+)
+
 active_searches = Gauge(
     'active_searches_total',
     'Number of active searches'
@@ -116,6 +238,12 @@ def track_celery_task(task_name: str, status: str, duration: float) -> None:
     celery_task_duration_seconds.labels(task_name=task_name).observe(duration)
 
 
+def track_queue_stats(queue: str, depth: int, wait_seconds: float, started: int) -> None:
+    """Track Celery queue depth and accumulated wait"""
+    celery_queue_depth.labels(queue=queue).set(depth)
+    celery_queue_waits.totals[queue] = (wait_seconds, started)
+
+
 def track_marketplace_scrape(marketplace: str, status: str, listings_count: int = 0) -> None:
     """Track marketplace scraping metrics"""
     marketplace_scrapes_total.labels(marketplace=marketplace, status=status).inc()
@@ -123,6 +251,69 @@ def track_marketplace_scrape(marketplace: str, status: str, listings_count: int
         marketplace_listings_scraped.labels(marketplace=marketplace).inc(listings_count)
 
 
+def track_coalesced_scrape(marketplace: str, result: str) -> None:
+    """Track whether a marketplace query reused a shared fetch"""
+    marketplace_coalesced_scrapes.labels(marketplace=marketplace, result=result).inc()
+
+
+def track_rate_limit_wait(host: str, wait_seconds: float) -> None:
+    """Track time spent waiting on the marketplace rate limiter"""
+    scraping_rate_limit_wait_seconds.labels(host=host).observe(wait_seconds)
+
+
+def track_fetch_retry(marketplace: str) -> None:
+    """Track a retried marketplace fetch"""
+    marketplace_fetch_retries.labels(marketplace=marketplace).inc()
+
+
+CIRCUIT_STATE_VALUES = {"closed": 0, "half_open": 1, "open": 2}
+
+
+def track_circuit_state(marketplace: str, state: str, transition: bool = True) -> None:
+    """Track a marketplace circuit breaker state (and count it as a change)"""
+    marketplace_circuit_state.labels(marketplace=marketplace).set(CIRCUIT_STATE_VALUES[state])
+    if transition:
+        marketplace_circuit_transitions.labels(marketplace=marketplace, state=state).inc()
+
+
+def track_seen_filter(marketplace: str, result: str, count: int = 1) -> None:
+    """Track seen filter lookups"""
+    if count > 0:
+        seen_filter_checks.labels(marketplace=marketplace, result=result).inc(count)
+
+
+def track_retention_batch(tier: str, deleted: int, duration: float) -> None:
+    """Track one retention delete batch"""
+    retention_deleted.labels(tier=tier).inc(deleted)
+    retention_batch_seconds.observe(duration)
+
+
+def track_retention_run(deleted: int, duration: float) -> None:
+    """Track a finished retention run"""
+    retention_throughput.set(deleted / duration if duration > 0 else 0)
+
+
+def track_partition_change(action: str) -> None:
+    """Track a listings partition being created or dropped"""
+    listings_partition_changes.labels(action=action).inc()
+
+
+def track_duplicate_run(outcome: str) -> None:
+    """Track a duplicate search run that was avoided"""
+    search_runs_deduplicated.labels(outcome=outcome).inc()
+
+
+def track_scheduler_dispatch(lag: float) -> None:
+    """Track a search dispatched by the scheduler"""
+    scheduler_dispatch_lag.observe(lag)
+
+
+def track_scheduler_queue(size: int, overdue: float) -> None:
+    """Track scheduler queue size and lag"""
+    scheduler_queue_size.set(size)
+    scheduler_overdue.set(overdue)
+
+
 def metrics_endpoint() -> Response:
     """Endpoint to expose Prometheus metrics"""
     return Response(content=generate_latest(), media_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,143 @@
+# app/core/partitions.py
+
+from datetime import date, datetime, timedelta
+from typing import List, Optional
+import logging
+
+from sqlalchemy import Column, DateTime, MetaData, String, Table, text
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import func
+
+from app.core.monitoring import track_partition_change
+from app.models import Listing
+
+logger = logging.getLogger(__name__)
+
+# Partitioned layout (PostgreSQL, LISTINGS_PARTITIONED):
+#
+#   listings                  PARTITION BY LIST (is_saved)
+#   ├── listings_saved        FOR VALUES IN (true); kept until unsaved
+#   └── listings_recent       FOR VALUES IN (false) PARTITION BY RANGE (created_at)
+#       └── listings_recent_pYYYYMMDD   one per week, starting on Monday
+#
+# Saving or unsaving a listing moves it between the two branches, so
+# dropping a week's partition never removes a saved listing.
+SAVED_PARTITION = "listings_saved"
+RECENT_PARTITION = "listings_recent"
+PARTITION_PREFIX = f"{RECENT_PARTITION}_p"
+
+# A partitioned table can only enforce unique keys that include the
+# partition key, so (marketplace, external_id) uniqueness is kept in this
+# narrow, unpartitioned table instead
+listing_keys = Table(
+    "listing_keys",
+    MetaData(),
+    Column("marketplace", Listing.__table__.c.marketplace.type, primary_key=True),
+    Column("external_id", String(255), primary_key=True),
+    Column("created_at", DateTime(timezone=True), server_default=func.now()),
+)
+
+
+def week_start(day: date) -> date:
+    """Monday of the week `day` falls in"""
+    return day - timedelta(days=day.weekday())
+
+
+def partition_name(start: date) -> str:
+    return f"{PARTITION_PREFIX}{start:%Y%m%d}"
+
+
+def partition_start(name: str) -> Optional[date]:
+    """Start of a weekly partition, from its name (None for other tables)"""
+    if not name.startswith(PARTITION_PREFIX):
+        return None
+    try:
+        return datetime.strptime(name[len(PARTITION_PREFIX):], "%Y%m%d").date()
+    except ValueError:
+        return None
+
+
+def create_partition_sql(start: date) -> str:
+    """DDL for the weekly partition starting on `start`"""
+    end = start + timedelta(days=7)
+    return (
+        f"CREATE TABLE IF NOT EXISTS {partition_name(start)} PARTITION OF {RECENT_PARTITION} "
+        f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+    )
+
+
+def drop_partition_sql(name: str) -> List[str]:
+    """Statements that retire a weekly partition, its uniqueness keys and search links"""
+    return [
+        f"ALTER TABLE {RECENT_PARTITION} DETACH PARTITION {name}",
+        f"DELETE FROM listing_keys k USING {name} p "
+        f"WHERE k.marketplace = p.marketplace AND k.external_id = p.external_id",
+        f"DELETE FROM search_listings s USING {name} p WHERE s.listing_id = p.id",
+        f"DROP TABLE {name}",
+    ]
+
+
+def list_partitions(db: Session) -> List[str]:
+    """Names of the weekly partitions, oldest first"""
+    rows = db.execute(text(
+        "SELECT child.relname FROM pg_inherits "
+        "JOIN pg_class parent ON parent.oid = pg_inherits.inhparent "
+        "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+        "WHERE parent.relname = :parent ORDER BY child.relname"
+    ), {"parent": RECENT_PARTITION})
+    return [name for (name,) in rows if partition_start(name) is not None]
+
+
+def ensure_partitions(db: Session, today: date, weeks_ahead: int) -> List[str]:
+    """
+    Create weekly partitions from this week through `weeks_ahead` weeks ahead.
+
+    Args:
+        db: Database session
+        today: Current date
+        weeks_ahead: Future weeks to pre-create
+
+    Returns:
+        Names of the partitions created
+    """
+    existing = set(list_partitions(db))
+    created = []
+    first = week_start(today)
+    for week in range(weeks_ahead + 1):
+        start = first + timedelta(weeks=week)
+        if partition_name(start) in existing:
+            continue
+        db.execute(text(create_partition_sql(start)))
+        db.commit()
+        created.append(partition_name(start))
+        track_partition_change("created")
+        logger.info(f"Created listings partition {partition_name(start)}")
+    return created
+
+
+def drop_partitions_before(db: Session, cutoff: date) -> List[str]:
+    """
+    Drop weekly partitions that end on or before `cutoff`.
+
+    Each partition is detached, its keys removed from `listing_keys`, its
+    listings unlinked from their searches and the table dropped, in its
+    own transaction; no row-by-row deletes on the listings table.
+
+    Args:
+        db: Database session
+        cutoff: Oldest date whose listings must be kept
+
+    Returns:
+        Names of the dropped partitions
+    """
+    dropped = []
+    for name in list_partitions(db):
+        if partition_start(name) + timedelta(days=7) > cutoff:
+            continue
+        for statement in drop_partition_sql(name):
+            db.execute(text(statement))
+        db.commit()
+        dropped.append(name)
+        track_partition_change("dropped")
+        logger.info(f"Dropped listings partition {name}")
+    return dropped
@@ -0,0 +1,223 @@
+# app/core/persistence.py
+
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Set, Tuple
+import logging
+
+from sqlalchemy import func, literal_column, select, tuple_, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import Insert
+
+from app.config import settings
+from app.core.partitions import listing_keys
+from app.core.user_stats import record_linked
+from app.models import Listing, Marketplace, Search, SearchListing
+
+logger = logging.getLogger(__name__)
+
+# Rows per INSERT statement; keeps bound parameters well under driver limits
+UPSERT_BATCH_SIZE = 500
+
+listings_table = Listing.__table__
+links_table = SearchListing.__table__
+
+# (marketplace, external_id) -> listing ID
+ListingIds = Dict[Tuple[Marketplace, str], int]
+
+
+@dataclass
+class UpsertResult:
+    """
+    IDs of listings a bulk upsert created vs. ones that already existed.
+
+    `linked_ids` are the listings that were new to their search, whether
+    or not another search had stored them before; those are the search's
+    new listings.
+    """
+    inserted_ids: List[int] = field(default_factory=list)
+    existing_ids: List[int] = field(default_factory=list)
+    linked_ids: List[int] = field(default_factory=list)
+
+
+def _normalize_rows(rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Prepare rows for a multi-row INSERT.
+
+    Keeps only real columns, gives every row the same keys and drops
+    repeats of (marketplace, external_id), which PostgreSQL refuses to
+    upsert twice in one statement.
+    """
+    columns = {column.name for column in listings_table.columns}
+    unique: Dict[tuple, Dict[str, Any]] = {}
+    for row in rows:
+        row = {key: value for key, value in row.items() if key in columns}
+        row["marketplace"] = Marketplace(row["marketplace"])
+        unique.setdefault((row["marketplace"], row["external_id"]), row)
+
+    keys = set().union(*unique.values()) if unique else set()
+    return [{key: row.get(key) for key in keys} for row in unique.values()]
+
+
+def postgres_upsert(rows: List[Dict[str, Any]]) -> Insert:
+    """
+    Build the PostgreSQL upsert for a batch of listings.
+
+    Conflicting rows only have `scraped_at` touched so RETURNING reports
+    them too; `xmax = 0` tells freshly inserted rows from existing ones.
+    """
+    stmt = postgresql.insert(listings_table).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        constraint="uq_marketplace_external_id",
+        set_={"scraped_at": stmt.excluded.scraped_at}
+    )
+    return stmt.returning(
+        listings_table.c.id,
+        listings_table.c.marketplace,
+        listings_table.c.external_id,
+        literal_column("(xmax = 0)").label("inserted")
+    )
+
+
+def _collect(rows, ids: ListingIds, target: List[int]) -> None:
+    for row in rows:
+        ids[(Marketplace(row.marketplace), row.external_id)] = row.id
+        target.append(row.id)
+
+
+def _upsert_postgres(db: Session, rows: List[Dict[str, Any]], result: UpsertResult, ids: ListingIds) -> None:
+    for row in db.execute(postgres_upsert(rows)):
+        ids[(Marketplace(row.marketplace), row.external_id)] = row.id
+        (result.inserted_ids if row.inserted else result.existing_ids).append(row.id)
+
+
+def _upsert_partitioned(db: Session, rows: List[Dict[str, Any]], result: UpsertResult, ids: ListingIds) -> None:
+    # A partitioned listings table has no (marketplace, external_id)
+    # constraint to conflict on; claiming the key in listing_keys first
+    # decides which rows are new, even between concurrent tasks
+    keys = postgresql.insert(listing_keys).values([
+        {"marketplace": row["marketplace"], "external_id": row["external_id"]} for row in rows
+    ]).on_conflict_do_nothing().returning(listing_keys.c.marketplace, listing_keys.c.external_id)
+    claimed = {(Marketplace(marketplace), external_id) for marketplace, external_id in db.execute(keys)}
+
+    new_rows = [row for row in rows if (row["marketplace"], row["external_id"]) in claimed]
+    if new_rows:
+        inserted = db.execute(postgresql.insert(listings_table).values(new_rows).returning(
+            listings_table.c.id, listings_table.c.marketplace, listings_table.c.external_id
+        ))
+        _collect(inserted, ids, result.inserted_ids)
+
+    remaining = [
+        (row["marketplace"], row["external_id"])
+        for row in rows
+        if (row["marketplace"], row["external_id"]) not in claimed
+    ]
+    if remaining:
+        existing = db.execute(
+            update(listings_table).where(
+                tuple_(listings_table.c.marketplace, listings_table.c.external_id).in_(remaining)
+            ).values(scraped_at=func.now()).returning(
+                listings_table.c.id, listings_table.c.marketplace, listings_table.c.external_id
+            )
+        )
+        _collect(existing, ids, result.existing_ids)
+
+
+def _upsert_sqlite(db: Session, rows: List[Dict[str, Any]], result: UpsertResult, ids: ListingIds) -> None:
+    # SQLite can't tell inserted from updated rows in RETURNING, so insert
+    # the new ones and look up the rest
+    stmt = sqlite.insert(listings_table).values(rows).on_conflict_do_nothing(
+        index_elements=["marketplace", "external_id"]
+    ).returning(listings_table.c.id, listings_table.c.marketplace, listings_table.c.external_id)
+
+    inserted = set()
+    for row in db.execute(stmt):
+        ids[(Marketplace(row.marketplace), row.external_id)] = row.id
+        result.inserted_ids.append(row.id)
+        inserted.add((row.marketplace, row.external_id))
+
+    remaining = [
+        (row["marketplace"], row["external_id"])
+        for row in rows
+        if (row["marketplace"], row["external_id"]) not in inserted
+    ]
+    if remaining:
+        existing = db.execute(
+            select(listings_table.c.id, listings_table.c.marketplace, listings_table.c.external_id).where(
+                tuple_(listings_table.c.marketplace, listings_table.c.external_id).in_(remaining)
+            )
+        )
+        _collect(existing, ids, result.existing_ids)
+
+
+def _link_listings(db: Session, links: List[Dict[str, int]], result: UpsertResult) -> None:
+    """Associate listings with their searches, reporting the links that are new"""
+    insert = postgresql.insert if db.get_bind().dialect.name == "postgresql" else sqlite.insert
+    linked = []
+    for start in range(0, len(links), UPSERT_BATCH_SIZE):
+        stmt = insert(links_table).values(links[start:start + UPSERT_BATCH_SIZE]).on_conflict_do_nothing(
+            index_elements=["search_id", "listing_id"]
+        ).returning(links_table.c.user_id, links_table.c.listing_id)
+        linked.extend(db.execute(stmt).all())
+    result.linked_ids.extend(listing_id for _, listing_id in linked)
+    record_linked(db, linked)
+
+
+def upsert_listings(db: Session, rows: List[Dict[str, Any]]) -> UpsertResult:
+    """
+    Insert scraped listings in bulk, skipping ones that are already stored.
+
+    Each batch is a single `INSERT ... ON CONFLICT ... RETURNING` on
+    PostgreSQL, so there is no per-listing SELECT and concurrent tasks
+    can't race on `uq_marketplace_external_id`. A partitioned listings
+    table (LISTINGS_PARTITIONED) arbitrates through `listing_keys` instead.
+    SQLite (tests, local development) gets an equivalent path. Runs in the
+    caller's transaction.
+
+    A listing is stored once however many searches match it; every row's
+    search is then linked to it in `search_listings`, the same way, with
+    the search's owner copied onto the link. Rows of searches that no
+    longer exist are stored but not linked.
+
+    Args:
+        db: Database session
+        rows: Listing column values, each including `search_id` and `marketplace`
+
+    Returns:
+        IDs of inserted and already existing listings
+    """
+    # Rows of several searches can share a listing
+    searches: Dict[Tuple[Marketplace, str], Set[int]] = {}
+    for row in rows:
+        searches.setdefault((Marketplace(row["marketplace"]), row["external_id"]), set()).add(row["search_id"])
+
+    rows = _normalize_rows(rows)
+    result = UpsertResult()
+    if not rows:
+        return result
+
+    if db.get_bind().dialect.name != "postgresql":
+        upsert = _upsert_sqlite
+    elif settings.LISTINGS_PARTITIONED:
+        upsert = _upsert_partitioned
+    else:
+        upsert = _upsert_postgres
+    ids: ListingIds = {}
+    for start in range(0, len(rows), UPSERT_BATCH_SIZE):
+        upsert(db, rows[start:start + UPSERT_BATCH_SIZE], result, ids)
+
+    # Links carry their search's owner so user-scoped reads skip the join
+    owners = dict(db.query(Search.id, Search.user_id).filter(
+        Search.id.in_(sorted({search_id for search_ids in searches.values() for search_id in search_ids}))
+    ).all())
+    _link_listings(db, [
+        {"search_id": search_id, "listing_id": ids[key], "user_id": owners[search_id]}
+        for key, search_ids in searches.items() if key in ids
+        for search_id in sorted(search_ids) if search_id in owners
+    ], result)
+
+    logger.debug(
+        f"Upserted {len(rows)} listings: {len(result.inserted_ids)} new, "
+        f"{len(result.linked_ids)} new to their search"
+    )
+    return result
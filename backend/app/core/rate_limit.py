@@ -0,0 +1,182 @@
+# app/core/rate_limit.py
+
+import asyncio
+import logging
+import time
+from typing import Optional, Tuple
+
+from redis import Redis
+from redis.exceptions import RedisError
+
+from app.config import settings
+from app.database import redis_client
+from app.core.monitoring import track_rate_limit_wait
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimitExceeded(Exception):
+    """Raised when the next free slot is further away than the caller will wait"""
+
+    def __init__(self, key: str, retry_after: float):
+        self.key = key
+        self.retry_after = retry_after
+        super().__init__(f"Rate limit for {key} exceeded, retry after {retry_after:.1f}s")
+
+
+def gcra_reserve(
+    tat: Optional[int], now: int, interval: int, burst: int, max_wait: int
+) -> Tuple[int, Optional[int]]:
+    """
+    GCRA slot booking, the arithmetic GCRA_RESERVE_SCRIPT runs in Redis.
+
+    The theoretical arrival time (TAT) is when the key's queue of booked
+    slots drains; `burst` requests may be booked ahead of it back to back.
+
+    Args:
+        tat: Current TAT in ms, None if the key is unset
+        now: Current time in ms
+        interval: Emission interval in ms (time between requests)
+        burst: Requests allowed back to back
+        max_wait: Longest wait in ms a caller will accept
+
+    Returns:
+        (wait in ms, new TAT), or (negated wait, None) when the wait exceeds
+        `max_wait` and nothing is booked
+    """
+    if tat is None or tat < now:
+        tat = now
+
+    wait = max(0, tat - (burst - 1) * interval - now)
+    if wait > max_wait:
+        return -wait, None
+    return wait, tat + interval
+
+
+# GCRA reservation. Every caller books the next free slot for the key and is
+# told how long to wait for it, so concurrent callers queue up fairly instead
+# of polling. Uses the Redis server clock so worker clock skew doesn't matter.
+# Keep in step with gcra_reserve(), which the tests exercise.
+#
+# KEYS[1]: limiter key
+# ARGV[1]: emission interval in ms (time between requests)
+# ARGV[2]: burst size (requests allowed back to back)
+# ARGV[3]: longest wait in ms a caller will accept
+# Returns: milliseconds the caller must wait before sending its request, or
+#          the negated wait (nothing booked) when it exceeds ARGV[3]
+GCRA_RESERVE_SCRIPT = """
+local server_time = redis.call('TIME')
+local now = tonumber(server_time[1]) * 1000 + math.floor(tonumber(server_time[2]) / 1000)
+local interval = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local max_wait = tonumber(ARGV[3])
+
+local tat = tonumber(redis.call('GET', KEYS[1]))
+if not tat or tat < now then
+    tat = now
+end
+
+local allow_at = tat - (burst - 1) * interval
+local wait = allow_at - now
+if wait < 0 then
+    wait = 0
+end
+if wait > max_wait then
+    return -wait
+end
+
+local new_tat = tat + interval
+redis.call('SET', KEYS[1], new_tat, 'PX', new_tat - now + interval)
+return wait
+"""
+
+
+class RateLimiter:
+    """
+    Fleet-wide GCRA rate limiter shared by all workers through Redis.
+
+    Callers ask for a slot with `acquire()` (blocking agents) or
+    `acquire_async()` (async agents); both make a single Redis round trip
+    and then wait only as long as the limiter says, without polling.
+    """
+
+    def __init__(
+        self,
+        redis: Optional[Redis] = None,
+        rate_per_minute: Optional[int] = None,
+        burst: Optional[int] = None,
+        max_wait: Optional[float] = None,
+        prefix: str = "ratelimit:scrape",
+    ):
+        self.redis = redis or redis_client
+        self.rate_per_minute = rate_per_minute or settings.SCRAPING_RATE_LIMIT_PER_MINUTE
+        self.burst = burst or settings.SCRAPING_RATE_LIMIT_BURST
+        self.max_wait = max_wait if max_wait is not None else settings.SCRAPING_RATE_LIMIT_MAX_WAIT
+        self.prefix = prefix
+        self._script = None
+
+    @property
+    def interval_ms(self) -> int:
+        """Milliseconds between requests at the configured rate"""
+        return max(1, int(60_000 / self.rate_per_minute))
+
+    def reserve(self, key: str) -> float:
+        """
+        Book the next request slot for a key.
+
+        Args:
+            key: Limiter key, e.g. a marketplace host
+
+        Returns:
+            Seconds to wait before the booked slot is reached
+
+        Raises:
+            RateLimitExceeded: If the wait would exceed `max_wait`
+        """
+        try:
+            if self._script is None:
+                self._script = self.redis.register_script(GCRA_RESERVE_SCRIPT)
+            wait_ms = self._script(
+                keys=[f"{self.prefix}:{key}"],
+                args=[self.interval_ms, self.burst, int(self.max_wait * 1000)]
+            )
+        except RedisError as e:
+            # Without Redis we can't coordinate the fleet; fall back to a
+            # fixed per-process delay so we stay polite
+            logger.warning(f"Rate limiter unavailable for {key}, using local delay: {e}")
+            return float(settings.SCRAPING_DELAY_SECONDS)
+
+        wait_ms = int(wait_ms)
+        if wait_ms < 0:
+            raise RateLimitExceeded(key, -wait_ms / 1000)
+        return wait_ms / 1000
+
+    def acquire(self, key: str) -> float:
+        """
+        Wait until a request for the key is allowed.
+
+        Returns:
+            Seconds spent waiting
+        """
+        wait = self.reserve(key)
+        if wait > 0:
+            time.sleep(wait)
+        track_rate_limit_wait(key, wait)
+        return wait
+
+    async def acquire_async(self, key: str) -> float:
+        """
+        Wait until a request for the key is allowed, without blocking the loop.
+
+        Returns:
+            Seconds spent waiting
+        """
+        wait = await asyncio.to_thread(self.reserve, key)
+        if wait > 0:
+            await asyncio.sleep(wait)
+        track_rate_limit_wait(key, wait)
+        return wait
+
+
+# Shared limiter for outbound marketplace requests
+scrape_rate_limiter = RateLimiter()
@@ -0,0 +1,168 @@
+# app/core/resilience.py
+
+import logging
+import random
+from typing import Dict, Iterable, Optional
+
+import httpx
+from redis import Redis
+from redis.exceptions import RedisError
+
+from app.config import settings
+from app.database import redis_client
+from app.core.monitoring import track_circuit_state
+
+logger = logging.getLogger(__name__)
+
+CIRCUIT_CLOSED = "closed"
+CIRCUIT_OPEN = "open"
+CIRCUIT_HALF_OPEN = "half_open"
+
+# Status codes worth retrying: throttling and server-side trouble
+TRANSIENT_STATUS_CODES = {408, 425, 429, 500, 502, 503, 504}
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of sending a request to a marketplace that is down"""
+
+    def __init__(self, name: str, retry_after: float):
+        self.name = name
+        self.retry_after = retry_after
+        super().__init__(f"Circuit for {name} is open, retry after {retry_after:.0f}s")
+
+
+def is_transient(error: Exception) -> bool:
+    """Whether a failed request is worth retrying"""
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code in TRANSIENT_STATUS_CODES
+    return isinstance(error, httpx.TransportError)
+
+
+def backoff_delay(attempt: int, retry_after: Optional[float] = None) -> float:
+    """
+    Seconds to wait before retry number `attempt` (0-based).
+
+    Uses full jitter (a random delay up to the exponential bound) so
+    workers that failed together don't retry in lockstep. A server-supplied
+    Retry-After takes precedence. Both are capped at SCRAPING_RETRY_BACKOFF_MAX.
+    """
+    cap = settings.SCRAPING_RETRY_BACKOFF_MAX
+    if retry_after is not None:
+        return min(cap, retry_after)
+    return random.uniform(0, min(cap, settings.SCRAPING_RETRY_BACKOFF_BASE * 2 ** attempt))
+
+
+def retry_after_seconds(error: Exception) -> Optional[float]:
+    """Read a numeric Retry-After header from a failed response, if any"""
+    if not isinstance(error, httpx.HTTPStatusError):
+        return None
+    try:
+        return float(error.response.headers["Retry-After"])
+    except (KeyError, ValueError):
+        return None
+
+
+class CircuitBreaker:
+    """
+    Fleet-wide circuit breaker per marketplace, kept in Redis.
+
+    After `failure_threshold` consecutive failed fetches the circuit opens
+    and every worker fast-fails for `recovery_timeout` seconds. It then goes
+    half-open: a single request is let through as a probe, closing the
+    circuit on success or reopening it on failure.
+    """
+
+    def __init__(
+        self,
+        redis: Optional[Redis] = None,
+        failure_threshold: Optional[int] = None,
+        recovery_timeout: Optional[int] = None,
+        prefix: str = "circuit:scrape",
+    ):
+        self.redis = redis or redis_client
+        self.failure_threshold = failure_threshold or settings.SCRAPING_BREAKER_FAILURE_THRESHOLD
+        self.recovery_timeout = recovery_timeout or settings.SCRAPING_BREAKER_RECOVERY_SECONDS
+        self.prefix = prefix
+
+    def _key(self, name: str, part: str) -> str:
+        return f"{self.prefix}:{name}:{part}"
+
+    def state(self, name: str) -> str:
+        """
+        Get the circuit state for a marketplace.
+
+        Returns:
+            "closed", "open" or "half_open" ("closed" if Redis is unavailable)
+        """
+        try:
+            if self.redis.exists(self._key(name, "open")):
+                return CIRCUIT_OPEN
+            if self.redis.exists(self._key(name, "tripped")):
+                return CIRCUIT_HALF_OPEN
+        except RedisError as e:
+            logger.warning(f"Circuit breaker unavailable for {name}: {e}")
+        return CIRCUIT_CLOSED
+
+    def states(self, names: Iterable[str]) -> Dict[str, str]:
+        """Get circuit states for several marketplaces"""
+        return {name: self.state(name) for name in names}
+
+    def allow(self, name: str) -> None:
+        """
+        Check that a request to a marketplace may be sent.
+
+        Raises:
+            CircuitOpenError: If the circuit is open, or half-open with a
+                probe already in flight
+        """
+        state = self.state(name)
+        if state == CIRCUIT_CLOSED:
+            return
+        if state == CIRCUIT_HALF_OPEN:
+            try:
+                if self.redis.set(self._key(name, "probe"), "1", nx=True, ex=self.recovery_timeout):
+                    logger.info(f"Circuit for {name} is half-open, sending probe request")
+                    return
+            except RedisError:
+                return
+        raise CircuitOpenError(name, self.recovery_timeout)
+
+    def record_success(self, name: str) -> None:
+        """Reset the failure count, closing the circuit after a successful probe"""
+        try:
+            was_tripped = self.redis.exists(self._key(name, "tripped"))
+            self.redis.delete(self._key(name, "failures"), self._key(name, "tripped"), self._key(name, "probe"))
+        except RedisError as e:
+            logger.warning(f"Could not record success for {name}: {e}")
+            return
+        if was_tripped:
+            logger.info(f"Circuit for {name} closed")
+            track_circuit_state(name, CIRCUIT_CLOSED)
+
+    def record_failure(self, name: str) -> None:
+        """Count a failed fetch, opening the circuit at the threshold"""
+        try:
+            if self.redis.exists(self._key(name, "tripped")):
+                # The half-open probe failed: back to open
+                self._open(name)
+                return
+            failures = self.redis.incr(self._key(name, "failures"))
+            self.redis.expire(self._key(name, "failures"), self.recovery_timeout)
+            if failures >= self.failure_threshold:
+                self._open(name)
+        except RedisError as e:
+            logger.warning(f"Could not record failure for {name}: {e}")
+
+    def _open(self, name: str) -> None:
+        pipe = self.redis.pipeline()
+        pipe.set(self._key(name, "open"), "1", ex=self.recovery_timeout)
+        # Stays set until a probe succeeds so the circuit goes half-open, not closed
+        pipe.set(self._key(name, "tripped"), "1", ex=self.recovery_timeout * 10)
+        pipe.delete(self._key(name, "failures"), self._key(name, "probe"))
+        pipe.execute()
+        logger.warning(f"Circuit for {name} opened for {self.recovery_timeout}s")
+        track_circuit_state(name, CIRCUIT_OPEN)
+
+
+# Shared breaker for marketplace fetches
+marketplace_breaker = CircuitBreaker()
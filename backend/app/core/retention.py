@@ -0,0 +1,202 @@
+# app/core/retention.py
+
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+import logging
+import time
+
+from sqlalchemy import delete, exists, or_, tuple_
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.core.monitoring import track_retention_batch, track_retention_run
+from app.core.partitions import listing_keys
+from app.core.user_stats import record_unlinked
+from app.models import Listing, SearchListing, SubscriptionTier, User
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class RetentionResult:
+    """Outcome of one retention run"""
+    deleted: Dict[str, int] = field(default_factory=dict)  # Search listings retired, per subscription tier
+    listings_deleted: int = 0  # Listings no search links to anymore
+    batches: int = 0
+    seconds: float = 0.0
+    complete: bool = True  # False if the runtime budget ran out first
+
+    @property
+    def total_deleted(self) -> int:
+        return sum(self.deleted.values())
+
+
+def retention_windows() -> Dict[SubscriptionTier, int]:
+    """Listing retention in days per subscription tier"""
+    overrides = settings.retention_days_by_tier
+    return {
+        tier: overrides.get(tier.value, settings.LISTING_RETENTION_DAYS)
+        for tier in SubscriptionTier
+    }
+
+
+def _expired_links(
+    db: Session, tier: SubscriptionTier, cutoff: datetime, after_id: int, limit: int
+) -> List[Tuple[int, int, int]]:
+    """Next batch of expired, unsaved search listings of a tier's users as (ID, user ID, listing ID), in ID order"""
+    tier_filter = User.subscription_tier == tier
+    if tier == SubscriptionTier.FREE:
+        tier_filter = or_(tier_filter, User.subscription_tier.is_(None))
+
+    rows = db.query(SearchListing.id, SearchListing.user_id, SearchListing.listing_id).join(
+        User, SearchListing.user_id == User.id
+    ).filter(
+        tier_filter,
+        SearchListing.id > after_id,
+        SearchListing.first_seen_at < cutoff,
+        SearchListing.is_saved.isnot(True)
+    ).order_by(SearchListing.id).limit(limit).all()
+    return [(row.id, row.user_id, row.listing_id) for row in rows]
+
+
+def _unlinked(db: Session, listing_ids: List[int]) -> List[int]:
+    """Those of `listing_ids` no search links to"""
+    rows = db.query(Listing.id).filter(
+        Listing.id.in_(listing_ids),
+        ~exists().where(SearchListing.listing_id == Listing.id)
+    ).all()
+    return [row.id for row in rows]
+
+
+def _delete_listings(db: Session, ids: List[int]) -> None:
+    if not ids:
+        return
+    if not settings.LISTINGS_PARTITIONED:
+        db.execute(delete(Listing).where(Listing.id.in_(ids)))
+        return
+
+    # Free the uniqueness keys too, or the listings could never be stored again
+    keys = db.execute(
+        delete(Listing).where(Listing.id.in_(ids)).returning(Listing.marketplace, Listing.external_id)
+    ).all()
+    if keys:
+        db.execute(delete(listing_keys).where(
+            tuple_(listing_keys.c.marketplace, listing_keys.c.external_id).in_(keys)
+        ))
+
+
+def _sweep_orphans(db: Session, result: RetentionResult, start: float, batch_size: int, max_runtime: float) -> None:
+    """Delete listings no search links to, in primary-key batches"""
+    last_id = 0
+    while True:
+        if time.monotonic() - start > max_runtime:
+            result.complete = False
+            break
+        rows = db.query(Listing.id).filter(
+            Listing.id > last_id,
+            ~exists().where(SearchListing.listing_id == Listing.id)
+        ).order_by(Listing.id).limit(batch_size).all()
+        if not rows:
+            break
+        ids = [row.id for row in rows]
+        _delete_listings(db, ids)
+        db.commit()
+
+        last_id = ids[-1]
+        result.batches += 1
+        result.listings_deleted += len(ids)
+        if len(ids) < batch_size:
+            break
+
+
+def purge_expired_listings(
+    db: Session,
+    now: Optional[datetime] = None,
+    batch_size: Optional[int] = None,
+    pause: Optional[float] = None,
+    max_runtime: Optional[float] = None,
+) -> RetentionResult:
+    """
+    Retire search listings past their owner's retention window.
+
+    Walks each tier's expired search-listing links in primary-key order
+    and deletes them in small batches, each in its own transaction with a
+    pause in between, so no long lock or WAL burst builds up. A listing
+    goes once no search links to it anymore, so one shared with a search
+    of a longer-retention tier stays. Saved links are kept. Listings left
+    without any link (e.g. their searches were deleted) are swept up at the
+    end. Stops early once `max_runtime` is used up; the next run picks up
+    where this one left off.
+
+    Args:
+        db: Database session
+        now: Current time
+        batch_size: Rows per DELETE (RETENTION_BATCH_SIZE)
+        pause: Seconds to sleep between batches (RETENTION_BATCH_PAUSE_SECONDS)
+        max_runtime: Time budget in seconds (RETENTION_MAX_RUNTIME_SECONDS)
+
+    Returns:
+        Retired search listings per tier, deleted listings and run statistics
+    """
+    now = now or datetime.utcnow()
+    batch_size = batch_size or settings.RETENTION_BATCH_SIZE
+    pause = settings.RETENTION_BATCH_PAUSE_SECONDS if pause is None else pause
+    max_runtime = max_runtime or settings.RETENTION_MAX_RUNTIME_SECONDS
+
+    windows = retention_windows()
+    # With weekly partitions the longest window is enforced by dropping
+    # whole partitions (maintain_listing_partitions); rows only need
+    # deleting for tiers with a shorter window
+    partition_days = max(windows.values()) if settings.LISTINGS_PARTITIONED else None
+
+    result = RetentionResult()
+    start = time.monotonic()
+    for tier, days in windows.items():
+        if partition_days is not None and days >= partition_days:
+            continue
+        cutoff = now - timedelta(days=days)
+        result.deleted[tier.value] = 0
+        last_id = 0
+
+        while True:
+            if time.monotonic() - start > max_runtime:
+                result.complete = False
+                break
+
+            batch_start = time.monotonic()
+            links = _expired_links(db, tier, cutoff, last_id, batch_size)
+            if not links:
+                break
+            db.execute(delete(SearchListing).where(SearchListing.id.in_([link_id for link_id, _, _ in links])))
+            record_unlinked(db, [(user_id, listing_id) for _, user_id, listing_id in links])
+            orphans = _unlinked(db, sorted({listing_id for _, _, listing_id in links}))
+            _delete_listings(db, orphans)
+            db.commit()
+
+            last_id = links[-1][0]
+            result.batches += 1
+            result.deleted[tier.value] += len(links)
+            result.listings_deleted += len(orphans)
+            track_retention_batch(tier.value, len(links), time.monotonic() - batch_start)
+
+            if len(links) < batch_size:
+                break
+            if pause:
+                time.sleep(pause)
+
+        if result.deleted[tier.value]:
+            logger.info(
+                f"Retention: retired {result.deleted[tier.value]} {tier.value} search listings "
+                f"older than {days} days"
+            )
+        if not result.complete:
+            logger.warning(f"Retention stopped after {max_runtime}s, resuming on the next run")
+            break
+
+    if result.complete:
+        _sweep_orphans(db, result, start, batch_size, max_runtime)
+
+    result.seconds = time.monotonic() - start
+    track_retention_run(result.total_deleted, result.seconds)
+    return result
@@ -0,0 +1,202 @@
+# app/core/scheduling.py
+
+import logging
+import math
+import threading
+import time
+import zlib
+from datetime import datetime, timezone
+from typing import Callable, Iterable, List, Optional, Tuple
+
+from redis import Redis
+from redis.exceptions import RedisError
+
+from app.config import settings
+from app.database import redis_client
+from app.core.monitoring import track_scheduler_dispatch, track_scheduler_queue
+
+logger = logging.getLogger(__name__)
+
+
+def search_phase(search_id: int, interval_seconds: float) -> float:
+    """
+    Deterministic offset of a search within its check interval.
+
+    Searches with the same interval get offsets spread evenly over it, so
+    their runs don't line up into bursts; the same search always gets the
+    same offset.
+    """
+    return (zlib.crc32(str(search_id).encode()) % 10_000) / 10_000 * interval_seconds
+
+
+def next_due(search_id: int, interval_minutes: int, last_run: datetime) -> datetime:
+    """
+    Next run time of a search, aligned to its phase.
+
+    Runs land on `phase + k * interval` (UTC epoch seconds). The first slot
+    more than half an interval after `last_run` is chosen, so once aligned
+    a search runs exactly once per interval.
+
+    Args:
+        search_id: Search ID
+        interval_minutes: Check interval
+        last_run: When the search last ran (naive datetimes are UTC)
+
+    Returns:
+        Naive UTC datetime of the next run
+    """
+    interval = interval_minutes * 60
+    phase = search_phase(search_id, interval)
+    earliest = _timestamp(last_run) + interval / 2
+    slot = phase + (math.floor((earliest - phase) / interval) + 1) * interval
+    return datetime.utcfromtimestamp(slot)
+
+
+def _timestamp(value: datetime) -> float:
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+# Pop due searches and lease them in one step, so concurrent schedulers
+# never dispatch the same search twice.
+#
+# KEYS[1]: schedule sorted set (member: search ID, score: due time)
+# ARGV[1]: now (epoch seconds)
+# ARGV[2]: batch size
+# ARGV[3]: lease score; popped searches are re-queued for then in case
+#          their run never reschedules them
+# Returns: flat list of search ID, due time pairs
+POP_DUE_SCRIPT = """
+local due = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'WITHSCORES', 'LIMIT', 0, tonumber(ARGV[2]))
+for i = 1, #due, 2 do
+    redis.call('ZADD', KEYS[1], ARGV[3], due[i])
+end
+return due
+"""
+
+
+class SearchScheduler:
+    """
+    Delay queue of searches in a Redis sorted set scored by due time.
+
+    The scheduler service pops due searches with second-level precision and
+    dispatches them; runs put their search back with its next due time.
+    The database's `next_run_at` stays the source of truth and `sync()`
+    re-seeds the queue from it.
+    """
+
+    def __init__(self, redis: Optional[Redis] = None, key: str = "schedule:searches"):
+        self.redis = redis or redis_client
+        self.key = key
+        self._script = None
+
+    def schedule(self, search_id: int, due_at: datetime) -> None:
+        """Queue (or move) a search to run at `due_at`"""
+        try:
+            self.redis.zadd(self.key, {str(search_id): _timestamp(due_at)})
+        except RedisError as e:
+            logger.warning(f"Could not schedule search {search_id}: {e}")
+
+    def update(self, search) -> None:
+        """Queue an active search for its `next_run_at`, or drop an inactive one"""
+        if search.status == "active" and search.next_run_at is not None:
+            self.schedule(search.id, search.next_run_at)
+        else:
+            self.unschedule(search.id)
+
+    def unschedule(self, search_id: int) -> None:
+        """Remove a search from the queue"""
+        try:
+            self.redis.zrem(self.key, str(search_id))
+        except RedisError as e:
+            logger.warning(f"Could not unschedule search {search_id}: {e}")
+
+    def pop_due(self, now: float, limit: int) -> List[Tuple[int, float]]:
+        """
+        Take due searches off the queue, leasing them for SCHEDULER_RETRY_SECONDS.
+
+        Args:
+            now: Current epoch time
+            limit: Maximum searches to pop
+
+        Returns:
+            (search ID, due epoch time) pairs, most overdue first
+        """
+        if self._script is None:
+            self._script = self.redis.register_script(POP_DUE_SCRIPT)
+        flat = self._script(keys=[self.key], args=[now, limit, now + settings.SCHEDULER_RETRY_SECONDS])
+        return [(int(flat[i]), float(flat[i + 1])) for i in range(0, len(flat), 2)]
+
+    def sync(self, searches: Iterable[Tuple[int, Optional[datetime]]]) -> int:
+        """
+        Re-seed the queue from the database.
+
+        Searches already queued keep their (possibly leased) due time;
+        queued searches missing from `searches` are dropped.
+
+        Args:
+            searches: (ID, next_run_at) of every active search
+
+        Returns:
+            Number of active searches
+        """
+        active = {}
+        now = datetime.utcnow()
+        for search_id, next_run_at in searches:
+            active[str(search_id)] = _timestamp(next_run_at or now)
+
+        queued = set(self.redis.zrange(self.key, 0, -1))
+        pipe = self.redis.pipeline(transaction=False)
+        if active:
+            pipe.zadd(self.key, active, nx=True)
+        stale = queued - set(active)
+        if stale:
+            pipe.zrem(self.key, *stale)
+        pipe.execute()
+        return len(active)
+
+    def run(
+        self,
+        dispatch: Callable[[int], None],
+        stop: Optional[threading.Event] = None,
+        batch_size: Optional[int] = None,
+        max_sleep: float = 1.0,
+    ) -> None:
+        """
+        Dispatch due searches until `stop` is set.
+
+        Sleeps until the next due search (at most `max_sleep`) between
+        passes, so searches start within about a second of their due time.
+
+        Args:
+            dispatch: Starts a run for a search ID
+            stop: Ends the loop when set
+            batch_size: Searches popped per pass (SCHEDULER_BATCH_SIZE)
+            max_sleep: Longest pause between passes, in seconds
+        """
+        stop = stop or threading.Event()
+        batch_size = batch_size or settings.SCHEDULER_BATCH_SIZE
+        while not stop.is_set():
+            try:
+                now = time.time()
+                due = self.pop_due(now, batch_size)
+                for search_id, due_at in due:
+                    dispatch(search_id)
+                    track_scheduler_dispatch(max(0.0, now - due_at))
+
+                head = self.redis.zrange(self.key, 0, 0, withscores=True)
+                overdue = max(0.0, now - head[0][1]) if head else 0.0
+                track_scheduler_queue(self.redis.zcard(self.key), overdue)
+            except RedisError as e:
+                logger.error(f"Scheduler pass failed: {e}")
+                stop.wait(max_sleep)
+                continue
+
+            if len(due) < batch_size:
+                wait = head[0][1] - time.time() if head else max_sleep
+                stop.wait(min(max_sleep, max(0.0, wait)))
+
+
+# Shared search delay queue
+search_scheduler = SearchScheduler()
@@ -0,0 +1,409 @@
+# app/core/task_logs.py
+
+import json
+import logging
+import math
+import os
+import socket
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from redis import Redis
+from redis.exceptions import RedisError, ResponseError
+from sqlalchemy import delete, func, or_
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.database import redis_client
+from app.models import TaskLog, TaskLogRollup
+
+logger = logging.getLogger(__name__)
+
+DATETIME_FIELDS = ("started_at", "completed_at", "created_at")
+
+# Rollup rows covering a task across all marketplaces
+ALL_MARKETPLACES = "all"
+
+
+def _encode(event: Dict[str, Any]) -> str:
+    return json.dumps({
+        key: value.isoformat() if isinstance(value, datetime) else value
+        for key, value in event.items()
+    })
+
+
+def _decode(payload: str) -> Dict[str, Any]:
+    event = json.loads(payload)
+    for key in DATETIME_FIELDS:
+        if event.get(key):
+            event[key] = datetime.fromisoformat(event[key])
+    return event
+
+
+def write_task_logs(db: Session, events: List[Dict[str, Any]]) -> int:
+    """
+    Apply task log events to the task_logs table (without committing).
+
+    Events of the same task are merged in order, so a task that started
+    and finished within one batch costs a single INSERT. A late "running"
+    event never reopens a task that is already recorded as finished.
+
+    Args:
+        db: Database session
+        events: Task log events, oldest first
+
+    Returns:
+        Number of task log rows written
+    """
+    merged: Dict[str, Dict[str, Any]] = {}
+    for event in events:
+        values = merged.setdefault(event["task_id"], {})
+        created_at = values.get("created_at")
+        values.update(event)
+        # Rows are dated by the task's first event, not by the flush
+        values["created_at"] = created_at or event.get("created_at")
+
+    existing = {
+        log.task_id: log
+        for log in db.query(TaskLog).filter(TaskLog.task_id.in_(list(merged)))
+    }
+    for task_id, values in merged.items():
+        log = existing.get(task_id)
+        if log is None:
+            db.add(TaskLog(**values))
+            continue
+        if log.completed_at is not None and values.get("completed_at") is None:
+            continue
+        for key, value in values.items():
+            if key != "created_at":
+                setattr(log, key, value)
+    return len(merged)
+
+
+class TaskLogSink:
+    """
+    Buffered writer for TaskLog state transitions.
+
+    Tasks append their transitions to a Redis stream instead of committing
+    each one; `flush` (the flush_task_logs task, every
+    TASK_LOG_FLUSH_SECONDS) writes them to the database in batches. Entries
+    are only removed from the stream once their batch is committed, so a
+    flush that crashes midway leaves them pending for the next one.
+
+    Without Redis, or with TASK_LOG_SINK set to "database", transitions are
+    written through the caller's session right away.
+    """
+
+    def __init__(
+        self,
+        redis: Optional[Redis] = None,
+        stream: str = "stream:task-logs",
+        group: str = "task-log-writers",
+    ):
+        self.redis = redis or redis_client
+        self.stream = stream
+        self.group = group
+        self._group_ready = False
+
+    def record(self, db: Session, task_id: str, task_name: str, **fields) -> None:
+        """
+        Record a task's state transition.
+
+        Args:
+            db: Session to write through when the transition can't be buffered
+            task_id: Celery task ID
+            task_name: Task name
+            **fields: TaskLog columns to set, e.g. status, result, error
+        """
+        event = {"task_id": task_id, "task_name": task_name, "created_at": datetime.utcnow(), **fields}
+        if settings.TASK_LOG_SINK == "redis":
+            try:
+                self.redis.xadd(
+                    self.stream,
+                    {"event": _encode(event)},
+                    maxlen=settings.TASK_LOG_STREAM_MAXLEN,
+                    approximate=True
+                )
+                return
+            except RedisError as e:
+                logger.warning(f"Task log stream unavailable, writing {task_id} directly: {e}")
+
+        write_task_logs(db, [event])
+        db.commit()
+
+    def _ensure_group(self) -> None:
+        if self._group_ready:
+            return
+        try:
+            self.redis.xgroup_create(self.stream, self.group, id="0", mkstream=True)
+        except ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+        self._group_ready = True
+
+    def flush(
+        self,
+        db: Session,
+        consumer: Optional[str] = None,
+        count: Optional[int] = None,
+        claim_idle: Optional[int] = None,
+    ) -> int:
+        """
+        Write one batch of buffered transitions to the database.
+
+        Entries another flush read but never acknowledged for `claim_idle`
+        seconds (it crashed) are taken over first.
+
+        Args:
+            db: Database session
+            consumer: Name of this flusher in the consumer group
+            count: Most entries to write (TASK_LOG_FLUSH_BATCH_SIZE)
+            claim_idle: Seconds before unacknowledged entries are taken over
+                (TASK_LOG_CLAIM_IDLE_SECONDS)
+
+        Returns:
+            Number of stream entries written
+        """
+        consumer = consumer or f"{socket.gethostname()}-{os.getpid()}"
+        count = count or settings.TASK_LOG_FLUSH_BATCH_SIZE
+        claim_idle = settings.TASK_LOG_CLAIM_IDLE_SECONDS if claim_idle is None else claim_idle
+
+        try:
+            self._ensure_group()
+            entries = list(self.redis.xautoclaim(
+                self.stream, self.group, consumer, min_idle_time=claim_idle * 1000, count=count
+            )[1])
+            if len(entries) < count:
+                for _, messages in self.redis.xreadgroup(
+                    self.group, consumer, {self.stream: ">"}, count=count - len(entries)
+                ) or []:
+                    entries.extend(messages)
+        except RedisError as e:
+            logger.warning(f"Could not read task log stream: {e}")
+            return 0
+        if not entries:
+            return 0
+
+        # Trimmed entries come back without fields
+        events = [_decode(fields["event"]) for _, fields in entries if fields]
+        try:
+            write_task_logs(db, events)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+
+        entry_ids = [entry_id for entry_id, _ in entries]
+        try:
+            pipe = self.redis.pipeline(transaction=False)
+            pipe.xack(self.stream, self.group, *entry_ids)
+            pipe.xdel(self.stream, *entry_ids)
+            pipe.execute()
+        except RedisError as e:
+            # Rewriting them later is harmless: events are applied idempotently
+            logger.warning(f"Could not acknowledge {len(entry_ids)} task log entries: {e}")
+        return len(entries)
+
+    def backlog(self) -> Optional[int]:
+        """Buffered transitions not yet written, or None without Redis"""
+        try:
+            return self.redis.xlen(self.stream)
+        except RedisError:
+            return None
+
+
+def hour_start(value: datetime) -> datetime:
+    """Start of the (naive UTC) hour `value` falls in"""
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value.replace(minute=0, second=0, microsecond=0)
+
+
+def _percentile(values: List[float], q: float) -> Optional[float]:
+    """Nearest-rank percentile"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(q * len(ordered)) - 1)]
+
+
+def _rollup_hour(db: Session, hour: datetime) -> None:
+    """Replace one hour's rollup rows with a fresh summary of its task logs"""
+    logs = db.query(
+        TaskLog.task_name, TaskLog.status, TaskLog.result, TaskLog.started_at, TaskLog.completed_at
+    ).filter(
+        TaskLog.created_at >= hour,
+        TaskLog.created_at < hour + timedelta(hours=1)
+    )
+
+    groups: Dict[Tuple[str, str], Dict[str, Any]] = defaultdict(
+        lambda: {"runs": 0, "failures": 0, "listings_found": 0, "durations": []}
+    )
+    for log in logs:
+        result = log.result or {}
+        duration = None
+        if log.started_at and log.completed_at:
+            duration = (log.completed_at - log.started_at).total_seconds()
+
+        # Marketplace rows share the run's duration; a marketplace fails
+        # when it is listed in the run's failed_marketplaces
+        failed_marketplaces = set(result.get("failed_marketplaces") or [])
+        entries = [(ALL_MARKETPLACES, log.status == "failed", result.get("total_listings", 0))]
+        entries.extend(
+            (marketplace, marketplace in failed_marketplaces, found)
+            for marketplace, found in (result.get("listings_by_marketplace") or {}).items()
+        )
+        for marketplace, failed, found in entries:
+            group = groups[(log.task_name, marketplace)]
+            group["runs"] += 1
+            group["failures"] += int(failed)
+            group["listings_found"] += found or 0
+            if duration is not None:
+                group["durations"].append(duration)
+
+    db.execute(delete(TaskLogRollup).where(TaskLogRollup.hour == hour))
+    db.add_all([
+        TaskLogRollup(
+            hour=hour,
+            task_name=task_name,
+            marketplace=marketplace,
+            runs=group["runs"],
+            failures=group["failures"],
+            listings_found=group["listings_found"],
+            duration_p50=_percentile(group["durations"], 0.5),
+            duration_p95=_percentile(group["durations"], 0.95),
+        )
+        for (task_name, marketplace), group in groups.items()
+    ])
+
+
+def update_task_log_rollups(
+    db: Session,
+    now: Optional[datetime] = None,
+    lookback_hours: Optional[int] = None,
+) -> int:
+    """
+    Summarize task logs into hourly rollups.
+
+    Recomputes every hour from `lookback_hours` before the last rolled-up
+    hour through the current one, so runs that finish (or get flushed)
+    late are still counted. The first run backfills from the oldest task
+    log.
+
+    Args:
+        db: Database session
+        now: Current time
+        lookback_hours: Rolled-up hours to recompute (TASK_LOG_ROLLUP_LOOKBACK_HOURS)
+
+    Returns:
+        Number of hours rolled up
+    """
+    current = hour_start(now or datetime.utcnow())
+    lookback_hours = settings.TASK_LOG_ROLLUP_LOOKBACK_HOURS if lookback_hours is None else lookback_hours
+
+    last = db.query(func.max(TaskLogRollup.hour)).scalar()
+    if last is not None:
+        hour = min(hour_start(last), current) - timedelta(hours=lookback_hours)
+    else:
+        first = db.query(func.min(TaskLog.created_at)).scalar()
+        if first is None:
+            return 0
+        hour = hour_start(first)
+
+    hours = 0
+    while hour <= current:
+        _rollup_hour(db, hour)
+        db.commit()
+        hour += timedelta(hours=1)
+        hours += 1
+    return hours
+
+
+def prune_task_logs(
+    db: Session,
+    now: Optional[datetime] = None,
+    keep_days: Optional[int] = None,
+    batch_size: Optional[int] = None,
+) -> int:
+    """
+    Delete raw task logs past their retention window, in batches.
+
+    Only hours that are rolled up and no longer recomputed are pruned, so
+    no summary loses its source rows while it can still change.
+
+    Args:
+        db: Database session
+        now: Current time
+        keep_days: Days of raw task logs to keep (TASK_LOG_RETENTION_DAYS)
+        batch_size: Rows deleted per transaction (RETENTION_BATCH_SIZE)
+
+    Returns:
+        Number of task logs deleted
+    """
+    now = now or datetime.utcnow()
+    keep_days = keep_days or settings.TASK_LOG_RETENTION_DAYS
+    batch_size = batch_size or settings.RETENTION_BATCH_SIZE
+
+    last = db.query(func.max(TaskLogRollup.hour)).scalar()
+    if last is None:
+        return 0
+    cutoff = min(
+        now - timedelta(days=keep_days),
+        hour_start(last) - timedelta(hours=settings.TASK_LOG_ROLLUP_LOOKBACK_HOURS)
+    )
+
+    deleted = 0
+    while True:
+        rows = db.query(TaskLog.id).filter(
+            TaskLog.created_at < cutoff
+        ).order_by(TaskLog.id).limit(batch_size).all()
+        if not rows:
+            break
+        db.execute(delete(TaskLog).where(TaskLog.id.in_([row.id for row in rows])))
+        db.commit()
+        deleted += len(rows)
+        if len(rows) < batch_size:
+            break
+    return deleted
+
+
+def failed_tasks_since(db: Session, since: datetime) -> int:
+    """
+    Failed tasks created since `since`, across all task names.
+
+    Whole hours that are already rolled up come from the rollups. The
+    partial first hour and anything not rolled up yet (including the
+    current hour) are counted from the raw task logs, so the window is
+    exact and the raw scan stays short.
+
+    Args:
+        db: Database session
+        since: Start of the window
+
+    Returns:
+        Number of failed tasks
+    """
+    first = hour_start(since)
+    if first < since:
+        first += timedelta(hours=1)
+
+    # The last rolled-up hour was still in progress when it was summarized
+    last = db.query(func.max(TaskLogRollup.hour)).scalar()
+    rolled_until = max(first, last) if last is not None else first
+
+    rolled = db.query(func.coalesce(func.sum(TaskLogRollup.failures), 0)).filter(
+        TaskLogRollup.marketplace == ALL_MARKETPLACES,
+        TaskLogRollup.hour >= first,
+        TaskLogRollup.hour < rolled_until
+    ).scalar()
+    live = db.query(func.count(TaskLog.id)).filter(
+        TaskLog.status == "failed",
+        TaskLog.created_at >= since,
+        or_(TaskLog.created_at < first, TaskLog.created_at >= rolled_until)
+    ).scalar()
+    return rolled + live
+
+
+# Shared task log writer
+task_log_sink = TaskLogSink()
@@ -0,0 +1,254 @@
+# app/core/user_stats.py
+
+from collections import Counter
+from datetime import date, datetime, time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import and_, case, exists, func, tuple_, update
+from sqlalchemy.orm import Session, aliased
+
+from app.config import settings
+from app.models import Search, SearchListing, SearchStatus, User, UserStats
+
+# (user ID, listing ID)
+UserListing = Tuple[int, int]
+
+# Dashboard counters, as DashboardStats reports them
+COUNTERS = ("total_searches", "active_searches", "total_listings", "new_listings_today", "saved_listings")
+
+
+def _today() -> date:
+    return datetime.utcnow().date()
+
+
+def adjust_user_stats(db: Session, user_id: int, **deltas: int) -> None:
+    """
+    Add to a user's dashboard counters, in the caller's transaction.
+
+    Users without a counters row yet are skipped: rows are created at
+    registration, and the reconcile job computes any missing ones in full.
+
+    Args:
+        db: Database session
+        user_id: User whose counters change
+        **deltas: Amount per counter, e.g. active_searches=-1
+    """
+    values = {name: getattr(UserStats, name) + delta for name, delta in deltas.items() if delta}
+    if values:
+        db.execute(update(UserStats).where(UserStats.user_id == user_id).values(**values))
+
+
+def _add_new_listings(db: Session, user_id: int, count: int, today: date) -> None:
+    """Count listings new to a user, starting a fresh daily count on a new day"""
+    db.execute(update(UserStats).where(UserStats.user_id == user_id).values(
+        total_listings=UserStats.total_listings + count,
+        new_listings_today=case(
+            (UserStats.new_listings_day == today, UserStats.new_listings_today + count),
+            else_=count
+        ),
+        new_listings_day=today,
+    ))
+
+
+def record_linked(db: Session, pairs: Iterable[UserListing]) -> None:
+    """
+    Count newly linked listings, once per user however many of their
+    searches matched them.
+
+    Args:
+        db: Database session
+        pairs: (user ID, listing ID) of each link just inserted
+    """
+    inserted = Counter(pairs)
+    if not inserted:
+        return
+
+    # A listing is new to a user if all their links to it were just inserted
+    links = db.query(SearchListing.user_id, SearchListing.listing_id, func.count()).filter(
+        tuple_(SearchListing.user_id, SearchListing.listing_id).in_(sorted(inserted))
+    ).group_by(SearchListing.user_id, SearchListing.listing_id)
+    new = Counter(user_id for user_id, listing_id, count in links if count == inserted[(user_id, listing_id)])
+
+    today = _today()
+    for user_id, count in new.items():
+        _add_new_listings(db, user_id, count, today)
+
+
+def record_unlinked(db: Session, pairs: Iterable[UserListing]) -> None:
+    """
+    Uncount listings whose links were just deleted, for users no other
+    search of which still links to them.
+
+    Only unsaved links are retired, so saved counts don't change.
+
+    Args:
+        db: Database session
+        pairs: (user ID, listing ID) of the deleted links
+    """
+    pairs = set(pairs)
+    if not pairs:
+        return
+
+    remaining = set(db.query(SearchListing.user_id, SearchListing.listing_id).filter(
+        tuple_(SearchListing.user_id, SearchListing.listing_id).in_(sorted(pairs))
+    ).distinct().all())
+    for user_id, count in Counter(user_id for user_id, _ in pairs - remaining).items():
+        adjust_user_stats(db, user_id, total_listings=-count)
+
+
+def record_search_removed(db: Session, search: Search) -> None:
+    """
+    Uncount a search that is about to be deleted, along with the listings
+    only it linked its owner to.
+
+    Args:
+        db: Database session
+        search: Search being deleted, before its links go
+    """
+    other = aliased(SearchListing)
+    only_here = ~exists().where(
+        other.user_id == SearchListing.user_id,
+        other.listing_id == SearchListing.listing_id,
+        other.search_id != SearchListing.search_id
+    )
+    saved_elsewhere = exists().where(
+        other.user_id == SearchListing.user_id,
+        other.listing_id == SearchListing.listing_id,
+        other.search_id != SearchListing.search_id,
+        other.is_saved.is_(True)
+    )
+    today_start = datetime.combine(_today(), time.min)
+
+    listings, saved, new_today = db.query(
+        func.coalesce(func.sum(case((only_here, 1), else_=0)), 0),
+        func.coalesce(func.sum(case((and_(SearchListing.is_saved.is_(True), ~saved_elsewhere), 1), else_=0)), 0),
+        func.coalesce(func.sum(case((and_(only_here, SearchListing.first_seen_at >= today_start), 1), else_=0)), 0)
+    ).filter(SearchListing.search_id == search.id).one()
+
+    adjust_user_stats(
+        db, search.user_id,
+        total_searches=-1,
+        active_searches=-int(search.status == SearchStatus.ACTIVE),
+        total_listings=-listings,
+        saved_listings=-saved,
+    )
+    if new_today:
+        db.execute(update(UserStats).where(
+            UserStats.user_id == search.user_id,
+            UserStats.new_listings_day == _today()
+        ).values(new_listings_today=UserStats.new_listings_today - new_today))
+
+
+def _compute(db: Session, user_ids: List[int], today: date) -> Dict[int, Dict[str, int]]:
+    """Dashboard counters of `user_ids` from the source tables"""
+    stats = {user_id: dict.fromkeys(COUNTERS, 0) for user_id in user_ids}
+
+    searches = db.query(
+        Search.user_id,
+        func.count(Search.id),
+        func.sum(case((Search.status == SearchStatus.ACTIVE, 1), else_=0))
+    ).filter(Search.user_id.in_(user_ids)).group_by(Search.user_id)
+    for user_id, total, active in searches:
+        stats[user_id].update(total_searches=total, active_searches=active or 0)
+
+    # One row per listing of each user, however many searches link it
+    per_listing = db.query(
+        SearchListing.user_id.label("user_id"),
+        func.max(case((SearchListing.is_saved.is_(True), 1), else_=0)).label("saved"),
+        func.min(SearchListing.first_seen_at).label("first_seen_at")
+    ).filter(
+        SearchListing.user_id.in_(user_ids)
+    ).group_by(SearchListing.user_id, SearchListing.listing_id).subquery()
+    listings = db.query(
+        per_listing.c.user_id,
+        func.count(),
+        func.sum(per_listing.c.saved),
+        func.sum(case((per_listing.c.first_seen_at >= datetime.combine(today, time.min), 1), else_=0))
+    ).group_by(per_listing.c.user_id)
+    for user_id, total, saved, new_today in listings:
+        stats[user_id].update(total_listings=total, saved_listings=saved or 0, new_listings_today=new_today or 0)
+    return stats
+
+
+def reconcile_user_stats(
+    db: Session,
+    user_ids: Optional[List[int]] = None,
+    batch_size: Optional[int] = None,
+) -> int:
+    """
+    Recompute dashboard counters from the source tables.
+
+    Fixes whatever drift the incremental updates picked up (concurrent
+    runs linking the same listing, partitions dropped wholesale) and
+    creates missing rows, in batches of users, each in its own
+    transaction.
+
+    Args:
+        db: Database session
+        user_ids: Users to recompute, all users by default
+        batch_size: Users per transaction (USER_STATS_RECONCILE_BATCH_SIZE)
+
+    Returns:
+        Number of users recomputed
+    """
+    batch_size = batch_size or settings.USER_STATS_RECONCILE_BATCH_SIZE
+    today = _today()
+
+    reconciled = 0
+    last_id = 0
+    while True:
+        if user_ids is not None:
+            batch = sorted(user_ids)[reconciled:reconciled + batch_size]
+        else:
+            batch = [row.id for row in db.query(User.id).filter(
+                User.id > last_id
+            ).order_by(User.id).limit(batch_size)]
+        if not batch:
+            break
+
+        computed = _compute(db, batch, today)
+        existing = {row.user_id: row for row in db.query(UserStats).filter(UserStats.user_id.in_(batch))}
+        now = datetime.utcnow()
+        for user_id, values in computed.items():
+            row = existing.get(user_id)
+            if row is None:
+                row = UserStats(user_id=user_id)
+                db.add(row)
+            for name, value in values.items():
+                setattr(row, name, value)
+            row.new_listings_day = today
+            row.reconciled_at = now
+        db.commit()
+
+        reconciled += len(batch)
+        last_id = batch[-1]
+        if len(batch) < batch_size:
+            break
+    return reconciled
+
+
+def get_user_stats(db: Session, user_id: int) -> Dict[str, Any]:
+    """
+    A user's dashboard counters: a single-row lookup that never writes.
+
+    A user without a counters row yet reads all zeros until the reconcile
+    job creates it.
+
+    Args:
+        db: Database session
+        user_id: User ID
+
+    Returns:
+        DashboardStats fields
+    """
+    row = db.get(UserStats, user_id)
+    if row is None:
+        return dict.fromkeys(COUNTERS, 0)
+
+    return {
+        "total_searches": row.total_searches,
+        "active_searches": row.active_searches,
+        "total_listings": row.total_listings,
+        "new_listings_today": row.new_listings_today if row.new_listings_day == _today() else 0,
+        "saved_listings": row.saved_listings,
+    }
@@ -4,6 +4,7 @@ from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
 from app.config import settings
+from app.api.pagination import NEXT_CURSOR_HEADER
 from app.database import init_db
 from app.core.logging import setup_logging, get_logger
 from app.core.monitoring import init_sentry, track_request_metrics
@@ -32,6 +33,7 @@ app.add_middleware(
     allow_credentials=settings.CORS_ALLOW_CREDENTIALS,
     allow_methods=["GET", "POST", "PUT", "DELETE", "PATCH"],
     allow_headers=["Authorization", "Content-Type"],
+    expose_headers=[NEXT_CURSOR_HEADER],
 )
 
 # Trusted Host Middleware (security)
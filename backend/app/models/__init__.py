@@ -1,15 +1,18 @@
 # app/models/__init__.py
 
 from sqlalchemy import (
-    Column, Integer, String, Boolean, DateTime, ForeignKey,
+    Column, Integer, String, Boolean, Date, DateTime, ForeignKey,
     JSON, Enum as SQLEnum, Text, Float, Index, UniqueConstraint
 )
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from datetime import datetime
+from typing import Optional
 import enum
 
 from app.database import Base
+from app.core.fulltext import attach_listing_search
+from app.core.scheduling import next_due
 
 
 # Enums
@@ -59,6 +62,22 @@ class User(Base):
     # Relationships
     searches = relationship("Search", back_populates="user", cascade="all, delete-orphan")
     alerts = relationship("Alert", back_populates="user", cascade="all, delete-orphan")
+    stats = relationship("UserStats", uselist=False, cascade="all, delete-orphan")
+
+
+class UserStats(Base):
+    """Per-user dashboard counters, kept up to date as searches and listings change"""
+    __tablename__ = "user_stats"
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    total_searches = Column(Integer, default=0, nullable=False)
+    active_searches = Column(Integer, default=0, nullable=False)
+    total_listings = Column(Integer, default=0, nullable=False)  # Distinct listings of the user's searches
+    saved_listings = Column(Integer, default=0, nullable=False)
+    new_listings_today = Column(Integer, default=0, nullable=False)  # Counted on new_listings_day only
+    new_listings_day = Column(Date)  # UTC
+    reconciled_at = Column(DateTime(timezone=True))  # Last recomputed from the source tables
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
 
 class Search(Base):
@@ -78,26 +97,44 @@ class Search(Base):
     status = Column(SQLEnum(SearchStatus), default=SearchStatus.ACTIVE, index=True)
     check_interval_minutes = Column(Integer, default=60)
     last_checked_at = Column(DateTime(timezone=True))
+    watermarks = Column(JSON, default={})  # Newest posted_at/external_ids processed, per marketplace
+    next_run_at = Column(DateTime(timezone=True), server_default=func.now())  # When the scheduler runs it next
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
     # Relationships
     user = relationship("User", back_populates="searches")
-    listings = relationship("Listing", back_populates="search", cascade="all, delete-orphan")
+    listing_links = relationship("SearchListing", back_populates="search", cascade="all, delete-orphan")
+    listings = relationship("Listing", secondary="search_listings", viewonly=True)
     alerts = relationship("Alert", back_populates="search", cascade="all, delete-orphan")
 
     # Indexes
     __table_args__ = (
         Index('idx_user_status', 'user_id', 'status'),
+        Index('idx_status_next_run', 'status', 'next_run_at'),
+        Index('idx_search_user_created', 'user_id', 'created_at', 'id'),
     )
 
+    def schedule_next_run(self, now: Optional[datetime] = None) -> None:
+        """
+        Set next_run_at about one check interval after the last run (now if it never ran).
+
+        Runs are aligned to a per-search offset within the interval so that
+        searches sharing an interval are spread out instead of all running
+        at once.
+        """
+        if self.last_checked_at is None:
+            self.next_run_at = now or datetime.utcnow()
+        else:
+            self.next_run_at = next_due(self.id or 0, self.check_interval_minutes or 60, self.last_checked_at)
+
 
 class Listing(Base):
-    """Scraped marketplace listings"""
+    """Scraped marketplace listings, stored once however many searches match them"""
     __tablename__ = "listings"
 
     id = Column(Integer, primary_key=True, index=True)
-    search_id = Column(Integer, ForeignKey("searches.id", ondelete="CASCADE"), nullable=False)
+    search_id = Column(Integer, ForeignKey("searches.id", ondelete="SET NULL"))  # Search that found it first
     external_id = Column(String(255), nullable=False)  # ID from marketplace
     marketplace = Column(SQLEnum(Marketplace), nullable=False, index=True)
     title = Column(Text, nullable=False)
@@ -110,14 +147,15 @@ class Listing(Base):
     seller_name = Column(String(255))
     seller_rating = Column(Float)
     is_featured = Column(Boolean, default=False)
-    is_saved = Column(Boolean, default=False, index=True)
-    metadata = Column(JSON, default={})
+    is_saved = Column(Boolean, default=False, index=True)  # Saved by any search; see SearchListing
+    metadata_ = Column("metadata", JSON, default={})
     posted_at = Column(DateTime(timezone=True))
     scraped_at = Column(DateTime(timezone=True), server_default=func.now())
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
     # Relationships
-    search = relationship("Search", back_populates="listings")
+    search = relationship("Search")
+    search_links = relationship("SearchListing", back_populates="listing", cascade="all, delete-orphan")
 
     # Indexes and Constraints
     __table_args__ = (
@@ -129,6 +167,38 @@ class Listing(Base):
     )
 
 
+# Full-text search over title + description
+attach_listing_search(Listing.__table__)
+
+
+class SearchListing(Base):
+    """Which searches matched which listings"""
+    __tablename__ = "search_listings"
+
+    id = Column(Integer, primary_key=True, index=True)
+    search_id = Column(Integer, ForeignKey("searches.id", ondelete="CASCADE"), nullable=False)
+    listing_id = Column(Integer, ForeignKey("listings.id", ondelete="CASCADE"), nullable=False)
+    # The search's owner, copied on insert
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    first_seen_at = Column(DateTime(timezone=True), server_default=func.now())  # When this search found it
+    is_saved = Column(Boolean, default=False)
+
+    # Relationships
+    search = relationship("Search", back_populates="listing_links")
+    listing = relationship("Listing", back_populates="search_links")
+
+    # Indexes and Constraints
+    __table_args__ = (
+        UniqueConstraint('search_id', 'listing_id', name='uq_search_listing'),
+        # Newest-first pages end in (first_seen_at, id), the keyset cursor
+        Index('idx_search_listing_first_seen', 'search_id', 'first_seen_at', 'id'),
+        Index('idx_search_listing_listing', 'listing_id'),
+        # Owner-scoped feeds, saved lists and dashboard counts
+        Index('idx_search_listing_user_first_seen', 'user_id', 'first_seen_at', 'id'),
+        Index('idx_search_listing_user_saved_first_seen', 'user_id', 'is_saved', 'first_seen_at', 'id'),
+    )
+
+
 class Alert(Base):
     """User notification preferences for searches"""
     __tablename__ = "alerts"
@@ -151,6 +221,7 @@ class Alert(Base):
     __table_args__ = (
         Index('idx_user_search', 'user_id', 'search_id'),
         Index('idx_enabled', 'enabled'),
+        Index('idx_alert_user_created', 'user_id', 'created_at', 'id'),
     )
 
 
@@ -174,3 +245,25 @@ class TaskLog(Base):
         Index('idx_task_status', 'task_name', 'status'),
         Index('idx_created_at', 'created_at'),
     )
+
+
+class TaskLogRollup(Base):
+    """Hourly TaskLog summaries per task name and marketplace"""
+    __tablename__ = "task_log_rollups"
+
+    id = Column(Integer, primary_key=True, index=True)
+    hour = Column(DateTime(timezone=True), nullable=False)  # Start of the hour, by task start
+    task_name = Column(String(255), nullable=False)
+    marketplace = Column(String(50), nullable=False)  # "all" for the task as a whole
+    runs = Column(Integer, default=0)
+    failures = Column(Integer, default=0)
+    listings_found = Column(Integer, default=0)
+    duration_p50 = Column(Float)  # Seconds, finished runs only
+    duration_p95 = Column(Float)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    # Indexes
+    __table_args__ = (
+        UniqueConstraint('hour', 'task_name', 'marketplace', name='uq_rollup_hour_task_marketplace'),
+        Index('idx_rollup_marketplace_hour', 'marketplace', 'hour'),
+    )
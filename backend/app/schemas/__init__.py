@@ -87,6 +87,7 @@ class Search(SearchBase):
     user_id: int
     status: SearchStatus
     last_checked_at: Optional[datetime]
+    next_run_at: Optional[datetime] = None
     created_at: datetime
     updated_at: Optional[datetime]
 
@@ -179,6 +180,21 @@ class RecentActivity(BaseModel):
     timestamp: datetime
 
 
+# Monitoring Schemas
+class TaskRollup(BaseModel):
+    hour: datetime
+    task_name: str
+    marketplace: str
+    runs: int
+    failures: int
+    listings_found: int
+    duration_p50: Optional[float]
+    duration_p95: Optional[float]
+
+    class Config:
+        from_attributes = True
+
+
 # Pagination Schemas
 class PaginatedResponse(BaseModel):
     items: List[Any]
@@ -1,8 +1,14 @@
 # app/tasks/celery_app.py
 
+import time
+
 from celery import Celery
 from celery.schedules import crontab
+from celery.signals import before_task_publish, task_prerun, worker_process_shutdown, worker_shutdown
+from kombu import Queue
+
 from app.config import settings
+from app.tasks.queues import MAINTENANCE, TASK_ROUTES, all_queues
 
 # Create Celery app
 celery_app = Celery(
@@ -27,18 +33,89 @@ celery_app.conf.update(
     task_soft_time_limit=25 * 60,  # 25 minutes
     worker_prefetch_multiplier=1,
     worker_max_tasks_per_child=1000,
+    # One queue per workload type; see app/tasks/worker.py for the matching
+    # worker profiles
+    task_queues=[Queue(queue) for queue in all_queues()],
+    task_default_queue=MAINTENANCE,
+    task_routes=TASK_ROUTES,
 )
 
 # Periodic tasks schedule
 celery_app.conf.beat_schedule = {
-    # Run active searches every 15 minutes
-    'check-active-searches': {
-        'task': 'app.tasks.scraping.check_active_searches',
-        'schedule': crontab(minute='*/15'),
-    },
     # Clean up old listings every day at 2 AM
     'cleanup-old-listings': {
         'task': 'app.tasks.scraping.cleanup_old_listings',
         'schedule': crontab(hour=2, minute=0),
     },
+    # Recompute dashboard counters every day at 3 AM, after retention
+    'reconcile-dashboard-stats': {
+        'task': 'app.tasks.scraping.reconcile_dashboard_stats',
+        'schedule': crontab(hour=3, minute=0),
+    },
+    # Summarize task logs for health checks and dashboards every 5 minutes
+    'rollup-task-logs': {
+        'task': 'app.tasks.scraping.rollup_task_logs',
+        'schedule': crontab(minute='*/5'),
+    },
 }
+
+if settings.SEARCH_SCHEDULER == "redis":
+    # The scheduler service dispatches searches; beat only re-seeds its
+    # queue from the database in case Redis lost entries
+    celery_app.conf.beat_schedule['sync-search-schedule'] = {
+        'task': 'app.tasks.scraping.sync_search_schedule',
+        'schedule': crontab(minute='*/15'),
+    }
+else:
+    # Run due searches every 15 minutes
+    celery_app.conf.beat_schedule['check-active-searches'] = {
+        'task': 'app.tasks.scraping.check_active_searches',
+        'schedule': crontab(minute='*/15'),
+    }
+
+if settings.TASK_LOG_SINK == "redis":
+    # Write buffered task logs; a flush that can't start within one
+    # interval is skipped, the next one picks its entries up
+    celery_app.conf.beat_schedule['flush-task-logs'] = {
+        'task': 'app.tasks.scraping.flush_task_logs',
+        'schedule': settings.TASK_LOG_FLUSH_SECONDS,
+        'options': {'expires': settings.TASK_LOG_FLUSH_SECONDS},
+    }
+
+if settings.LISTINGS_PARTITIONED:
+    # Pre-create and retire weekly listings partitions every day at 1 AM
+    celery_app.conf.beat_schedule['maintain-listing-partitions'] = {
+        'task': 'app.tasks.scraping.maintain_listing_partitions',
+        'schedule': crontab(hour=1, minute=0),
+    }
+
+
+@worker_process_shutdown.connect
+@worker_shutdown.connect
+def close_http_clients(**kwargs):
+    """
+    Close pooled marketplace HTTP connections when a worker process exits.
+
+    Prefork children get worker_process_shutdown; threads and gevent pools
+    hold the clients in the main process, which only gets worker_shutdown.
+    """
+    from app.agents.http import close_clients
+    close_clients()
+
+
+@before_task_publish.connect
+def stamp_publish_time(headers=None, **kwargs):
+    """Stamp outgoing tasks so workers can measure how long they queued"""
+    if headers is not None:
+        headers.setdefault("published_at", time.time())
+
+
+@task_prerun.connect
+def record_queue_wait(task=None, **kwargs):
+    """Record how long a starting task waited in its queue"""
+    published_at = getattr(task.request, "published_at", None)
+    queue = (task.request.delivery_info or {}).get("routing_key")
+    if published_at is None or not queue:
+        return
+    from app.tasks.queues import queue_stats
+    queue_stats.record_wait(queue, max(0.0, time.time() - float(published_at)))
@@ -0,0 +1,124 @@
+# app/tasks/queues.py
+
+import logging
+from typing import Dict, List, Optional, Tuple
+
+from redis import Redis
+from redis.exceptions import RedisError
+
+from app.config import settings
+from app.database import redis_client
+from app.core.monitoring import track_queue_stats
+
+logger = logging.getLogger(__name__)
+
+# Queues per workload type
+SCRAPE_IO = "scrape-io"  # Network-bound marketplace fetches (agents parse pages as they arrive)
+ALERTS = "alerts"  # Notification delivery
+MAINTENANCE = "maintenance"  # Scheduling and DB-heavy housekeeping
+
+QUEUES = (SCRAPE_IO, ALERTS, MAINTENANCE)
+
+TASK_ROUTES = {
+    "app.tasks.scraping.run_search_task": {"queue": SCRAPE_IO},
+    "app.tasks.scraping.scrape_marketplace_task": {"queue": SCRAPE_IO},
+    "app.tasks.scraping.finalize_search_run": {"queue": SCRAPE_IO},
+    "app.tasks.alerts.*": {"queue": ALERTS},
+    "app.tasks.scraping.check_active_searches": {"queue": MAINTENANCE},
+    "app.tasks.scraping.sync_search_schedule": {"queue": MAINTENANCE},
+    "app.tasks.scraping.flush_task_logs": {"queue": MAINTENANCE},
+    "app.tasks.scraping.rollup_task_logs": {"queue": MAINTENANCE},
+    "app.tasks.scraping.cleanup_old_listings": {"queue": MAINTENANCE},
+    "app.tasks.scraping.maintain_listing_partitions": {"queue": MAINTENANCE},
+    "app.tasks.scraping.reconcile_dashboard_stats": {"queue": MAINTENANCE},
+}
+
+
+def fanout_queues() -> List[str]:
+    """Extra per-marketplace queues from SCRAPING_MARKETPLACE_QUEUES"""
+    return sorted(set(settings.marketplace_queues.values()) - set(QUEUES))
+
+
+def all_queues() -> List[str]:
+    """Workload queues plus any per-marketplace fan-out queues"""
+    return list(QUEUES) + fanout_queues()
+
+
+class QueueStats:
+    """
+    Fleet-wide time tasks spent waiting in each queue.
+
+    Workers add every task's wait (publish to start) to per-queue totals in
+    Redis, so the API can export them no matter which process ran the task.
+    """
+
+    def __init__(self, redis: Optional[Redis] = None, prefix: str = "celery:queue_wait"):
+        self.redis = redis or redis_client
+        self.prefix = prefix
+
+    def record_wait(self, queue: str, seconds: float) -> None:
+        """Add one started task's queue wait"""
+        try:
+            pipe = self.redis.pipeline(transaction=False)
+            pipe.hincrbyfloat(f"{self.prefix}:seconds", queue, seconds)
+            pipe.hincrby(f"{self.prefix}:tasks", queue, 1)
+            pipe.execute()
+        except RedisError as e:
+            logger.warning(f"Could not record queue wait for {queue}: {e}")
+
+    def totals(self) -> Dict[str, Tuple[float, int]]:
+        """Get total wait seconds and started tasks per queue"""
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.hgetall(f"{self.prefix}:seconds")
+        pipe.hgetall(f"{self.prefix}:tasks")
+        seconds, tasks = pipe.execute()
+        return {queue: (float(seconds.get(queue, 0)), int(count)) for queue, count in tasks.items()}
+
+
+def queue_depths(app, queues: List[str]) -> Dict[str, int]:
+    """
+    Count messages waiting in each broker queue.
+
+    Args:
+        app: Celery app
+        queues: Queue names
+
+    Returns:
+        Mapping of queue to waiting messages (queues that don't exist yet count as empty)
+    """
+    depths = {}
+    with app.connection_for_read() as connection:
+        channel = connection.channel()
+        try:
+            for queue in queues:
+                try:
+                    depths[queue] = channel.queue_declare(queue=queue, passive=True).message_count
+                except connection.channel_errors:
+                    # Missing queue; AMQP also closes the channel on this
+                    depths[queue] = 0
+                    channel.close()
+                    channel = connection.channel()
+        finally:
+            channel.close()
+    return depths
+
+
+def refresh_queue_metrics() -> None:
+    """Update per-queue depth and wait metrics (call before exporting metrics)"""
+    from app.tasks.celery_app import celery_app
+
+    queues = all_queues()
+    try:
+        depths = queue_depths(celery_app, queues)
+        waits = queue_stats.totals()
+    except Exception as e:
+        logger.warning(f"Could not read queue metrics: {e}")
+        return
+
+    for queue in queues:
+        wait_seconds, started = waits.get(queue, (0.0, 0))
+        track_queue_stats(queue, depths.get(queue, 0), wait_seconds, started)
+
+
+# Shared queue wait totals
+queue_stats = QueueStats()
@@ -0,0 +1,38 @@
+# app/tasks/scheduler.py
+
+import logging
+import signal
+import threading
+
+from app.config import settings
+from app.core.scheduling import search_scheduler
+from app.tasks.scraping import run_search_task, sync_search_schedule
+
+logger = logging.getLogger(__name__)
+
+
+def main() -> None:
+    """
+    Run the search scheduler service.
+
+    Seeds the Redis queue from the database, then dispatches each search as
+    it falls due until SIGTERM/SIGINT. Started with
+    `python -m app.tasks.scheduler`; several instances may run at once.
+    """
+    logging.basicConfig(level=logging.INFO)
+    stop = threading.Event()
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(signum, lambda *args: stop.set())
+
+    sync_search_schedule()
+    logger.info("Search scheduler started")
+    search_scheduler.run(
+        run_search_task.delay,
+        stop=stop,
+        max_sleep=settings.SCHEDULER_MAX_SLEEP_SECONDS,
+    )
+    logger.info("Search scheduler stopped")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,20 +1,45 @@
 # app/tasks/scraping.py
 
-from celery import Task
+from celery import Task, chord
 from datetime import datetime, timedelta
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Set, Collection
+from sqlalchemy import tuple_
 from sqlalchemy.orm import Session
+from collections import defaultdict
+from functools import partial
+import asyncio
 import logging
+import random
+import threading
+import time
 
 from app.tasks.celery_app import celery_app
+from app.config import settings
 from app.database import SessionLocal
-from app.models import Search, Listing, TaskLog, SearchStatus
+from app.models import Search, Listing, SearchListing, SearchStatus, Marketplace
+from app.core.locks import search_run_lock
+from app.core.monitoring import track_duplicate_run, track_marketplace_scrape, track_seen_filter
+from app.core.resilience import CircuitOpenError
+from app.core.persistence import upsert_listings
+from app.core.partitions import drop_partitions_before, ensure_partitions
+from app.core.retention import purge_expired_listings, retention_windows
+from app.core.scheduling import search_scheduler
+from app.core.task_logs import prune_task_logs, task_log_sink, update_task_log_rollups
+from app.core.user_stats import reconcile_user_stats
 from app.agents import (
+    BaseAgent,
+    AsyncBaseAgent,
+    ScrapeResult,
     EbayAgent,
     FacebookAgent,
     GumtreeAgent,
     CraigslistAgent
 )
+from app.agents.http import run_coroutine
+from app.agents.coalescing import query_coalescer
+from app.agents.fingerprint import content_hash, fingerprint_store
+from app.agents.watermark import Watermark
+from app.agents.seen import seen_filter
 
 logger = logging.getLogger(__name__)
 
@@ -28,8 +53,21 @@ AGENT_MAP = {
 
 
 class DatabaseTask(Task):
-    """Base task with database session management"""
-    _db: Session = None
+    """
+    Base task with database session management.
+
+    Sessions are kept per thread: a task instance is shared by all threads
+    of a threads-pool worker.
+    """
+    _local = threading.local()
+
+    @property
+    def _db(self) -> Optional[Session]:
+        return getattr(self._local, self.name, None)
+
+    @_db.setter
+    def _db(self, session: Optional[Session]) -> None:
+        setattr(self._local, self.name, session)
 
     @property
     def db(self) -> Session:
@@ -43,29 +81,418 @@ class DatabaseTask(Task):
             self._db = None
 
 
+class NewListingCollector:
+    """
+    Folds results pages (newest first) into one ScrapeResult, stopping once
+    the search's already-stored listings are reached.
+
+    A listing is known when its external ID is already stored or it is at
+    or below the search's watermark. Paging ends after
+    SCRAPING_STOP_AFTER_KNOWN consecutive known listings, so a pinned or
+    promoted old item at the top doesn't end it prematurely.
+
+    With `keep_known`, known listings only decide where paging stops and
+    are kept in the result: that is what gets shared with other searches,
+    which each drop their own known listings afterwards.
+    """
+
+    def __init__(
+        self,
+        known_ids: Collection[str],
+        watermark: Optional[Watermark] = None,
+        keep_known: bool = False
+    ):
+        self.known_ids = known_ids
+        self.watermark = watermark or Watermark()
+        self.keep_known = keep_known
+        self.result: Optional[ScrapeResult] = None
+        self._seen: Set[str] = set()
+        self._known_run: List[str] = []
+
+    def add(self, page: ScrapeResult) -> bool:
+        """
+        Add the next page.
+
+        Args:
+            page: Results page
+
+        Returns:
+            True once no further pages are needed
+        """
+        if self.result is None:
+            # Validators and unchanged status come from the first page
+            self.result = ScrapeResult(
+                unchanged=page.unchanged,
+                etag=page.etag,
+                last_modified=page.last_modified,
+                content_hash=page.content_hash,
+                stop_id=page.stop_id
+            )
+
+        for listing in page.listings:
+            external_id = listing["external_id"]
+            known = external_id in self.known_ids or self.watermark.covers(listing)
+            if known:
+                self._known_run.append(external_id)
+            else:
+                self._known_run = []
+
+            # Items shift between pages while we page; keep the first sighting
+            if (self.keep_known or not known) and external_id not in self._seen:
+                self._seen.add(external_id)
+                self.result.listings.append(listing)
+
+            if len(self._known_run) >= settings.SCRAPING_STOP_AFTER_KNOWN:
+                self.result.stop_id = self._known_run[0]
+                return True
+
+        return page.unchanged or not page.listings
+
+
+async def _collect_pages(agent: AsyncBaseAgent, search, fingerprint, known_ids, watermark) -> ScrapeResult:
+    """Consume an async agent's pages until known listings are reached, keeping them"""
+    collector = NewListingCollector(known_ids, watermark, keep_known=True)
+    pages = agent.scrape_pages(search, fingerprint)
+    try:
+        async for page in pages:
+            if collector.add(page):
+                break
+    finally:
+        await pages.aclose()
+    return collector.result or ScrapeResult()
+
+
+def _collect_pages_sync(agent: BaseAgent, search, fingerprint, known_ids, watermark) -> ScrapeResult:
+    """Consume a blocking agent's pages until known listings are reached, keeping them"""
+    collector = NewListingCollector(known_ids, watermark, keep_known=True)
+    pages = agent.scrape_pages(search, fingerprint)
+    try:
+        for page in pages:
+            if collector.add(page):
+                break
+    finally:
+        pages.close()
+    return collector.result or ScrapeResult()
+
+
+async def _scrape_marketplace(
+    marketplace: str,
+    search,
+    known_ids: Collection[str] = (),
+    watermark: Optional[Watermark] = None
+) -> ScrapeResult:
+    """Scrape one marketplace, bounded by the per-marketplace timeout"""
+    agent_class = AGENT_MAP.get(marketplace)
+    if not agent_class:
+        logger.warning(f"No agent found for marketplace: {marketplace}")
+        return ScrapeResult()
+
+    fingerprint = await asyncio.to_thread(fingerprint_store.get, search.id, marketplace)
+
+    agent = agent_class()
+    if not agent.exact_timestamps:
+        # Approximate posting times could hide genuinely new listings
+        watermark = None
+    if isinstance(agent, AsyncBaseAgent):
+        scrape = partial(_collect_pages, agent, search, fingerprint, known_ids, watermark)
+    else:
+        # Blocking agents run in a worker thread so they don't stall the loop
+        scrape = partial(
+            asyncio.to_thread, _collect_pages_sync, agent, search, fingerprint, known_ids, watermark
+        )
+
+    try:
+        # Identical queries from other searches share one fetch
+        result = await asyncio.wait_for(
+            query_coalescer.fetch(marketplace, search, scrape, known_ids),
+            timeout=settings.SCRAPING_MARKETPLACE_TIMEOUT
+        )
+    except asyncio.TimeoutError:
+        logger.warning(
+            f"Scraping {marketplace} timed out after "
+            f"{settings.SCRAPING_MARKETPLACE_TIMEOUT}s for search {search.id}"
+        )
+        track_marketplace_scrape(marketplace, "timeout")
+        return ScrapeResult(error=f"timed out after {settings.SCRAPING_MARKETPLACE_TIMEOUT}s")
+    except CircuitOpenError as e:
+        logger.info(f"Skipping {marketplace} for search {search.id}: {e}")
+        track_marketplace_scrape(marketplace, "circuit_open")
+        return ScrapeResult(error=str(e))
+    except Exception as e:
+        logger.error(f"Error scraping {marketplace} for search {search.id}: {e}", exc_info=True)
+        track_marketplace_scrape(marketplace, "failed")
+        return ScrapeResult(error=str(e) or type(e).__name__)
+
+    # Fetched pages are shared as they came; drop what this search already
+    # has, and anything past its own stopping point
+    collector = NewListingCollector(known_ids, watermark)
+    collector.add(result)
+    result = collector.result
+
+    if result.stop_id is not None and not result.listings:
+        # The newest listings are ones this search already has
+        result.unchanged = True
+        result.etag = result.etag or fingerprint.get("etag")
+        result.last_modified = result.last_modified or fingerprint.get("last_modified")
+        result.content_hash = result.content_hash or fingerprint.get("content_hash")
+    elif not result.unchanged and result.listings:
+        # No validators (or the marketplace ignored them): compare content
+        result.content_hash = content_hash(result.listings)
+        result.unchanged = result.content_hash == fingerprint.get("content_hash")
+        # Keep validators from earlier runs when this result carries none
+        result.etag = result.etag or fingerprint.get("etag")
+        result.last_modified = result.last_modified or fingerprint.get("last_modified")
+
+    if result.unchanged:
+        track_marketplace_scrape(marketplace, "unchanged")
+    else:
+        track_marketplace_scrape(marketplace, "success", len(result.listings))
+    return result
+
+
+async def _scrape_marketplaces(search, known_ids: Dict[str, Set[str]]) -> Dict[str, ScrapeResult]:
+    """Scrape all marketplaces of a search concurrently"""
+    marketplaces = list(search.marketplaces)
+    watermarks = getattr(search, "watermarks", None) or {}
+    results = await asyncio.gather(*(
+        _scrape_marketplace(
+            marketplace,
+            search,
+            known_ids.get(marketplace, set()),
+            Watermark.from_dict(watermarks.get(marketplace))
+        )
+        for marketplace in marketplaces
+    ))
+    return dict(zip(marketplaces, results))
+
+
+def scrape_marketplaces(search, known_ids: Optional[Dict[str, Set[str]]] = None) -> Dict[str, ScrapeResult]:
+    """
+    Fetch listings from every marketplace of a search on one event loop.
+
+    Wall-clock time is bounded by the slowest marketplace (or
+    SCRAPING_MARKETPLACE_TIMEOUT) rather than the sum of all fetches.
+    Marketplaces whose page hasn't changed since the search's last
+    successful run come back flagged `unchanged`. Results are paged newest
+    first and paging stops once listings in `known_ids` or at or below the
+    search's per-marketplace watermark are reached; only newer listings
+    are returned.
+
+    Args:
+        search: Search model instance
+        known_ids: Already-stored external IDs per marketplace
+
+    Returns:
+        Mapping of marketplace to its scrape result
+    """
+    return run_coroutine(_scrape_marketplaces(search, known_ids or {}))
+
+
+def known_external_ids(db: Session, search_id: int, marketplace: Optional[str] = None) -> Dict[str, Set[str]]:
+    """
+    Get the most recently stored external IDs of a search, per marketplace.
+
+    Args:
+        db: Database session
+        search_id: Search ID
+        marketplace: Only look at this marketplace's listings
+
+    Returns:
+        Mapping of marketplace to external IDs (at most SCRAPING_KNOWN_IDS_LIMIT in total)
+    """
+    query = db.query(Listing.marketplace, Listing.external_id).join(
+        SearchListing, SearchListing.listing_id == Listing.id
+    ).filter(SearchListing.search_id == search_id)
+    if marketplace is not None:
+        query = query.filter(Listing.marketplace == Marketplace(marketplace))
+    rows = query.order_by(SearchListing.id.desc()).limit(settings.SCRAPING_KNOWN_IDS_LIMIT).all()
+
+    known: Dict[str, Set[str]] = {}
+    for marketplace, external_id in rows:
+        known.setdefault(getattr(marketplace, "value", marketplace), set()).add(external_id)
+    return known
+
+
+def _group_by_marketplace(rows: List[Dict[str, Any]]) -> Dict[str, List[str]]:
+    grouped = defaultdict(list)
+    for row in rows:
+        grouped[row["marketplace"]].append(row["external_id"])
+    return grouped
+
+
+def _group_by_search(rows: List[Dict[str, Any]]) -> Dict[tuple, List[str]]:
+    grouped = defaultdict(list)
+    for row in rows:
+        grouped[(row["search_id"], row["marketplace"])].append(row["external_id"])
+    return grouped
+
+
+def drop_seen_listings(db: Session, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Drop listing rows the seen filter says their search already has stored.
+
+    A sample (SEEN_FILTER_VERIFY_RATE) of filter hits is checked against
+    the database; hits that turn out not to be stored are counted as false
+    positives and kept.
+
+    Args:
+        db: Database session
+        rows: Listing rows about to be persisted
+
+    Returns:
+        Rows that still need to go through the database
+    """
+    if not settings.SEEN_FILTER_ENABLED or not rows:
+        return rows
+
+    seen = {
+        (search_id, marketplace): seen_filter.seen(search_id, marketplace, external_ids)
+        for (search_id, marketplace), external_ids in _group_by_search(rows).items()
+    }
+    unseen, hits = [], []
+    for row in rows:
+        (hits if row["external_id"] in seen[(row["search_id"], row["marketplace"])] else unseen).append(row)
+
+    for (_, marketplace), seen_ids in seen.items():
+        track_seen_filter(marketplace, "hit", len(seen_ids))
+    for marketplace, external_ids in _group_by_marketplace(unseen).items():
+        track_seen_filter(marketplace, "miss", len(external_ids))
+
+    sample = [row for row in hits if random.random() < settings.SEEN_FILTER_VERIFY_RATE]
+    if sample:
+        keys = [(row["search_id"], Marketplace(row["marketplace"]), row["external_id"]) for row in sample]
+        stored = {
+            (search_id, Marketplace(marketplace), external_id)
+            for search_id, marketplace, external_id in db.query(
+                SearchListing.search_id, Listing.marketplace, Listing.external_id
+            ).join(
+                Listing, Listing.id == SearchListing.listing_id
+            ).filter(
+                tuple_(SearchListing.search_id, Listing.marketplace, Listing.external_id).in_(keys)
+            )
+        }
+        for key, row in zip(keys, sample):
+            if key not in stored:
+                track_seen_filter(row["marketplace"], "false_positive")
+                unseen.append(row)
+
+    return unseen
+
+
+def advance_watermarks(
+    watermarks: Optional[Dict[str, Any]],
+    results: Dict[str, ScrapeResult]
+) -> Dict[str, Any]:
+    """
+    Move each marketplace's watermark up to the newest listing just processed.
+
+    Args:
+        watermarks: Stored watermarks of the search
+        results: This run's scrape results
+
+    Returns:
+        New watermarks mapping (a fresh dict so the JSON column is flagged dirty)
+    """
+    watermarks = dict(watermarks or {})
+    for marketplace, result in results.items():
+        if result.unchanged or not result.listings:
+            continue
+        if not getattr(AGENT_MAP.get(marketplace), "exact_timestamps", False):
+            continue
+        current = Watermark.from_dict(watermarks.get(marketplace))
+        watermarks[marketplace] = current.advance(result.listings).to_dict()
+    return watermarks
+
+
+def build_listing_rows(search_id: int, results: Dict[str, ScrapeResult]) -> List[Dict[str, Any]]:
+    """Turn scrape results into listing rows, skipping unchanged marketplaces"""
+    now = datetime.utcnow()
+    return [
+        {
+            **listing_data,
+            "search_id": search_id,
+            "marketplace": marketplace,
+            "posted_at": listing_data.get("posted_at") or now,
+        }
+        for marketplace, result in results.items()
+        # Same page as last run: nothing new to parse or persist
+        if not result.unchanged
+        for listing_data in result.listings
+    ]
+
+
+def remember_results(search_id: int, results: Dict[str, ScrapeResult], rows: List[Dict[str, Any]]) -> None:
+    """Save page fingerprints and seen listings (call only once rows are committed)"""
+    for marketplace, result in results.items():
+        if result.error is None:
+            fingerprint_store.save(search_id, marketplace, result.fingerprint)
+    for marketplace, external_ids in _group_by_marketplace(rows).items():
+        seen_filter.add(search_id, marketplace, external_ids)
+
+
+def marketplace_queue(marketplace: str) -> Optional[str]:
+    """Queue for a marketplace's fan-out subtasks (None: the default queue)"""
+    return settings.marketplace_queues.get(marketplace)
+
+
 @celery_app.task(base=DatabaseTask, bind=True)
 def run_search_task(self, search_id: int) -> Dict[str, Any]:
     """
     Run marketplace scraping for a specific search.
 
+    Holds the search's run lock for the whole run, so a search is never
+    scraped twice at once; a duplicate dispatch collapses into the running
+    one (and may queue one follow-up run).
+
     Args:
         search_id: ID of the search to execute
 
     Returns:
         Task result with statistics
     """
-    db = self.db
+    lock_token = search_run_lock.acquire(search_id)
+    if lock_token is None:
+        return collapse_duplicate_run(search_id)
+
+    handed_off = False
+    try:
+        with search_run_lock.keep_alive(search_id, lock_token):
+            result = _run_search(self, search_id, lock_token)
+        # A fanned-out run keeps the lock until its callback
+        handed_off = result.get("status") == "dispatched"
+        return result
+    finally:
+        if not handed_off:
+            finish_search_run(search_id, lock_token)
+
+
+def collapse_duplicate_run(search_id: int) -> Dict[str, Any]:
+    """Skip a run of a search that is already running, queueing one follow-up if enabled"""
+    follow_up = settings.SEARCH_RUN_FOLLOW_UP and search_run_lock.request_follow_up(search_id)
+    track_duplicate_run("follow_up" if follow_up else "collapsed")
+    logger.info(f"Search {search_id} is already running, {'queued follow-up' if follow_up else 'skipping'}")
+    return {"search_id": search_id, "status": "duplicate", "follow_up_queued": follow_up}
+
 
-    # Create task log
-    task_log = TaskLog(
-        task_id=self.request.id,
-        task_name="run_search_task",
+def finish_search_run(search_id: int, lock_token: str) -> None:
+    """Release a search's run lock and start the follow-up run if one was requested"""
+    search_run_lock.release(search_id, lock_token)
+    if search_run_lock.take_follow_up(search_id):
+        run_search_task.delay(search_id)
+
+
+def _run_search(task: DatabaseTask, search_id: int, lock_token: str) -> Dict[str, Any]:
+    """Body of run_search_task, run while holding the search's lock"""
+    db = task.db
+    task_id = task.request.id
+
+    # Log the run; task logs are buffered and written in batches
+    task_log_sink.record(
+        db, task_id, "run_search_task",
         status="running",
         search_id=search_id,
         started_at=datetime.utcnow()
     )
-    db.add(task_log)
-    db.commit()
 
     try:
         # Get search
@@ -74,53 +501,65 @@ def run_search_task(self, search_id: int) -> Dict[str, Any]:
             raise ValueError(f"Search {search_id} not found")
 
         if search.status != SearchStatus.ACTIVE:
+            search_scheduler.unschedule(search_id)
             return {"message": "Search is not active", "listings_found": 0}
 
-        # Track statistics
-        total_listings = 0
-        new_listings = 0
-
-        # Run scrapers for each marketplace
-        for marketplace in search.marketplaces:
-            agent_class = AGENT_MAP.get(marketplace)
-            if not agent_class:
-                logger.warning(f"No agent found for marketplace: {marketplace}")
-                continue
-
-            agent = agent_class()
-            listings = agent.scrape(search)
-
-            # Save listings to database
-            for listing_data in listings:
-                # Check if listing already exists
-                existing = db.query(Listing).filter(
-                    Listing.marketplace == marketplace,
-                    Listing.external_id == listing_data["external_id"]
-                ).first()
-
-                if not existing:
-                    listing = Listing(
-                        search_id=search_id,
-                        marketplace=marketplace,
-                        **listing_data
-                    )
-                    db.add(listing)
-                    new_listings += 1
-
-                total_listings += 1
-
-        # Update search last_checked_at
+        if settings.SCRAPING_FANOUT:
+            return fan_out_search(search, task_id, lock_token)
+
+        # Run scrapers for all marketplaces concurrently, paging only as far
+        # back as the newest listings this search already has
+        results = scrape_marketplaces(search, known_external_ids(db, search_id))
+        unchanged_marketplaces = [
+            marketplace for marketplace, result in results.items() if result.unchanged
+        ]
+        failed_marketplaces = [
+            marketplace for marketplace, result in results.items() if result.error is not None
+        ]
+        rows = build_listing_rows(search_id, results)
+        listings_by_marketplace = {marketplace: len(result.listings) for marketplace, result in results.items()}
+
+        # Skip listings already known to be stored, then save the rest of
+        # all marketplaces' listings in one bulk upsert
+        total_listings = len(rows)
+        rows = drop_seen_listings(db, rows)
+        upserted = upsert_listings(db, rows)
+        # New to this search, even if another search stored them first
+        new_listings = len(upserted.linked_ids)
+
+        # Update search last_checked_at, schedule the next run and move
+        # watermarks past this run
         search.last_checked_at = datetime.utcnow()
+        search.schedule_next_run()
+        search.watermarks = advance_watermarks(search.watermarks, results)
         db.commit()
+        search_scheduler.schedule(search_id, search.next_run_at)
+
+        # Only remember fingerprints and seen listings once they're safely stored
+        remember_results(search_id, results, rows)
 
         # Update task log
-        task_log.status = "success"
-        task_log.completed_at = datetime.utcnow()
-        task_log.result = {
-            "total_listings": total_listings,
-            "new_listings": new_listings
-        }
-        db.commit()
+        if failed_marketplaces and len(failed_marketplaces) == len(results):
+            status = "failed"
+        elif unchanged_marketplaces and len(unchanged_marketplaces) == len(results):
+            status = "unchanged"
+        else:
+            status = "success"
+        task_log_sink.record(
+            db, task_id, "run_search_task",
+            status=status,
+            completed_at=datetime.utcnow(),
+            result={
+                "total_listings": total_listings,
+                "new_listings": new_listings,
+                "unchanged_marketplaces": unchanged_marketplaces,
+                "failed_marketplaces": failed_marketplaces,
+                "listings_by_marketplace": listings_by_marketplace
+            },
+            error="; ".join(
+                f"{marketplace}: {results[marketplace].error}" for marketplace in failed_marketplaces
+            ) or None
+        )
 
         # Trigger alerts if there are new listings
         if new_listings > 0:
@@ -129,20 +568,245 @@ def run_search_task(self, search_id: int) -> Dict[str, Any]:
 
         return {
             "search_id": search_id,
+            "status": status,
             "total_listings": total_listings,
-            "new_listings": new_listings
+            "new_listings": new_listings,
+            "unchanged_marketplaces": unchanged_marketplaces,
+            "failed_marketplaces": failed_marketplaces
         }
 
     except Exception as e:
         # Log error
         logger.error(f"Error in run_search_task: {e}", exc_info=True)
-        task_log.status = "failed"
-        task_log.completed_at = datetime.utcnow()
-        task_log.error = str(e)
-        db.commit()
+        db.rollback()
+        task_log_sink.record(
+            db, task_id, "run_search_task",
+            status="failed",
+            completed_at=datetime.utcnow(),
+            error=str(e)
+        )
         raise
 
 
+def fan_out_search(search: Search, run_task_id: str, lock_token: str) -> Dict[str, Any]:
+    """
+    Run a search as one subtask per marketplace.
+
+    Each marketplace is scraped and persisted by its own task, routed to
+    its queue from SCRAPING_MARKETPLACE_QUEUES, so a slow or crashing
+    marketplace neither holds up nor loses the others' listings.
+    `finalize_search_run` runs once all of them are done and releases the
+    search's run lock.
+
+    Args:
+        search: Active search
+        run_task_id: Task ID of the search run, whose log the callback finalizes
+        lock_token: Token of the search's run lock
+
+    Returns:
+        Task result naming the dispatched marketplaces
+    """
+    marketplaces = list(search.marketplaces)
+    subtasks = []
+    for marketplace in marketplaces:
+        subtask = scrape_marketplace_task.s(search.id, marketplace, lock_token)
+        queue = marketplace_queue(marketplace)
+        subtasks.append(subtask.set(queue=queue) if queue else subtask)
+    # Cover the subtasks' queue wait; they renew the lease while running
+    search_run_lock.renew(search.id, lock_token, ttl=celery_app.conf.task_time_limit)
+    chord(subtasks)(finalize_search_run.s(search.id, run_task_id, lock_token))
+
+    return {
+        "search_id": search.id,
+        "status": "dispatched",
+        "marketplaces": marketplaces
+    }
+
+
+@celery_app.task(base=DatabaseTask, bind=True)
+def scrape_marketplace_task(self, search_id: int, marketplace: str, lock_token: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Scrape and store one marketplace of a search (fan-out subtask).
+
+    Never raises, so the run's callback always fires; failures come back
+    as a "failed" outcome instead.
+
+    Args:
+        search_id: ID of the search
+        marketplace: Marketplace to scrape
+        lock_token: Token of the search's run lock, renewed while scraping
+
+    Returns:
+        Outcome with listing counts and the marketplace's advanced watermark
+    """
+    if lock_token is not None:
+        with search_run_lock.keep_alive(search_id, lock_token):
+            return _scrape_marketplace_outcome(self.db, search_id, marketplace)
+    return _scrape_marketplace_outcome(self.db, search_id, marketplace)
+
+
+def _scrape_marketplace_outcome(db: Session, search_id: int, marketplace: str) -> Dict[str, Any]:
+    try:
+        search = db.query(Search).filter(Search.id == search_id).first()
+        if not search:
+            raise ValueError(f"Search {search_id} not found")
+
+        watermarks = search.watermarks or {}
+        result = run_coroutine(_scrape_marketplace(
+            marketplace,
+            search,
+            known_external_ids(db, search_id, marketplace).get(marketplace, set()),
+            Watermark.from_dict(watermarks.get(marketplace))
+        ))
+        if result.error is not None:
+            return {"marketplace": marketplace, "status": "failed", "error": result.error}
+        results = {marketplace: result}
+
+        rows = build_listing_rows(search_id, results)
+        total_listings = len(rows)
+        rows = drop_seen_listings(db, rows)
+        upserted = upsert_listings(db, rows)
+        db.commit()
+        remember_results(search_id, results, rows)
+
+        # Siblings run concurrently, so the callback writes the watermarks
+        return {
+            "marketplace": marketplace,
+            "status": "unchanged" if result.unchanged else "success",
+            "total_listings": total_listings,
+            "new_listings": len(upserted.linked_ids),
+            "watermark": advance_watermarks(watermarks, results).get(marketplace)
+        }
+
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Error scraping {marketplace} for search {search_id}: {e}", exc_info=True)
+        return {"marketplace": marketplace, "status": "failed", "error": str(e)}
+
+
+@celery_app.task(base=DatabaseTask, bind=True)
+def finalize_search_run(
+    self,
+    outcomes: List[Dict[str, Any]],
+    search_id: int,
+    run_task_id: str,
+    lock_token: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Finish a fanned-out search run (chord callback).
+
+    Updates the search, finalizes its TaskLog, triggers alerts once for
+    all marketplaces and releases the search's run lock.
+
+    Args:
+        outcomes: Results of the run's scrape_marketplace_task subtasks
+        search_id: ID of the search
+        run_task_id: Task ID of the search run, whose TaskLog gets finalized
+        lock_token: Token of the search's run lock
+
+    Returns:
+        Task result with statistics
+    """
+    try:
+        return _finalize_search_run(self.db, outcomes, search_id, run_task_id)
+    finally:
+        if lock_token is not None:
+            finish_search_run(search_id, lock_token)
+
+
+def _finalize_search_run(
+    db: Session,
+    outcomes: List[Dict[str, Any]],
+    search_id: int,
+    run_task_id: str
+) -> Dict[str, Any]:
+    search = db.query(Search).filter(Search.id == search_id).first()
+
+    total_listings = sum(outcome.get("total_listings", 0) for outcome in outcomes)
+    new_listings = sum(outcome.get("new_listings", 0) for outcome in outcomes)
+    unchanged_marketplaces = [o["marketplace"] for o in outcomes if o["status"] == "unchanged"]
+    failed_marketplaces = [o["marketplace"] for o in outcomes if o["status"] == "failed"]
+
+    if search:
+        search.last_checked_at = datetime.utcnow()
+        search.schedule_next_run()
+        watermarks = dict(search.watermarks or {})
+        watermarks.update({o["marketplace"]: o["watermark"] for o in outcomes if o.get("watermark")})
+        search.watermarks = watermarks
+
+    if failed_marketplaces and len(failed_marketplaces) == len(outcomes):
+        status = "failed"
+    elif unchanged_marketplaces and len(unchanged_marketplaces) == len(outcomes):
+        status = "unchanged"
+    else:
+        status = "success"
+
+    db.commit()
+
+    task_log_sink.record(
+        db, run_task_id, "run_search_task",
+        status=status,
+        completed_at=datetime.utcnow(),
+        result={
+            "total_listings": total_listings,
+            "new_listings": new_listings,
+            "unchanged_marketplaces": unchanged_marketplaces,
+            "failed_marketplaces": failed_marketplaces,
+            "listings_by_marketplace": {o["marketplace"]: o.get("total_listings", 0) for o in outcomes}
+        },
+        error="; ".join(
+            f"{o['marketplace']}: {o.get('error')}" for o in outcomes if o["status"] == "failed"
+        ) or None
+    )
+
+    if search:
+        search_scheduler.update(search)
+
+    # Trigger alerts once for the whole run
+    if new_listings > 0:
+        from app.tasks.alerts import trigger_alerts_task
+        trigger_alerts_task.delay(search_id, new_listings)
+
+    return {
+        "search_id": search_id,
+        "status": status,
+        "total_listings": total_listings,
+        "new_listings": new_listings,
+        "unchanged_marketplaces": unchanged_marketplaces,
+        "failed_marketplaces": failed_marketplaces
+    }
+
+
+def claim_due_searches(db: Session, now: datetime, limit: int) -> List[int]:
+    """
+    Claim a batch of due active searches.
+
+    One range scan over `idx_status_next_run`; on PostgreSQL rows locked by
+    another scheduler are skipped, so concurrent schedulers never claim the
+    same search. Claimed searches get next_run_at pushed one interval ahead
+    (the run itself reschedules on success), so a failing search isn't
+    picked up again on every tick.
+
+    Args:
+        db: Database session
+        now: Current time
+        limit: Maximum searches to claim
+
+    Returns:
+        IDs of the claimed searches (committed)
+    """
+    searches = db.query(Search).filter(
+        Search.status == SearchStatus.ACTIVE,
+        Search.next_run_at <= now
+    ).order_by(Search.next_run_at).limit(limit).with_for_update(skip_locked=True).all()
+
+    for search in searches:
+        search.next_run_at = now + timedelta(minutes=search.check_interval_minutes or 60)
+    db.commit()
+
+    return [search.id for search in searches]
+
+
 @celery_app.task(bind=True)
 def check_active_searches(self) -> Dict[str, Any]:
     """
@@ -153,23 +817,18 @@ def check_active_searches(self) -> Dict[str, Any]:
     """
     db = SessionLocal()
     try:
-        # Find active searches that need to be checked
         now = datetime.utcnow()
-        searches = db.query(Search).filter(
-            Search.status == SearchStatus.ACTIVE
-        ).all()
-
         checked_count = 0
-        for search in searches:
-            # Check if enough time has passed since last check
-            if search.last_checked_at:
-                time_since_check = now - search.last_checked_at
-                if time_since_check.total_seconds() < (search.check_interval_minutes * 60):
-                    continue
+        while True:
+            search_ids = claim_due_searches(db, now, settings.SCHEDULER_BATCH_SIZE)
 
-            # Trigger search task
-            run_search_task.delay(search.id)
-            checked_count += 1
+            # Trigger search tasks only once the claim is committed
+            for search_id in search_ids:
+                run_search_task.delay(search_id)
+            checked_count += len(search_ids)
+
+            if len(search_ids) < settings.SCHEDULER_BATCH_SIZE:
+                break
 
         logger.info(f"Triggered {checked_count} search tasks")
 
@@ -181,28 +840,177 @@ def check_active_searches(self) -> Dict[str, Any]:
         db.close()
 
 
+@celery_app.task
+def sync_search_schedule() -> Dict[str, Any]:
+    """
+    Periodic task to re-seed the scheduler queue from the database.
+
+    Returns:
+        Number of active searches
+    """
+    db = SessionLocal()
+    try:
+        searches = db.query(Search.id, Search.next_run_at).filter(
+            Search.status == SearchStatus.ACTIVE
+        ).yield_per(settings.SCHEDULER_BATCH_SIZE)
+        active = search_scheduler.sync(searches)
+
+        logger.info(f"Synced {active} active searches to the scheduler")
+
+        return {
+            "active_searches": active
+        }
+
+    finally:
+        db.close()
+
+
+@celery_app.task
+def flush_task_logs() -> Dict[str, Any]:
+    """
+    Periodic task to write buffered task logs to the database.
+
+    Drains the task log stream in batches of TASK_LOG_FLUSH_BATCH_SIZE,
+    stopping after one flush interval so runs don't pile up.
+
+    Returns:
+        Number of task log entries written
+    """
+    db = SessionLocal()
+    try:
+        written = 0
+        deadline = time.monotonic() + settings.TASK_LOG_FLUSH_SECONDS
+        while time.monotonic() < deadline:
+            flushed = task_log_sink.flush(db)
+            written += flushed
+            if flushed < settings.TASK_LOG_FLUSH_BATCH_SIZE:
+                break
+
+        if written:
+            logger.debug(f"Wrote {written} buffered task log entries")
+
+        return {
+            "task_logs_written": written
+        }
+
+    finally:
+        db.close()
+
+
+@celery_app.task
+def rollup_task_logs() -> Dict[str, Any]:
+    """
+    Periodic task to summarize task logs into hourly rollups.
+
+    Health checks and dashboards read the rollups; raw task logs past
+    TASK_LOG_RETENTION_DAYS are pruned once summarized.
+
+    Returns:
+        Hours summarized and task logs pruned
+    """
+    db = SessionLocal()
+    try:
+        hours = update_task_log_rollups(db)
+        pruned = prune_task_logs(db)
+
+        if pruned:
+            logger.info(f"Pruned {pruned} task logs older than {settings.TASK_LOG_RETENTION_DAYS} days")
+
+        return {
+            "hours_rolled_up": hours,
+            "task_logs_pruned": pruned
+        }
+
+    finally:
+        db.close()
+
+
+@celery_app.task
+def reconcile_dashboard_stats() -> Dict[str, Any]:
+    """
+    Periodic task to recompute every user's dashboard counters.
+
+    The counters are updated incrementally as searches and listings
+    change; this corrects any drift, e.g. from dropped listings
+    partitions, and rolls over the daily new listings count.
+
+    Returns:
+        Number of users recomputed
+    """
+    db = SessionLocal()
+    try:
+        users = reconcile_user_stats(db)
+
+        logger.info(f"Reconciled dashboard counters of {users} users")
+
+        return {
+            "users_reconciled": users
+        }
+
+    finally:
+        db.close()
+
+
+@celery_app.task
+def maintain_listing_partitions() -> Dict[str, Any]:
+    """
+    Periodic task to keep the weekly listings partitions in shape.
+
+    Pre-creates LISTINGS_PARTITION_WEEKS_AHEAD future partitions and drops
+    the ones past the longest retention window. Does nothing unless
+    LISTINGS_PARTITIONED is set.
+
+    Returns:
+        Partitions created and dropped
+    """
+    if not settings.LISTINGS_PARTITIONED:
+        return {"created": [], "dropped": []}
+
+    db = SessionLocal()
+    try:
+        today = datetime.utcnow().date()
+        created = ensure_partitions(db, today, settings.LISTINGS_PARTITION_WEEKS_AHEAD)
+        cutoff = today - timedelta(days=max(retention_windows().values()))
+        dropped = drop_partitions_before(db, cutoff)
+
+        logger.info(f"Listings partitions: created {len(created)}, dropped {len(dropped)}")
+
+        return {
+            "created": created,
+            "dropped": dropped
+        }
+
+    finally:
+        db.close()
+
+
 @celery_app.task
 def cleanup_old_listings() -> Dict[str, Any]:
     """
     Periodic task to clean up old listings.
 
+    Retires search listings in small batches per subscription tier,
+    keeping saved ones, and deletes listings no search uses anymore; see
+    `purge_expired_listings`.
+
     Returns:
         Statistics about cleanup
     """
     db = SessionLocal()
     try:
-        # Delete listings older than 30 days
-        cutoff_date = datetime.utcnow() - timedelta(days=30)
-        deleted = db.query(Listing).filter(
-            Listing.created_at < cutoff_date
-        ).delete()
-
-        db.commit()
+        result = purge_expired_listings(db)
 
-        logger.info(f"Deleted {deleted} old listings")
+        logger.info(
+            f"Retired {result.total_deleted} old search listings and deleted {result.listings_deleted} "
+            f"listings in {result.batches} batches ({result.seconds:.1f}s)"
+        )
 
         return {
-            "listings_deleted": deleted
+            "listings_deleted": result.listings_deleted,
+            "search_listings_retired": result.total_deleted,
+            "deleted_by_tier": result.deleted,
+            "batches": result.batches,
+            "complete": result.complete
         }
 
     finally:
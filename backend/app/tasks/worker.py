@@ -0,0 +1,78 @@
+# app/tasks/worker.py
+
+import sys
+from dataclasses import dataclass
+from typing import Dict, List
+
+from app.config import settings
+from app.tasks.queues import ALERTS, MAINTENANCE, SCRAPE_IO, fanout_queues
+
+
+@dataclass(frozen=True)
+class WorkerProfile:
+    """Pool, concurrency and prefetch of the workers serving one workload queue"""
+    queues: List[str]
+    pool: str
+    concurrency: int
+    prefetch: int
+
+    def argv(self) -> List[str]:
+        """Celery worker command line for this profile"""
+        return [
+            "worker",
+            "-l", "info",
+            "-Q", ",".join(self.queues),
+            "-P", self.pool,
+            "-c", str(self.concurrency),
+            "--prefetch-multiplier", str(self.prefetch),
+        ]
+
+
+def worker_profiles() -> Dict[str, WorkerProfile]:
+    """
+    Worker profile per workload queue, sized from Settings.
+
+    Scrapes spend their time waiting on marketplaces, so they run on a
+    high-concurrency threads (or gevent) pool; agents parse pages as they
+    arrive, so there is no separate parsing workload. DB-heavy housekeeping
+    stays on prefork processes.
+    """
+    return {
+        # Also serves the per-marketplace fan-out queues
+        SCRAPE_IO: WorkerProfile(
+            queues=[SCRAPE_IO] + fanout_queues(),
+            pool=settings.CELERY_SCRAPE_POOL,
+            concurrency=settings.CELERY_SCRAPE_CONCURRENCY,
+            prefetch=settings.CELERY_SCRAPE_PREFETCH,
+        ),
+        ALERTS: WorkerProfile(
+            queues=[ALERTS],
+            pool="threads",
+            concurrency=settings.CELERY_ALERTS_CONCURRENCY,
+            prefetch=settings.CELERY_ALERTS_PREFETCH,
+        ),
+        MAINTENANCE: WorkerProfile(
+            queues=[MAINTENANCE],
+            pool="prefork",
+            concurrency=settings.CELERY_MAINTENANCE_CONCURRENCY,
+            prefetch=settings.CELERY_MAINTENANCE_PREFETCH,
+        ),
+    }
+
+
+def main() -> None:
+    """
+    Start a worker for one workload queue.
+
+    Usage: python -m app.tasks.worker <scrape-io|alerts|maintenance>
+    """
+    profiles = worker_profiles()
+    if len(sys.argv) != 2 or sys.argv[1] not in profiles:
+        sys.exit(f"usage: python -m app.tasks.worker <{'|'.join(profiles)}>")
+
+    from app.tasks.celery_app import celery_app
+    celery_app.worker_main(profiles[sys.argv[1]].argv())
+
+
+if __name__ == "__main__":
+    main()
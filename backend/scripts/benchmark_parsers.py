@@ -0,0 +1,52 @@
+# scripts/benchmark_parsers.py
+
+"""
+Benchmark the HTML parser backends against the saved fixture pages.
+
+Usage (from backend/):
+    python scripts/benchmark_parsers.py [--rounds 50]
+"""
+
+import argparse
+import sys
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.agents import CraigslistAgent, EbayAgent, GumtreeAgent  # noqa: E402
+from app.agents.parsing import PARSER_BACKENDS, available_backends  # noqa: E402
+
+FIXTURES = Path(__file__).resolve().parent.parent / "tests" / "fixtures"
+
+AGENTS = {
+    "ebay": EbayAgent,
+    "craigslist": CraigslistAgent,
+    "gumtree": GumtreeAgent,
+}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rounds", type=int, default=50, help="Parses per timing run")
+    args = parser.parse_args()
+
+    print(f"{'marketplace':<12} {'backend':<12} {'items':>5} {'ms/page':>9} {'speedup':>8}")
+    for marketplace, agent_class in AGENTS.items():
+        html = (FIXTURES / f"{marketplace}.html").read_text()
+        spec = agent_class.selectors
+
+        timings = {}
+        for name in available_backends():
+            backend = PARSER_BACKENDS[name]()
+            items = len(backend.extract(html, spec))
+            best = min(timeit.repeat(lambda: backend.extract(html, spec), number=args.rounds, repeat=3))
+            timings[name] = (items, best / args.rounds * 1000)
+
+        baseline = timings["html.parser"][1]
+        for name, (items, ms) in timings.items():
+            print(f"{marketplace:<12} {name:<12} {items:>5} {ms:>9.2f} {baseline / ms:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
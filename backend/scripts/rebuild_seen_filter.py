@@ -0,0 +1,39 @@
+# scripts/rebuild_seen_filter.py
+
+"""
+Warm up or rebuild the Redis seen-listing filter from the search listings.
+
+Run after a Redis flush, when enabling SEEN_FILTER_ENABLED on an existing
+database, or after upgrading to per-search filter entries.
+
+Usage (from backend/):
+    python scripts/rebuild_seen_filter.py [--batch-size 5000]
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.database import SessionLocal  # noqa: E402
+from app.agents.seen import seen_filter  # noqa: E402
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--batch-size", type=int, default=5000, help="Search listings read per query")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        start = time.monotonic()
+        loaded = seen_filter.rebuild(db, batch_size=args.batch_size)
+        print(f"Loaded {loaded} search listings into the seen filter in {time.monotonic() - start:.1f}s")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -70,3 +70,129 @@ def test_search_data():
         "max_price": 500.0,
         "check_interval_minutes": 60
     }
+
+
+class FakeRedis:
+    """Minimal in-memory stand-in for the Redis commands the app uses"""
+
+    def __init__(self):
+        self.data = {}
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def set(self, key, value, nx=False, ex=None, px=None):
+        if nx and key in self.data:
+            return None
+        self.data[key] = str(value)
+        return True
+
+    def delete(self, *keys):
+        return sum(1 for key in keys if self.data.pop(key, None) is not None)
+
+    def exists(self, *keys):
+        return sum(1 for key in keys if key in self.data)
+
+    def incr(self, key):
+        self.data[key] = str(int(self.data.get(key, 0)) + 1)
+        return int(self.data[key])
+
+    def expire(self, key, seconds):
+        return key in self.data
+
+    def hgetall(self, key):
+        return dict(self.data.get(key, {}))
+
+    def hset(self, key, field=None, value=None, mapping=None):
+        values = self.data.setdefault(key, {})
+        if field is not None:
+            values[field] = str(value)
+        for item_field, item_value in (mapping or {}).items():
+            values[item_field] = str(item_value)
+        return True
+
+    def hincrby(self, key, field, amount=1):
+        values = self.data.setdefault(key, {})
+        values[field] = str(int(values.get(field, 0)) + amount)
+        return int(values[field])
+
+    def hincrbyfloat(self, key, field, amount=1.0):
+        values = self.data.setdefault(key, {})
+        values[field] = str(float(values.get(field, 0)) + amount)
+        return float(values[field])
+
+    def sadd(self, key, *members):
+        values = self.data.setdefault(key, set())
+        added = len(set(members) - values)
+        values.update(members)
+        return added
+
+    def smismember(self, key, members):
+        values = self.data.get(key, set())
+        return [int(member in values) for member in members]
+
+    def expireat(self, key, when):
+        return key in self.data
+
+    def zadd(self, key, mapping, nx=False, gt=False):
+        values = self.data.setdefault(key, {})
+        added = 0
+        for member, score in mapping.items():
+            if nx and member in values:
+                continue
+            if gt and member in values and float(score) <= values[member]:
+                continue
+            added += member not in values
+            values[member] = float(score)
+        return added
+
+    def zrem(self, key, *members):
+        values = self.data.get(key, {})
+        return sum(1 for member in members if values.pop(member, None) is not None)
+
+    def zrange(self, key, start, end, withscores=False):
+        items = sorted(self.data.get(key, {}).items(), key=lambda item: (item[1], item[0]))
+        items = items[start:] if end == -1 else items[start:end + 1]
+        return items if withscores else [member for member, _ in items]
+
+    def zmscore(self, key, members):
+        values = self.data.get(key, {})
+        return [values.get(member) for member in members]
+
+    def zremrangebyscore(self, key, low, high):
+        values = self.data.get(key, {})
+        removed = [member for member, score in values.items() if float(low) <= score <= float(high)]
+        for member in removed:
+            del values[member]
+        return len(removed)
+
+    def zcard(self, key):
+        return len(self.data.get(key, {}))
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+
+class FakePipeline:
+    """Queues FakeRedis calls and runs them on execute()"""
+
+    def __init__(self, redis):
+        self.redis = redis
+        self.calls = []
+
+    def __getattr__(self, name):
+        def queue(*args, **kwargs):
+            self.calls.append((name, args, kwargs))
+            return self
+        return queue
+
+    def execute(self):
+        results = [getattr(self.redis, name)(*args, **kwargs) for name, args, kwargs in self.calls]
+        self.calls = []
+        return results
+
+
+@pytest.fixture
+def fake_redis():
+    """In-memory Redis for code paths that coordinate through Redis"""
+    return FakeRedis()
@@ -0,0 +1,387 @@
+# tests/test_agents.py
+
+import asyncio
+import threading
+from datetime import datetime
+from pathlib import Path
+from types import SimpleNamespace
+
+import httpx
+import pytest
+from redis.exceptions import ConnectionError as RedisConnectionError
+
+from app.agents import base, http
+from app.agents import CraigslistAgent, EbayAgent, GumtreeAgent
+from app.agents.parsing import (
+    PARSER_BACKENDS,
+    LxmlBackend,
+    SoupBackend,
+    available_backends,
+    get_parser,
+)
+from app.core import rate_limit
+from app.core.rate_limit import RateLimiter, RateLimitExceeded, gcra_reserve
+from app.core.resilience import CIRCUIT_HALF_OPEN, CIRCUIT_OPEN, CircuitBreaker, CircuitOpenError
+from tests.conftest import FakeRedis
+
+FIXTURES = Path(__file__).parent / "fixtures"
+
+SEARCH = SimpleNamespace(id=1, keywords="vintage camera", min_price=None, max_price=None, location=None)
+
+
+@pytest.fixture(autouse=True)
+def fresh_clients():
+    """Give every test its own pool and worker loop"""
+    http.close_clients()
+    yield
+    http.close_clients()
+
+
+class TestHttpPool:
+    """Test the process-wide pooled HTTP clients"""
+
+    def test_sync_client_is_shared(self):
+        """Blocking agents share one pooled client"""
+        assert http.get_client() is http.get_client()
+
+    def test_async_client_survives_between_runs(self):
+        """The worker loop keeps its async client across task runs"""
+        async def current_client():
+            return http.get_async_client()
+
+        first = http.run_coroutine(current_client())
+        second = http.run_coroutine(current_client())
+
+        assert first is second
+        assert not first.is_closed
+
+    def test_close_clients(self):
+        """Shutdown closes pooled clients and the worker loop"""
+        async def current_client():
+            return http.get_async_client()
+
+        async_client = http.run_coroutine(current_client())
+        sync_client = http.get_client()
+        loop = http.get_loop()
+
+        http.close_clients()
+
+        assert async_client.is_closed
+        assert sync_client.is_closed
+        assert loop.is_closed()
+
+    def test_threads_get_their_own_loop(self):
+        """Threads-pool workers run coroutines side by side, one loop per thread"""
+        results = []
+
+        def run():
+            results.append(http.run_coroutine(asyncio.sleep(0.2, result=http.get_loop())))
+
+        threads = [threading.Thread(target=run) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert len(results) == 2 and results[0] is not results[1]
+        http.close_clients()
+        assert all(loop.is_closed() for loop in results)
+
+
+class GcraRedis(FakeRedis):
+    """FakeRedis running the rate limiter script in Python, on a settable clock"""
+
+    def __init__(self):
+        super().__init__()
+        self.now_ms = 0
+        self.calls = []
+
+    def register_script(self, source):
+        def reserve(keys, args):
+            self.calls.append((keys, args))
+            tat = self.get(keys[0])
+            interval, burst, max_wait = args
+            wait, new_tat = gcra_reserve(
+                int(tat) if tat is not None else None, self.now_ms, interval, burst, max_wait
+            )
+            if new_tat is not None:
+                self.set(keys[0], new_tat, px=new_tat - self.now_ms + interval)
+            return wait
+        return reserve
+
+
+class TestRateLimiter:
+    """Test the fleet-wide marketplace rate limiter"""
+
+    def test_burst_is_booked_back_to_back(self):
+        """The first `burst` requests don't wait, later ones are spaced by the interval"""
+        tat, waits = None, []
+        for _ in range(5):
+            wait, tat = gcra_reserve(tat, 0, 1000, 3, 10_000)
+            waits.append(wait)
+
+        assert waits == [0, 0, 0, 1000, 2000]
+        assert tat == 5000
+
+    def test_tat_advances_from_now_after_idle(self):
+        """A TAT in the past doesn't bank credit beyond the burst"""
+        assert gcra_reserve(500, 10_000, 1000, 1, 0) == (0, 11_000)
+        assert gcra_reserve(10_500, 10_000, 1000, 1, 1000) == (500, 11_500)
+
+    def test_wait_beyond_max_books_nothing(self):
+        assert gcra_reserve(40_000, 0, 1000, 1, 30_000) == (-40_000, None)
+
+    def test_acquire_waits_for_booked_slot(self, monkeypatch):
+        """The caller sleeps exactly as long as the limiter says"""
+        redis = GcraRedis()
+        limiter = RateLimiter(redis=redis, rate_per_minute=60, burst=1, max_wait=10)
+        sleeps = []
+        monkeypatch.setattr(rate_limit.time, "sleep", sleeps.append)
+
+        assert limiter.acquire("www.ebay.com") == 0
+        assert limiter.acquire("www.ebay.com") == 1
+        redis.now_ms = 500
+        assert limiter.acquire("www.ebay.com") == 1.5
+
+        assert sleeps == [1, 1.5]
+        assert redis.get("ratelimit:scrape:www.ebay.com") == "3000"
+        assert redis.calls[0] == (["ratelimit:scrape:www.ebay.com"], [1000, 1, 10000])
+
+    def test_acquire_async(self):
+        """Async callers get the same slot booking"""
+        limiter = RateLimiter(redis=GcraRedis(), rate_per_minute=240, burst=1)
+
+        assert http.run_coroutine(limiter.acquire_async("www.gumtree.com")) == 0
+        assert http.run_coroutine(limiter.acquire_async("www.gumtree.com")) == 0.25
+
+    def test_wait_beyond_max_raises(self):
+        """A slot further away than max_wait is refused, not booked"""
+        redis = GcraRedis()
+        redis.set("ratelimit:scrape:www.ebay.com", 45_000)
+        limiter = RateLimiter(redis=redis, rate_per_minute=60, burst=1, max_wait=30)
+
+        with pytest.raises(RateLimitExceeded) as exc_info:
+            limiter.reserve("www.ebay.com")
+        assert exc_info.value.retry_after == 45
+        assert redis.get("ratelimit:scrape:www.ebay.com") == "45000"
+
+    def test_redis_outage_falls_back_to_local_delay(self, monkeypatch, fake_redis):
+        """Without Redis the limiter degrades to the fixed scraping delay"""
+        def unavailable(source):
+            raise RedisConnectionError()
+
+        monkeypatch.setattr(fake_redis, "register_script", unavailable, raising=False)
+        monkeypatch.setattr(rate_limit.settings, "SCRAPING_DELAY_SECONDS", 2)
+        limiter = RateLimiter(redis=fake_redis)
+
+        assert limiter.reserve("www.ebay.com") == 2.0
+
+
+@pytest.fixture(autouse=True)
+def breaker(monkeypatch, fake_redis):
+    """Keep circuit state in in-memory Redis"""
+    breaker = CircuitBreaker(redis=fake_redis, failure_threshold=2, recovery_timeout=60)
+    monkeypatch.setattr(base, "marketplace_breaker", breaker)
+    return breaker
+
+
+class TestConditionalRequests:
+    """Test HTTP validators on HTML agent fetches"""
+
+    @pytest.fixture
+    def agent(self, monkeypatch):
+        async def no_throttle(self):
+            return 0
+
+        monkeypatch.setattr(EbayAgent, "throttle_async", no_throttle)
+        return EbayAgent()
+
+    def use_transport(self, monkeypatch, handler):
+        client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        monkeypatch.setattr(base, "get_async_client", lambda: client)
+
+    def test_not_modified_skips_parsing(self, monkeypatch, agent):
+        """A 304 for the stored ETag reports unchanged without parsing"""
+        seen_headers = {}
+
+        def handler(request):
+            seen_headers.update(request.headers)
+            return httpx.Response(304)
+
+        self.use_transport(monkeypatch, handler)
+        monkeypatch.setattr(agent, "parse", lambda html: pytest.fail("parsed a 304"))
+
+        result = http.run_coroutine(agent.scrape_page(SEARCH, {"etag": '"v1"', "content_hash": "abc"}))
+
+        assert seen_headers["if-none-match"] == '"v1"'
+        assert result.unchanged
+        assert result.fingerprint == {"etag": '"v1"', "content_hash": "abc"}
+
+    def test_validators_are_captured(self, monkeypatch, agent):
+        """Fresh pages are parsed and their validators kept for next time"""
+        def handler(request):
+            return httpx.Response(200, text="<ul></ul>", headers={"ETag": '"v2"'})
+
+        self.use_transport(monkeypatch, handler)
+
+        result = http.run_coroutine(agent.scrape_page(SEARCH))
+
+        assert not result.unchanged
+        assert result.etag == '"v2"'
+
+    def test_pages_until_empty(self, monkeypatch, agent):
+        """Paging follows _pgn and stops at the first empty page"""
+        html = (FIXTURES / "ebay.html").read_text()
+        requested = []
+
+        def handler(request):
+            page = int(request.url.params.get("_pgn", 1))
+            requested.append(page)
+            return httpx.Response(200, text=html if page < 3 else "<ul></ul>")
+
+        self.use_transport(monkeypatch, handler)
+
+        async def collect():
+            return [page async for page in agent.scrape_pages(SEARCH)]
+
+        pages = http.run_coroutine(collect())
+
+        assert requested == [1, 2, 3]
+        assert [len(page.listings) for page in pages] == [60, 60, 0]
+
+
+class TestParserBackends:
+    """Test that every parser backend extracts the same listings"""
+
+    @pytest.mark.parametrize("agent_class, fixture", [
+        (EbayAgent, "ebay.html"),
+        (CraigslistAgent, "craigslist.html"),
+        (GumtreeAgent, "gumtree.html"),
+    ])
+    def test_backends_agree_on_fixtures(self, agent_class, fixture):
+        """lxml (and selectolax, when installed) match the BeautifulSoup reference"""
+        html = (FIXTURES / fixture).read_text()
+        reference = SoupBackend().extract(html, agent_class.selectors)
+
+        assert len(reference) == 60
+        for name in available_backends():
+            assert PARSER_BACKENDS[name]().extract(html, agent_class.selectors) == reference
+
+    def test_agent_parse_builds_listings(self):
+        """Agents turn raw fields into listing dictionaries"""
+        html = (FIXTURES / "gumtree.html").read_text()
+
+        listings = GumtreeAgent().parse(html)
+
+        assert len(listings) == 60
+        assert listings[0]["url"].startswith("https://www.gumtree.com/p/")
+        assert listings[0]["external_id"] == listings[0]["url"].split("/")[-1]
+        assert listings[0]["currency"] == "GBP"
+
+    def test_craigslist_posted_at_is_parsed(self):
+        """Craigslist's result-date attribute becomes the listing's posted_at"""
+        html = (FIXTURES / "craigslist.html").read_text()
+
+        listings = CraigslistAgent().parse(html)
+
+        assert listings[0]["posted_at"] == datetime(2026, 10, 1, 12, 0)
+
+    def test_ebay_listing_date_assumes_latest_year(self):
+        """Year-less eBay dates after today belong to last year"""
+        agent = EbayAgent()
+        now = datetime(2026, 1, 2, 9, 0)
+
+        assert agent.parse_listing_date("Jan-2 08:15", now) == datetime(2026, 1, 2, 8, 15)
+        assert agent.parse_listing_date("Dec-30 18:00", now) == datetime(2025, 12, 30, 18, 0)
+        assert agent.parse_listing_date("soon", now) is None
+
+    def test_relative_age(self):
+        """Relative ages are counted back from now"""
+        agent = GumtreeAgent()
+        now = datetime(2026, 10, 16, 12, 0)
+
+        assert agent.extract_age("3 hours ago", now) == datetime(2026, 10, 16, 9, 0)
+        assert agent.extract_age("25 mins ago", now) == datetime(2026, 10, 16, 11, 35)
+        assert agent.extract_age("Just now", now) == now
+        assert agent.extract_age(None, now) is None
+
+    def test_unknown_backend_falls_back_to_lxml(self):
+        assert isinstance(get_parser("nope"), LxmlBackend)
+
+
+class TestResilience:
+    """Test retries and the per-marketplace circuit breaker"""
+
+    @pytest.fixture
+    def agent(self, monkeypatch):
+        async def no_throttle(self):
+            return 0
+
+        monkeypatch.setattr(EbayAgent, "throttle_async", no_throttle)
+        monkeypatch.setattr(base, "backoff_delay", lambda attempt, retry_after=None: 0)
+        return EbayAgent()
+
+    def use_responses(self, monkeypatch, statuses):
+        requests = []
+
+        def handler(request):
+            requests.append(request)
+            return httpx.Response(statuses[min(len(requests), len(statuses)) - 1], text="<ul></ul>")
+
+        client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        monkeypatch.setattr(base, "get_async_client", lambda: client)
+        return requests
+
+    def test_transient_errors_are_retried(self, monkeypatch, agent):
+        """A 503 is retried and the eventual success returned"""
+        requests = self.use_responses(monkeypatch, [503, 503, 200])
+
+        response = http.run_coroutine(agent.fetch(SEARCH))
+
+        assert response.status_code == 200
+        assert len(requests) == 3
+
+    def test_client_errors_are_not_retried(self, monkeypatch, agent):
+        """A 404 fails straight away"""
+        requests = self.use_responses(monkeypatch, [404])
+
+        with pytest.raises(httpx.HTTPStatusError):
+            http.run_coroutine(agent.fetch(SEARCH))
+        assert len(requests) == 1
+
+    def test_failed_page_fetch_propagates(self, monkeypatch, agent):
+        """A results page that can't be fetched raises instead of reading as empty"""
+        self.use_responses(monkeypatch, [404])
+
+        with pytest.raises(httpx.HTTPStatusError):
+            http.run_coroutine(agent.scrape_page(SEARCH))
+
+    def test_circuit_opens_and_fast_fails(self, monkeypatch, agent, breaker):
+        """Repeated outages open the circuit and later fetches send nothing"""
+        requests = self.use_responses(monkeypatch, [503])
+        attempts = agent.max_retries + 1
+
+        for _ in range(breaker.failure_threshold):
+            with pytest.raises(httpx.HTTPStatusError):
+                http.run_coroutine(agent.fetch(SEARCH))
+        assert breaker.state("ebay") == CIRCUIT_OPEN
+
+        with pytest.raises(CircuitOpenError):
+            http.run_coroutine(agent.fetch(SEARCH))
+        assert len(requests) == breaker.failure_threshold * attempts
+
+    def test_half_open_probe_closes_circuit(self, monkeypatch, agent, breaker, fake_redis):
+        """Once the open period lapses one probe goes through and closes the circuit"""
+        self.use_responses(monkeypatch, [200])
+        for _ in range(breaker.failure_threshold):
+            breaker.record_failure("ebay")
+        fake_redis.delete("circuit:scrape:ebay:open")  # Open period expired
+        assert breaker.state("ebay") == CIRCUIT_HALF_OPEN
+
+        breaker.allow("ebay")
+        with pytest.raises(CircuitOpenError):
+            breaker.allow("ebay")  # Only one probe at a time
+
+        fake_redis.delete("circuit:scrape:ebay:probe")
+        http.run_coroutine(agent.fetch(SEARCH))
+        assert breaker.state("ebay") == "closed"
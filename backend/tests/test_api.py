@@ -3,6 +3,28 @@
 import pytest
 from fastapi import status
 
+from app.core.persistence import upsert_listings
+from app.models import Listing
+
+
+def listing_rows(search_id, *external_ids):
+    """Scraped listing rows for a search, as the scrape path hands them over"""
+    return [
+        {
+            "search_id": search_id,
+            "marketplace": "ebay",
+            "external_id": external_id,
+            "title": f"Camera {external_id}",
+            "description": "Working condition",
+            "price": 100.0,
+            "currency": "USD",
+            "url": f"https://www.ebay.com/itm/{external_id}",
+            "image_urls": [],
+            "metadata": {},
+        }
+        for external_id in external_ids
+    ]
+
 
 class TestHealth:
     """Test health check endpoint"""
@@ -154,3 +176,196 @@ class TestSearches:
             headers=auth_headers
         )
         assert get_response.status_code == status.HTTP_404_NOT_FOUND
+
+    def test_get_searches_by_cursor(self, client, auth_headers, test_search_data):
+        """Cursor pages cover every search once, newest first"""
+        for index in range(5):
+            client.post(
+                "/api/v1/searches",
+                json={**test_search_data, "name": f"Search {index}"},
+                headers=auth_headers
+            )
+
+        names, cursor = [], None
+        while True:
+            params = {"limit": 2, **({"cursor": cursor} if cursor else {})}
+            response = client.get("/api/v1/searches", params=params, headers=auth_headers)
+            assert response.status_code == status.HTTP_200_OK
+            names.extend(search["name"] for search in response.json())
+            cursor = response.headers.get("X-Next-Cursor")
+            if not cursor:
+                break
+
+        assert names == [f"Search {index}" for index in reversed(range(5))]
+
+    def test_get_searches_with_offset(self, client, auth_headers, test_search_data):
+        """Offset paging still works for older clients"""
+        for index in range(3):
+            client.post(
+                "/api/v1/searches",
+                json={**test_search_data, "name": f"Search {index}"},
+                headers=auth_headers
+            )
+
+        response = client.get("/api/v1/searches", params={"skip": 1, "limit": 1}, headers=auth_headers)
+        assert [search["name"] for search in response.json()] == ["Search 1"]
+        assert "X-Next-Cursor" in response.headers
+
+    def test_invalid_cursor(self, client, auth_headers):
+        """A malformed cursor is rejected"""
+        response = client.get("/api/v1/searches", params={"cursor": "nope"}, headers=auth_headers)
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+class TestDashboard:
+    """Test dashboard endpoints"""
+
+    @pytest.fixture
+    def auth_headers(self, client, test_user_data):
+        """Get authentication headers"""
+        client.post("/api/v1/auth/register", json=test_user_data)
+        login_response = client.post(
+            "/api/v1/auth/login",
+            data={
+                "username": test_user_data["email"],
+                "password": test_user_data["password"]
+            }
+        )
+        token = login_response.json()["access_token"]
+        return {"Authorization": f"Bearer {token}"}
+
+    def test_stats_follow_search_changes(self, client, auth_headers, test_search_data):
+        """Creating, pausing and deleting searches updates the counters"""
+        first = client.post("/api/v1/searches", json=test_search_data, headers=auth_headers).json()
+        second = client.post("/api/v1/searches", json=test_search_data, headers=auth_headers).json()
+        client.put(f"/api/v1/searches/{first['id']}", json={"status": "paused"}, headers=auth_headers)
+        client.delete(f"/api/v1/searches/{second['id']}", headers=auth_headers)
+
+        response = client.get("/api/v1/dashboard/stats", headers=auth_headers)
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json() == {
+            "total_searches": 1,
+            "active_searches": 0,
+            "total_listings": 0,
+            "new_listings_today": 0,
+            "saved_listings": 0
+        }
+
+
+class TestListings:
+    """Test listing endpoints"""
+
+    @pytest.fixture
+    def auth_headers(self, client, test_user_data):
+        """Get authentication headers"""
+        client.post("/api/v1/auth/register", json=test_user_data)
+        login_response = client.post(
+            "/api/v1/auth/login",
+            data={
+                "username": test_user_data["email"],
+                "password": test_user_data["password"]
+            }
+        )
+        token = login_response.json()["access_token"]
+        return {"Authorization": f"Bearer {token}"}
+
+    @pytest.fixture
+    def searches(self, client, auth_headers, test_search_data):
+        """IDs of two of the user's searches"""
+        return [
+            client.post("/api/v1/searches", json=test_search_data, headers=auth_headers).json()["id"]
+            for _ in range(2)
+        ]
+
+    @pytest.fixture
+    def listings(self, db, searches):
+        """Listing IDs by external ID: "shared" matched by both searches, "solo" by the first only"""
+        first, second = searches
+        upsert_listings(db, listing_rows(first, "shared", "solo") + listing_rows(second, "shared"))
+        db.commit()
+        return {listing.external_id: listing.id for listing in db.query(Listing)}
+
+    def test_get_listings(self, client, auth_headers, searches, listings):
+        """Listings show once, as their first search saw them, unless filtered by search"""
+        first, second = searches
+
+        response = client.get("/api/v1/listings", headers=auth_headers)
+        assert response.status_code == status.HTTP_200_OK
+        seen = sorted((listing["external_id"], listing["search_id"]) for listing in response.json())
+        assert seen == [("shared", first), ("solo", first)]
+
+        response = client.get("/api/v1/listings", params={"search_id": second}, headers=auth_headers)
+        assert [(listing["external_id"], listing["search_id"]) for listing in response.json()] == [("shared", second)]
+
+    def test_save_listing(self, client, auth_headers, listings):
+        """Saving applies to all of the user's links and shows up in the saved list"""
+        response = client.patch(
+            f"/api/v1/listings/{listings['shared']}",
+            json={"is_saved": True},
+            headers=auth_headers
+        )
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()["is_saved"] is True
+
+        saved = client.get("/api/v1/listings/saved", headers=auth_headers).json()
+        assert [listing["external_id"] for listing in saved] == ["shared"]
+        recent = client.get("/api/v1/listings/recent", headers=auth_headers).json()
+        assert sorted(listing["external_id"] for listing in recent) == ["shared", "solo"]
+
+    def test_search_listings(self, client, auth_headers, listings):
+        """Full-text matches come back best first, a cursor page at a time"""
+        response = client.get("/api/v1/listings/search", params={"q": "solo"}, headers=auth_headers)
+        assert response.status_code == status.HTTP_200_OK
+        assert [listing["external_id"] for listing in response.json()] == ["solo"]
+
+        found, cursor = [], None
+        while True:
+            params = {"q": "camera", "limit": 1, **({"cursor": cursor} if cursor else {})}
+            response = client.get("/api/v1/listings/search", params=params, headers=auth_headers)
+            assert response.status_code == status.HTTP_200_OK
+            found.extend(listing["external_id"] for listing in response.json())
+            cursor = response.headers.get("X-Next-Cursor")
+            if not cursor:
+                break
+
+        assert sorted(found) == ["shared", "solo"]
+
+    def test_listings_outlive_their_first_search(self, client, db, auth_headers, searches, listings):
+        """Deleting the search that found a listing first doesn't break the other searches' view of it"""
+        first, second = searches
+        client.delete(f"/api/v1/searches/{first}", headers=auth_headers)
+        # What ON DELETE SET NULL does on PostgreSQL
+        db.query(Listing).filter(Listing.search_id == first).update({Listing.search_id: None})
+        db.commit()
+
+        response = client.get("/api/v1/listings", headers=auth_headers)
+        assert response.status_code == status.HTTP_200_OK
+        assert [(listing["external_id"], listing["search_id"]) for listing in response.json()] == [("shared", second)]
+
+        response = client.get(f"/api/v1/listings/{listings['shared']}", headers=auth_headers)
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()["search_id"] == second
+
+        response = client.patch(
+            f"/api/v1/listings/{listings['shared']}",
+            json={"is_saved": True},
+            headers=auth_headers
+        )
+        assert response.status_code == status.HTTP_200_OK
+        assert client.get(f"/api/v1/listings/{listings['solo']}", headers=auth_headers).status_code == 403
+
+    def test_other_users_listings_are_hidden(self, client, auth_headers, listings):
+        """A listing none of the user's searches matched is off limits"""
+        other = client.post("/api/v1/auth/register", json={
+            "email": "other@example.com", "password": "OtherPass123!", "full_name": "Other"
+        })
+        assert other.status_code == status.HTTP_201_CREATED
+        token = client.post(
+            "/api/v1/auth/login",
+            data={"username": "other@example.com", "password": "OtherPass123!"}
+        ).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+
+        assert client.get("/api/v1/listings", headers=headers).json() == []
+        response = client.get(f"/api/v1/listings/{listings['shared']}", headers=headers)
+        assert response.status_code == status.HTTP_403_FORBIDDEN
@@ -0,0 +1,1466 @@
+# tests/test_scraping.py
+
+import asyncio
+import threading
+import time
+from datetime import date, datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import pytest
+from celery.signals import worker_shutdown
+from prometheus_client import REGISTRY
+from redis.exceptions import RedisError, ResponseError
+from sqlalchemy.dialects import postgresql
+
+from app.agents import http
+from app.agents.base import AsyncBaseAgent, BaseAgent, ScrapeResult
+from app.agents.coalescing import QueryCoalescer, query_key
+from app.agents.fingerprint import FingerprintStore
+from app.agents.seen import SeenFilter
+from app.agents.watermark import Watermark
+from app.api.pagination import NEXT_CURSOR_HEADER, paginate
+from app.core import locks
+from app.core.fulltext import listing_matches
+from app.core.monitoring import celery_queue_waits, track_queue_stats
+from app.core.locks import LeaseLock
+from app.core import partitions
+from app.core.partitions import listing_keys, partition_name, partition_start, week_start
+from app.core.persistence import postgres_upsert, upsert_listings
+from app.core.retention import purge_expired_listings
+from app.core.scheduling import SearchScheduler, next_due, search_phase
+from app.core.task_logs import TaskLogSink, failed_tasks_since, prune_task_logs, update_task_log_rollups
+from app.core.user_stats import get_user_stats, reconcile_user_stats, record_search_removed
+from app.models import (
+    Listing, Search, SearchListing, SearchStatus, SubscriptionTier, TaskLog, TaskLogRollup, User, UserStats
+)
+from app.tasks import alerts, scraping
+from app.tasks.celery_app import celery_app, record_queue_wait, stamp_publish_time
+from app.tasks.queues import QueueStats
+from app.tasks.worker import worker_profiles
+from tests.conftest import FakeRedis
+
+
+class SlowAsyncAgent(AsyncBaseAgent):
+    """Async agent that sleeps before returning one listing"""
+    sleep_seconds = 0.3
+
+    async def scrape_async(self, search):
+        await asyncio.sleep(self.sleep_seconds)
+        return [{"external_id": "async-1"}]
+
+
+class SlowSyncAgent(BaseAgent):
+    """Blocking agent that sleeps before returning one listing"""
+    sleep_seconds = 0.3
+
+    def scrape(self, search):
+        time.sleep(self.sleep_seconds)
+        return [{"external_id": "sync-1"}]
+
+
+class HangingAgent(AsyncBaseAgent):
+    """Async agent that never finishes within the timeout"""
+
+    async def scrape_async(self, search):
+        await asyncio.sleep(60)
+        return [{"external_id": "never"}]
+
+
+class BrokenAgent(AsyncBaseAgent):
+    """Async agent whose marketplace fetch always fails"""
+
+    async def scrape_async(self, search):
+        raise RuntimeError("marketplace returned 503")
+
+
+class CountingAgent(AsyncBaseAgent):
+    """Async agent that counts how often it actually fetches"""
+    calls = 0
+
+    async def scrape_async(self, search):
+        CountingAgent.calls += 1
+        return [{"external_id": "shared-1", "posted_at": datetime(2026, 1, 1)}]
+
+
+class PagedAgent(AsyncBaseAgent):
+    """Async agent serving newest-first pages of ten listings each"""
+    pages_fetched = 0
+
+    async def scrape_async(self, search):
+        return []
+
+    async def scrape_pages(self, search, fingerprint=None):
+        for page in range(5):
+            PagedAgent.pages_fetched += 1
+            yield ScrapeResult(listings=[
+                {"external_id": f"item-{index}"} for index in range(page * 10, page * 10 + 10)
+            ])
+
+
+class DatedAgent(AsyncBaseAgent):
+    """Async agent whose listings carry exact posting times, newest first"""
+    exact_timestamps = True
+
+    async def scrape_async(self, search):
+        return [
+            {"external_id": f"dated-{hour}", "posted_at": datetime(2026, 1, 1, hour)}
+            for hour in range(9, 0, -1)
+        ]
+
+
+class StoredAgent(AsyncBaseAgent):
+    """Async agent returning complete, storable listings with exact posting times"""
+    exact_timestamps = True
+
+    async def scrape_async(self, search):
+        return [
+            {
+                "external_id": f"stored-{hour}",
+                "title": "Vintage camera",
+                "price": 100.0,
+                "url": f"https://example.com/{hour}",
+                "posted_at": datetime(2026, 1, 1, hour),
+            }
+            for hour in (2, 1)
+        ]
+
+
+def make_search(**overrides):
+    fields = {
+        "id": 1,
+        "keywords": "vintage camera",
+        "marketplaces": ["ebay", "gumtree", "craigslist"],
+        "min_price": 50.0,
+        "max_price": 500.0,
+        "location": None,
+        "radius_km": None,
+        "filters": {},
+    }
+    fields.update(overrides)
+    return SimpleNamespace(**fields)
+
+
+@pytest.fixture
+def search():
+    return make_search()
+
+
+@pytest.fixture(autouse=True)
+def coalescer(monkeypatch, fake_redis):
+    """Coalesce through in-memory Redis instead of a live server"""
+    coalescer = QueryCoalescer(redis=fake_redis, ttl=600, wait_timeout=1, poll_interval=0.01)
+    monkeypatch.setattr(scraping, "query_coalescer", coalescer)
+    return coalescer
+
+
+@pytest.fixture(autouse=True)
+def fingerprints(monkeypatch, fake_redis):
+    """Keep page fingerprints in in-memory Redis"""
+    store = FingerprintStore(redis=fake_redis)
+    monkeypatch.setattr(scraping, "fingerprint_store", store)
+    return store
+
+
+class TestConcurrentScraping:
+    """Test the concurrent marketplace scraping path"""
+
+    def test_marketplaces_are_fetched_concurrently(self, monkeypatch, search):
+        """Wall-clock time tracks the slowest marketplace, not the sum"""
+        monkeypatch.setattr(scraping, "AGENT_MAP", {
+            "ebay": SlowAsyncAgent,
+            "gumtree": SlowAsyncAgent,
+            "craigslist": SlowSyncAgent,
+        })
+
+        start = time.monotonic()
+        results = scraping.scrape_marketplaces(search)
+        elapsed = time.monotonic() - start
+
+        assert elapsed < 0.8
+        assert results["ebay"].listings == [{"external_id": "async-1"}]
+        assert results["craigslist"].listings == [{"external_id": "sync-1"}]
+
+    def test_timeout_only_drops_slow_marketplace(self, monkeypatch, search):
+        """A hanging marketplace times out without losing the others"""
+        monkeypatch.setattr(scraping.settings, "SCRAPING_MARKETPLACE_TIMEOUT", 0.5)
+        monkeypatch.setattr(scraping, "AGENT_MAP", {
+            "ebay": SlowAsyncAgent,
+            "gumtree": HangingAgent,
+        })
+
+        results = scraping.scrape_marketplaces(search)
+
+        assert results["ebay"].listings == [{"external_id": "async-1"}]
+        assert results["gumtree"].listings == []
+        assert results["gumtree"].error == "timed out after 0.5s"
+        assert results["craigslist"].listings == []
+
+    def test_failure_is_reported_not_empty(self, monkeypatch, search):
+        """A failing marketplace comes back with its error, not as having nothing new"""
+        monkeypatch.setattr(scraping, "AGENT_MAP", {"ebay": BrokenAgent, "gumtree": SlowAsyncAgent})
+        monkeypatch.setattr(SlowAsyncAgent, "sleep_seconds", 0)
+
+        results = scraping.scrape_marketplaces(search)
+
+        assert results["ebay"].error == "marketplace returned 503"
+        assert results["gumtree"].error is None
+
+
+class TestQueryCoalescing:
+    """Test sharing one fetch between identical searches"""
+
+    def test_query_key_normalization(self):
+        """Case, whitespace and empty bounds don't split a query"""
+        first = make_search(keywords="Vintage  Camera ", min_price=0, filters=None)
+        second = make_search(id=2, keywords="vintage camera", min_price=None, filters={})
+
+        assert query_key("ebay", first) == query_key("ebay", second)
+        assert query_key("ebay", first) != query_key("gumtree", first)
+        assert query_key("ebay", first) != query_key("ebay", make_search(max_price=100.0))
+
+    def test_identical_searches_fetch_once(self, monkeypatch):
+        """The second search reuses the first search's parsed results"""
+        CountingAgent.calls = 0
+        monkeypatch.setattr(scraping, "AGENT_MAP", {"ebay": CountingAgent})
+
+        first = scraping.scrape_marketplaces(make_search(marketplaces=["ebay"]))
+        second = scraping.scrape_marketplaces(make_search(id=2, marketplaces=["ebay"]))
+
+        assert CountingAgent.calls == 1
+        assert second["ebay"].listings == first["ebay"].listings
+        assert second["ebay"].listings[0]["posted_at"] == datetime(2026, 1, 1)
+
+
+class TestUnchangedPages:
+    """Test skipping persistence for pages that haven't changed"""
+
+    def test_same_content_is_reported_unchanged(self, monkeypatch, fingerprints):
+        """A repeat of the last persisted result list is flagged unchanged"""
+        monkeypatch.setattr(scraping, "AGENT_MAP", {"ebay": SlowAsyncAgent})
+        monkeypatch.setattr(SlowAsyncAgent, "sleep_seconds", 0)
+        search = make_search(marketplaces=["ebay"])
+
+        first = scraping.scrape_marketplaces(search)["ebay"]
+        assert not first.unchanged
+        fingerprints.save(search.id, "ebay", first.fingerprint)
+
+        second = scraping.scrape_marketplaces(search)["ebay"]
+        assert second.unchanged
+        assert second.content_hash == first.content_hash
+
+    def test_changed_content_is_not_unchanged(self, monkeypatch, fingerprints):
+        """A different result list goes through to persistence"""
+        monkeypatch.setattr(scraping, "AGENT_MAP", {"ebay": SlowAsyncAgent})
+        monkeypatch.setattr(SlowAsyncAgent, "sleep_seconds", 0)
+        search = make_search(marketplaces=["ebay"])
+        fingerprints.save(search.id, "ebay", {"content_hash": "stale"})
+
+        result = scraping.scrape_marketplaces(search)["ebay"]
+
+        assert not result.unchanged
+
+
+class TestEarlyStop:
+    """Test paging only as far back as the already-stored listings"""
+
+    @pytest.fixture(autouse=True)
+    def paged(self, monkeypatch):
+        PagedAgent.pages_fetched = 0
+        monkeypatch.setattr(scraping, "AGENT_MAP", {"ebay": PagedAgent})
+
+    def test_stops_at_known_listings(self):
+        """Paging ends once consecutive stored listings show up"""
+        search = make_search(marketplaces=["ebay"])
+        known = {"ebay": {f"item-{index}" for index in range(15, 50)}}
+
+        result = scraping.scrape_marketplaces(search, known)["ebay"]
+
+        assert PagedAgent.pages_fetched == 2
+        assert [listing["external_id"] for listing in result.listings] == [f"item-{index}" for index in range(15)]
+        assert result.stop_id == "item-15"
+
+    def test_pinned_known_listing_does_not_stop(self, monkeypatch):
+        """A lone stored listing at the top is skipped, not treated as the end"""
+        monkeypatch.setattr(scraping.settings, "SCRAPING_STOP_AFTER_KNOWN", 3)
+        search = make_search(marketplaces=["ebay"])
+
+        result = scraping.scrape_marketplaces(search, {"ebay": {"item-0"}})["ebay"]
+
+        assert PagedAgent.pages_fetched == 5
+        assert len(result.listings) == 49
+        assert result.stop_id is None
+
+    def test_shared_result_keeps_listings_others_need(self, monkeypatch):
+        """Listings one search already has stay in the result shared with others"""
+        monkeypatch.setattr(scraping.settings, "SCRAPING_STOP_AFTER_KNOWN", 3)
+
+        first = scraping.scrape_marketplaces(make_search(marketplaces=["ebay"]), {"ebay": {"item-1"}})["ebay"]
+        second = scraping.scrape_marketplaces(make_search(id=2, marketplaces=["ebay"]), {"ebay": {"item-2"}})["ebay"]
+
+        assert PagedAgent.pages_fetched == 5
+        assert [listing["external_id"] for listing in first.listings] == [
+            f"item-{index}" for index in range(50) if index != 1
+        ]
+        assert [listing["external_id"] for listing in second.listings] == [
+            f"item-{index}" for index in range(50) if index != 2
+        ]
+
+    def test_nothing_new_is_unchanged(self):
+        """When the newest listings are all stored the marketplace is unchanged"""
+        search = make_search(marketplaces=["ebay"])
+        known = {"ebay": {f"item-{index}" for index in range(50)}}
+
+        result = scraping.scrape_marketplaces(search, known)["ebay"]
+
+        assert PagedAgent.pages_fetched == 1
+        assert result.unchanged
+        assert result.listings == []
+
+    def test_shared_result_must_reach_known_listings(self):
+        """A truncated shared result isn't reused by a search that needs more"""
+        scraping.scrape_marketplaces(
+            make_search(marketplaces=["ebay"]),
+            {"ebay": {f"item-{index}" for index in range(5, 50)}}
+        )
+        assert PagedAgent.pages_fetched == 1
+
+        # Knows an item inside the shared result: reuse it
+        scraping.scrape_marketplaces(make_search(id=2, marketplaces=["ebay"]), {"ebay": {"item-3"}})
+        assert PagedAgent.pages_fetched == 1
+
+        # Knows nothing: the shared result doesn't reach back far enough
+        result = scraping.scrape_marketplaces(make_search(id=3, marketplaces=["ebay"]))["ebay"]
+        assert PagedAgent.pages_fetched == 6
+        assert len(result.listings) == 50
+
+
+class TestWatermarks:
+    """Test the per-(search, marketplace) incremental watermark"""
+
+    @pytest.fixture(autouse=True)
+    def dated(self, monkeypatch):
+        monkeypatch.setattr(scraping, "AGENT_MAP", {"ebay": DatedAgent, "gumtree": PagedAgent})
+
+    def test_only_listings_above_watermark_are_returned(self):
+        """Listings at or below the watermark are treated as processed"""
+        watermark = Watermark(datetime(2026, 1, 1, 6), frozenset({"dated-6"}))
+        search = make_search(marketplaces=["ebay"], watermarks={"ebay": watermark.to_dict()})
+
+        result = scraping.scrape_marketplaces(search)["ebay"]
+
+        assert [listing["external_id"] for listing in result.listings] == ["dated-9", "dated-8", "dated-7"]
+        assert result.stop_id == "dated-6"
+
+    def test_boundary_timestamp_keeps_unseen_ids(self):
+        """Another listing posted at the watermark time is still new"""
+        watermark = Watermark(datetime(2026, 1, 1, 9), frozenset({"other"}))
+
+        assert not watermark.covers({"external_id": "dated-9", "posted_at": datetime(2026, 1, 1, 9)})
+        assert watermark.covers({"external_id": "other", "posted_at": datetime(2026, 1, 1, 9)})
+        assert not watermark.covers({"external_id": "undated", "posted_at": None})
+
+    def test_shared_result_ignores_other_watermarks(self, monkeypatch):
+        """Another search's watermark doesn't thin out the shared result"""
+        monkeypatch.setattr(scraping.settings, "SCRAPING_STOP_AFTER_KNOWN", 10)
+        watermark = Watermark(datetime(2026, 1, 1, 6), frozenset({"dated-6"}))
+        first = scraping.scrape_marketplaces(
+            make_search(marketplaces=["ebay"], watermarks={"ebay": watermark.to_dict()})
+        )["ebay"]
+        second = scraping.scrape_marketplaces(make_search(id=2, marketplaces=["ebay"]))["ebay"]
+
+        assert [listing["external_id"] for listing in first.listings] == ["dated-9", "dated-8", "dated-7"]
+        assert [listing["external_id"] for listing in second.listings] == [f"dated-{hour}" for hour in range(9, 0, -1)]
+
+    def test_naive_and_aware_times_compare_as_utc(self):
+        """Naive posting times are taken as UTC against an aware watermark"""
+        watermark = Watermark(datetime(2026, 1, 1, 9, tzinfo=timezone(timedelta(hours=2))))
+
+        assert watermark.posted_at == datetime(2026, 1, 1, 7, tzinfo=timezone.utc)
+        assert watermark.covers({"external_id": "dated-6", "posted_at": datetime(2026, 1, 1, 6)})
+        assert not watermark.covers({"external_id": "dated-8", "posted_at": datetime(2026, 1, 1, 8)})
+
+    def test_advance_after_run(self):
+        """Watermarks move to the newest exact timestamp and round-trip as JSON"""
+        results = scraping.scrape_marketplaces(make_search(marketplaces=["ebay", "gumtree"]))
+
+        watermarks = scraping.advance_watermarks({}, results)
+
+        assert Watermark.from_dict(watermarks["ebay"]) == Watermark(
+            datetime(2026, 1, 1, 9), frozenset({"dated-9"})
+        )
+        # Approximate (or missing) timestamps never set a watermark
+        assert "gumtree" not in watermarks
+
+
+@pytest.fixture
+def searches(db):
+    """Searches 1 and 2, both owned by one user"""
+    user = User(email="owner@example.com", hashed_password="x")
+    db.add(user)
+    db.flush()
+    db.add_all([
+        Search(id=search_id, user_id=user.id, name="Cameras", keywords="camera", marketplaces=["ebay"])
+        for search_id in (1, 2)
+    ])
+    db.commit()
+    return user
+
+
+@pytest.mark.usefixtures("searches")
+class TestBulkUpsert:
+    """Test the bulk listing persistence path"""
+
+    def make_rows(self, *external_ids, search_id=1):
+        return [
+            {
+                "search_id": search_id,
+                "marketplace": "ebay",
+                "external_id": external_id,
+                "title": f"Camera {external_id}",
+                "price": 100.0,
+                "currency": "USD",
+                "url": f"https://www.ebay.com/itm/{external_id}",
+                "image_urls": [],
+                "posted_at": datetime(2026, 1, 1),
+                "metadata": {},
+            }
+            for external_id in external_ids
+        ]
+
+    def test_reports_inserted_and_existing(self, db):
+        """Already stored listings are reported, not duplicated"""
+        first = upsert_listings(db, self.make_rows("a", "b"))
+        db.commit()
+        second = upsert_listings(db, self.make_rows("b", "c", "c"))
+        db.commit()
+
+        assert len(first.inserted_ids) == 2
+        assert len(second.inserted_ids) == 1
+        assert second.existing_ids == [first.inserted_ids[1]]
+        assert db.query(Listing).count() == 3
+
+    def test_postgres_statement_is_single_upsert(self):
+        """PostgreSQL gets one INSERT ... ON CONFLICT ... RETURNING per batch"""
+        stmt = postgres_upsert(self.make_rows("a"))
+        sql = str(stmt.compile(dialect=postgresql.dialect()))
+
+        assert "ON CONFLICT ON CONSTRAINT uq_marketplace_external_id DO UPDATE" in sql
+        assert "RETURNING listings.id, listings.marketplace, listings.external_id, (xmax = 0) AS inserted" in sql
+
+    def test_shared_listing_is_stored_once_and_linked(self, db):
+        """A listing another search already stored is new to this one"""
+        first = upsert_listings(db, self.make_rows("a", "b", search_id=1))
+        db.commit()
+        second = upsert_listings(db, self.make_rows("b", "c", search_id=2) + self.make_rows("a", search_id=1))
+        db.commit()
+
+        assert db.query(Listing).count() == 3
+        assert len(second.inserted_ids) == 1
+        assert sorted(second.linked_ids) == sorted([first.inserted_ids[1]] + second.inserted_ids)
+        links = {(link.search_id, link.listing_id) for link in db.query(SearchListing)}
+        assert links == {
+            (1, first.inserted_ids[0]), (1, first.inserted_ids[1]),
+            (2, first.inserted_ids[1]), (2, second.inserted_ids[0]),
+        }
+
+    def test_links_carry_the_search_owner(self, db, searches):
+        """Links are stamped with the search's owner on insert"""
+        upsert_listings(db, self.make_rows("a") + self.make_rows("a", search_id=2))
+        db.commit()
+
+        assert {link.user_id for link in db.query(SearchListing)} == {searches.id}
+
+
+@pytest.mark.usefixtures("searches")
+class TestListingSearch:
+    """Test full-text listing search"""
+
+    def add_listings(self, db, texts):
+        rows = TestBulkUpsert().make_rows(*texts)
+        for row, (title, description) in zip(rows, texts.values()):
+            row.update(title=title, description=description)
+        ids = upsert_listings(db, rows).inserted_ids
+        db.commit()
+        return ids
+
+    def matching_ids(self, db, q):
+        matches = listing_matches(db, q)
+        return [row.listing_id for row in db.query(matches).order_by(matches.c.relevance.desc())]
+
+    def test_matches_are_ranked_by_relevance(self, db):
+        """Stemmed terms match titles and descriptions; title hits rank first"""
+        in_title, in_description, _ = self.add_listings(db, {
+            "a": ("Mint condition camera", "Barely used"),
+            "b": ("Film camera", "Lens in mint conditions"),
+            "c": ("Broken camera", "For parts"),
+        })
+
+        assert self.matching_ids(db, "mint condition") == [in_title, in_description]
+        assert listing_matches(db, "   ") is None
+
+    def test_query_syntax_is_matched_literally(self, db):
+        """Quotes and operators in user input don't break the query"""
+        self.add_listings(db, {"a": ("Camera", None)})
+
+        assert self.matching_ids(db, 'camera" OR (') == []
+
+    def test_index_follows_updates_and_deletes(self, db):
+        """The index is maintained on every write, not rebuilt"""
+        first, second = self.add_listings(db, {"a": ("Vintage camera", None), "b": ("Vintage lens", None)})
+        db.query(Listing).filter(Listing.id == first).update({"title": "Modern camera"})
+        db.query(Listing).filter(Listing.id == second).delete()
+        db.commit()
+
+        assert self.matching_ids(db, "vintage") == []
+        assert self.matching_ids(db, "modern") == [first]
+
+    def test_postgres_relevance_is_double_precision(self):
+        """ts_rank is cast so relevance cursors compare exactly"""
+        db = SimpleNamespace(get_bind=lambda: SimpleNamespace(dialect=postgresql.dialect()))
+
+        sql = str(listing_matches(db, "camera").element.compile(dialect=postgresql.dialect()))
+
+        assert "CAST(ts_rank(" in sql
+        assert "AS FLOAT(53))" in sql
+
+    def test_results_page_by_relevance(self, db):
+        """Cursor pages over ranked results cover every match once"""
+        ids = self.add_listings(db, {
+            external_id: (f"Camera {'mint ' * count}", None) for external_id, count in zip("abcde", range(1, 6))
+        })
+        matches = listing_matches(db, "mint")
+        query = db.query(Listing, SearchListing).join(
+            SearchListing, SearchListing.listing_id == Listing.id
+        ).join(matches, matches.c.listing_id == Listing.id).add_columns(matches.c.relevance)
+
+        seen, cursor = [], None
+        while True:
+            response = SimpleNamespace(headers={})
+            rows = paginate(
+                query, response, matches.c.relevance, SearchListing.id,
+                key=lambda row: (row.relevance, row[1].id), cursor=cursor, limit=2
+            )
+            seen.extend(listing.id for listing, _, _ in rows)
+            cursor = response.headers.get(NEXT_CURSOR_HEADER)
+            if not cursor:
+                break
+
+        assert seen == list(reversed(ids))
+
+
+@pytest.mark.usefixtures("searches")
+class TestUserStats:
+    """Test the incrementally maintained dashboard counters"""
+
+    def counters(self, db, user_id):
+        db.expire_all()
+        return get_user_stats(db, user_id)
+
+    def recomputed(self, db, user_id):
+        reconcile_user_stats(db, [user_id])
+        return self.counters(db, user_id)
+
+    def test_missing_row_is_left_to_the_reconcile_job(self, db, searches):
+        """Reading never writes: a user without a counters row reads zeros until reconciled"""
+        upsert_listings(db, TestBulkUpsert().make_rows("a", "b"))
+        db.commit()
+
+        assert set(self.counters(db, searches.id).values()) == {0}
+        assert db.get(UserStats, searches.id) is None
+        assert self.recomputed(db, searches.id) == {
+            "total_searches": 2,
+            "active_searches": 2,
+            "total_listings": 2,
+            "new_listings_today": 2,
+            "saved_listings": 0,
+        }
+
+    def test_new_links_count_each_listing_once(self, db, searches):
+        """A listing two of the user's searches found counts once"""
+        reconcile_user_stats(db, [searches.id])
+        upsert_listings(db, TestBulkUpsert().make_rows("a", "b") + TestBulkUpsert().make_rows("b", "c", search_id=2))
+        db.commit()
+        upsert_listings(db, TestBulkUpsert().make_rows("c", "d"))
+        db.commit()
+
+        counters = self.counters(db, searches.id)
+        assert counters["total_listings"] == counters["new_listings_today"] == 4
+        assert counters == self.recomputed(db, searches.id)
+
+    def test_removed_search_takes_only_its_own_listings(self, db, searches):
+        """Listings another search still links stay counted"""
+        upsert_listings(db, TestBulkUpsert().make_rows("a", "b") + TestBulkUpsert().make_rows("b", "c", search_id=2))
+        db.query(SearchListing).filter(SearchListing.search_id == 2).update({"is_saved": True})
+        db.commit()
+        reconcile_user_stats(db, [searches.id])
+
+        search = db.get(Search, 2)
+        record_search_removed(db, search)
+        db.delete(search)
+        db.commit()
+
+        counters = self.counters(db, searches.id)
+        assert counters["total_searches"] == 1
+        assert counters["total_listings"] == 2
+        assert counters["saved_listings"] == 0
+        assert counters == self.recomputed(db, searches.id)
+
+    def test_stale_daily_count_reads_as_zero(self, db, searches):
+        """Yesterday's new listings don't show as today's"""
+        upsert_listings(db, TestBulkUpsert().make_rows("a"))
+        db.commit()
+        reconcile_user_stats(db, [searches.id])
+        db.query(UserStats).update({"new_listings_day": date(2020, 1, 1)})
+        db.commit()
+
+        assert self.counters(db, searches.id)["new_listings_today"] == 0
+
+
+class TestSeenFilter:
+    """Test dropping already-stored listings before they reach the database"""
+
+    @pytest.fixture(autouse=True)
+    def seen(self, monkeypatch, fake_redis):
+        seen = SeenFilter(redis=fake_redis, retention_days=30)
+        monkeypatch.setattr(scraping, "seen_filter", seen)
+        return seen
+
+    def test_seen_within_retention_window(self, seen):
+        """IDs recorded on any day of the window count as seen"""
+        seen.add(1, "ebay", ["old"], day=datetime.utcnow().date() - timedelta(days=29))
+        seen.add(1, "ebay", ["new"])
+
+        assert seen.seen(1, "ebay", ["old", "new", "other"]) == {"old", "new"}
+        assert seen.seen(1, "gumtree", ["old"]) == set()
+
+    def test_expired_ids_are_not_seen(self, seen, fake_redis):
+        """IDs recorded before the window aren't seen and are trimmed on the next add"""
+        seen.add(1, "ebay", ["expired"], day=datetime.utcnow().date() - timedelta(days=31))
+        assert seen.seen(1, "ebay", ["expired"]) == set()
+
+        seen.add(1, "ebay", ["new"])
+        assert fake_redis.zrange("seen:listing:ebay", 0, -1) == ["1:new"]
+
+    def test_window_covers_longest_tier_retention(self, monkeypatch, fake_redis):
+        """Listings stay seen as long as any tier still retains them"""
+        monkeypatch.setattr(scraping.settings, "LISTING_RETENTION_DAYS_BY_TIER", "free:14,business:90")
+
+        assert SeenFilter(redis=fake_redis).retention_days == 90
+
+    def test_known_rows_skip_the_database(self, db, seen):
+        """Filter hits are dropped; misses go on to the upsert"""
+        seen.add(1, "ebay", ["a"])
+        rows = TestBulkUpsert().make_rows("a", "b")
+
+        assert [row["external_id"] for row in scraping.drop_seen_listings(db, rows)] == ["b"]
+
+    def test_other_searches_listings_are_not_seen(self, db, seen):
+        """A listing stored for one search still reaches the upsert for another"""
+        seen.add(1, "ebay", ["a"])
+        rows = TestBulkUpsert().make_rows("a", search_id=2)
+
+        assert scraping.drop_seen_listings(db, rows) == rows
+
+    @pytest.mark.usefixtures("searches")
+    def test_false_positives_are_caught_by_sampling(self, monkeypatch, db, seen):
+        """A verified hit that isn't actually stored is kept"""
+        monkeypatch.setattr(scraping.settings, "SEEN_FILTER_VERIFY_RATE", 1.0)
+        upsert_listings(db, TestBulkUpsert().make_rows("stored"))
+        db.commit()
+        seen.add(1, "ebay", ["stored", "ghost"])
+        rows = TestBulkUpsert().make_rows("stored", "ghost")
+
+        assert [row["external_id"] for row in scraping.drop_seen_listings(db, rows)] == ["ghost"]
+
+    @pytest.mark.usefixtures("searches")
+    def test_rebuild_loads_stored_listings(self, db, seen):
+        """The warm-up command loads every search listing in the window"""
+        upsert_listings(db, TestBulkUpsert().make_rows("a", "b", "c") + TestBulkUpsert().make_rows("c", search_id=2))
+        db.commit()
+
+        assert seen.rebuild(db, batch_size=2) == 4
+        assert seen.seen(1, "ebay", ["a", "b", "c", "d"]) == {"a", "b", "c"}
+        assert seen.seen(2, "ebay", ["a", "c"]) == {"c"}
+
+
+class TestDueSearches:
+    """Test claiming due searches through next_run_at"""
+
+    def add_search(self, db, **overrides):
+        fields = {
+            "user_id": 1,
+            "name": "Cameras",
+            "keywords": "vintage camera",
+            "marketplaces": ["ebay"],
+            "check_interval_minutes": 60,
+        }
+        fields.update(overrides)
+        search = Search(**fields)
+        db.add(search)
+        db.commit()
+        return search
+
+    def test_claims_only_due_active_searches(self, db):
+        """Due searches are claimed oldest first and pushed an interval ahead"""
+        now = datetime(2026, 1, 1, 12, 0)
+        due = self.add_search(db, next_run_at=now - timedelta(minutes=5))
+        overdue = self.add_search(db, next_run_at=now - timedelta(hours=2))
+        self.add_search(db, next_run_at=now + timedelta(minutes=5))
+        self.add_search(db, next_run_at=now - timedelta(hours=1), status=SearchStatus.PAUSED)
+
+        claimed = scraping.claim_due_searches(db, now, limit=10)
+
+        assert claimed == [overdue.id, due.id]
+        db.refresh(due)
+        assert due.next_run_at == now + timedelta(minutes=60)
+        assert scraping.claim_due_searches(db, now, limit=10) == []
+
+    def test_claim_respects_limit(self, db):
+        now = datetime(2026, 1, 1, 12, 0)
+        for minutes in range(3):
+            self.add_search(db, next_run_at=now - timedelta(minutes=minutes))
+
+        assert len(scraping.claim_due_searches(db, now, limit=2)) == 2
+        assert len(scraping.claim_due_searches(db, now, limit=2)) == 1
+
+    def test_schedule_next_run(self):
+        """The next run lands on the search's slot about one interval after the last check"""
+        last_run = datetime(2026, 1, 1, 12, 0)
+        search = Search(id=7, check_interval_minutes=30, last_checked_at=last_run)
+
+        search.schedule_next_run()
+
+        assert last_run + timedelta(minutes=15) < search.next_run_at <= last_run + timedelta(minutes=45)
+
+        # Once aligned, runs are exactly one interval apart
+        first_run = search.next_run_at
+        search.last_checked_at = first_run
+        search.schedule_next_run()
+        assert search.next_run_at == first_run + timedelta(minutes=30)
+
+    def test_schedule_never_run_is_due_now(self):
+        now = datetime(2026, 1, 1, 12, 0)
+        search = Search(id=7, check_interval_minutes=30)
+
+        search.schedule_next_run(now)
+
+        assert search.next_run_at == now
+
+
+class PopDueRedis(FakeRedis):
+    """FakeRedis running the scheduler's pop script in Python"""
+
+    def register_script(self, source):
+        def pop_due(keys, args):
+            now, limit, lease = float(args[0]), int(args[1]), float(args[2])
+            due = [
+                (member, score) for member, score in self.zrange(keys[0], 0, -1, withscores=True)
+                if score <= now
+            ][:limit]
+            self.zadd(keys[0], {member: lease for member, _ in due})
+            return [value for pair in due for value in pair]
+        return pop_due
+
+
+class TestSearchScheduler:
+    """Test the Redis delay-queue scheduler"""
+
+    def test_phases_spread_over_interval(self):
+        """Deterministic jitter spreads searches evenly over the interval"""
+        interval = 3600
+        buckets = [0] * 10
+        for search_id in range(1, 1001):
+            phase = search_phase(search_id, interval)
+            assert phase == search_phase(search_id, interval)
+            buckets[int(phase / interval * 10)] += 1
+
+        assert all(60 <= count <= 140 for count in buckets)
+
+    def test_next_due_is_stable(self):
+        """Late runs snap back onto the search's slot"""
+        slot = next_due(3, 60, datetime(2026, 1, 1, 12, 0))
+        previous_slot = slot - timedelta(hours=1)
+
+        assert next_due(3, 60, previous_slot + timedelta(minutes=4)) == slot
+        assert next_due(3, 60, slot + timedelta(seconds=20)) == slot + timedelta(hours=1)
+
+    def test_pop_due_leases_searches(self, monkeypatch):
+        """Due searches are popped most overdue first and leased, not dropped"""
+        monkeypatch.setattr(scraping.settings, "SCHEDULER_RETRY_SECONDS", 900)
+        scheduler = SearchScheduler(redis=PopDueRedis(), key="schedule:test")
+        now = datetime(2026, 1, 1, 12, 0)
+        scheduler.schedule(1, now - timedelta(seconds=5))
+        scheduler.schedule(2, now - timedelta(minutes=5))
+        scheduler.schedule(3, now + timedelta(minutes=5))
+
+        due = scheduler.pop_due(now.replace(tzinfo=timezone.utc).timestamp(), limit=10)
+
+        assert [search_id for search_id, _ in due] == [2, 1]
+        assert scheduler.pop_due(now.replace(tzinfo=timezone.utc).timestamp(), limit=10) == []
+        queued = dict(scheduler.redis.zrange("schedule:test", 0, -1, withscores=True))
+        assert queued["1"] == queued["2"] == now.replace(tzinfo=timezone.utc).timestamp() + 900
+
+    def test_run_dispatches_due_searches(self):
+        """The loop dispatches due searches and leaves future ones queued"""
+        scheduler = SearchScheduler(redis=PopDueRedis(), key="schedule:test")
+        now = datetime.utcnow()
+        scheduler.schedule(1, now - timedelta(seconds=1))
+        scheduler.schedule(2, now + timedelta(hours=1))
+        stop = threading.Event()
+        dispatched = []
+
+        def dispatch(search_id):
+            dispatched.append(search_id)
+            stop.set()
+
+        scheduler.run(dispatch, stop=stop, max_sleep=0.01)
+
+        assert dispatched == [1]
+
+    def test_sync_reseeds_queue(self):
+        """Sync adds missing searches, keeps queued due times and drops inactive ones"""
+        scheduler = SearchScheduler(redis=PopDueRedis(), key="schedule:test")
+        leased = datetime(2026, 1, 1, 13, 0)
+        scheduler.schedule(1, leased)
+        scheduler.schedule(9, leased)
+
+        active = scheduler.sync([(1, datetime(2026, 1, 1, 12, 0)), (2, datetime(2026, 1, 1, 12, 30))])
+
+        assert active == 2
+        assert scheduler.redis.zrange("schedule:test", 0, -1) == ["2", "1"]
+
+
+class LockRedis(FakeRedis):
+    """FakeRedis running the lease lock scripts in Python"""
+
+    def __init__(self):
+        super().__init__()
+        self.renewals = 0
+
+    def register_script(self, source):
+        def renew(keys, args):
+            self.renewals += 1
+            return int(self.get(keys[0]) == args[0])
+
+        def release(keys, args):
+            return self.delete(keys[0]) if self.get(keys[0]) == args[0] else 0
+
+        return renew if source == locks.RENEW_SCRIPT else release
+
+
+class StreamRedis(FakeRedis):
+    """FakeRedis with the stream and consumer group commands of the task log sink"""
+
+    def __init__(self):
+        super().__init__()
+        self.streams = {}
+        self.groups = {}
+        self.last_id = 0
+        self.idle_ms = 0  # How long pending entries appear to have been idle
+
+    def xadd(self, name, fields, maxlen=None, approximate=True):
+        self.last_id += 1
+        entry_id = f"{self.last_id}-0"
+        self.streams.setdefault(name, {})[entry_id] = dict(fields)
+        return entry_id
+
+    def xlen(self, name):
+        return len(self.streams.get(name, {}))
+
+    def xgroup_create(self, name, groupname, id="$", mkstream=False):
+        if (name, groupname) in self.groups:
+            raise ResponseError("BUSYGROUP Consumer Group name already exists")
+        self.groups[(name, groupname)] = {"last": 0, "pending": set()}
+        self.streams.setdefault(name, {})
+
+    def xreadgroup(self, groupname, consumername, streams, count=None, block=None):
+        [name] = streams
+        group = self.groups[(name, groupname)]
+        entries = [
+            (entry_id, fields) for entry_id, fields in self.streams[name].items()
+            if int(entry_id.split("-")[0]) > group["last"]
+        ][:count]
+        if not entries:
+            return []
+        group["last"] = int(entries[-1][0].split("-")[0])
+        group["pending"].update(entry_id for entry_id, _ in entries)
+        return [[name, entries]]
+
+    def xautoclaim(self, name, groupname, consumername, min_idle_time, start_id="0-0", count=None):
+        pending = self.groups[(name, groupname)]["pending"]
+        claimed = [] if self.idle_ms < min_idle_time else [
+            (entry_id, self.streams[name].get(entry_id)) for entry_id in sorted(pending)
+        ][:count]
+        return ["0-0", claimed, []]
+
+    def xack(self, name, groupname, *entry_ids):
+        pending = self.groups[(name, groupname)]["pending"]
+        acked = pending & set(entry_ids)
+        pending -= acked
+        return len(acked)
+
+    def xdel(self, name, *entry_ids):
+        return sum(1 for entry_id in entry_ids if self.streams[name].pop(entry_id, None) is not None)
+
+
+class TestFanOut:
+    """Test running a search as one subtask per marketplace"""
+
+    @pytest.fixture(autouse=True)
+    def tasks(self, monkeypatch, db, fake_redis):
+        monkeypatch.setattr(scraping, "AGENT_MAP", {"ebay": StoredAgent})
+        monkeypatch.setattr(scraping, "seen_filter", SeenFilter(redis=fake_redis, retention_days=30))
+        monkeypatch.setattr(scraping, "search_scheduler", SearchScheduler(redis=fake_redis))
+        monkeypatch.setattr(scraping, "search_run_lock", LeaseLock(redis=LockRedis(), ttl=60))
+        monkeypatch.setattr(scraping, "task_log_sink", TaskLogSink(redis=StreamRedis()))
+        for task in (scraping.run_search_task, scraping.scrape_marketplace_task, scraping.finalize_search_run):
+            monkeypatch.setattr(task, "_db", db)
+
+    @pytest.fixture
+    def stored_search(self, db):
+        search = Search(user_id=1, name="Cameras", keywords="vintage camera", marketplaces=["ebay", "craigslist"])
+        db.add(search)
+        db.commit()
+        return search
+
+    def test_subtask_stores_its_marketplace(self, db, stored_search):
+        """A subtask persists its own listings and hands its watermark to the callback"""
+        outcome = scraping.scrape_marketplace_task(stored_search.id, "ebay")
+
+        assert outcome["status"] == "success"
+        assert outcome["new_listings"] == 2
+        assert Watermark.from_dict(outcome["watermark"]).posted_at == datetime(2026, 1, 1, 2, tzinfo=timezone.utc)
+        assert db.query(Listing).count() == 2
+        db.refresh(stored_search)
+        assert not stored_search.watermarks
+
+    def test_subtask_failure_is_an_outcome(self):
+        """A failing subtask reports instead of raising, so the chord still completes"""
+        outcome = scraping.scrape_marketplace_task(999, "ebay")
+
+        assert outcome["status"] == "failed"
+        assert "not found" in outcome["error"]
+
+    def test_failed_fetch_is_a_failed_outcome(self, monkeypatch, db, stored_search):
+        """A marketplace that couldn't be scraped is reported failed, not as 0 new listings"""
+        monkeypatch.setattr(scraping, "AGENT_MAP", {"ebay": BrokenAgent})
+
+        outcome = scraping.scrape_marketplace_task(stored_search.id, "ebay")
+
+        assert outcome == {"marketplace": "ebay", "status": "failed", "error": "marketplace returned 503"}
+
+    def test_callback_finalizes_run_once(self, monkeypatch, db, stored_search):
+        """The callback updates the search, closes the TaskLog and alerts once"""
+        task_log = TaskLog(task_id="run-1", task_name="run_search_task", status="running", search_id=stored_search.id)
+        db.add(task_log)
+        db.commit()
+        alerted = []
+        monkeypatch.setattr(alerts.trigger_alerts_task, "delay", lambda *args: alerted.append(args))
+        watermark = Watermark(datetime(2026, 1, 1, 2), frozenset({"stored-2"})).to_dict()
+
+        result = scraping.finalize_search_run([
+            {
+                "marketplace": "ebay", "status": "success",
+                "total_listings": 2, "new_listings": 2, "watermark": watermark
+            },
+            {"marketplace": "craigslist", "status": "failed", "error": "boom"},
+        ], stored_search.id, "run-1")
+        scraping.task_log_sink.flush(db)
+
+        assert result["status"] == "success"
+        assert result["failed_marketplaces"] == ["craigslist"]
+        assert alerted == [(stored_search.id, 2)]
+        db.refresh(stored_search)
+        db.refresh(task_log)
+        assert stored_search.last_checked_at is not None
+        assert stored_search.watermarks == {"ebay": watermark}
+        assert task_log.status == "success"
+        assert task_log.error == "craigslist: boom"
+
+    def test_run_fans_out_to_marketplace_queues(self, monkeypatch, stored_search):
+        """Each marketplace becomes its own subtask, routed to its configured queue"""
+        monkeypatch.setattr(scraping.settings, "SCRAPING_FANOUT", True)
+        monkeypatch.setattr(scraping.settings, "SCRAPING_MARKETPLACE_QUEUES", "craigslist:scrape.craigslist")
+        dispatched = []
+        monkeypatch.setattr(scraping, "chord", lambda header: lambda body: dispatched.append((header, body)))
+
+        result = scraping.run_search_task(stored_search.id)
+
+        assert result["status"] == "dispatched"
+        [(header, body)] = dispatched
+        assert [subtask.args[:2] for subtask in header] == [
+            (stored_search.id, "ebay"), (stored_search.id, "craigslist")
+        ]
+        assert [subtask.options.get("queue") for subtask in header] == [None, "scrape.craigslist"]
+        assert body.task == "app.tasks.scraping.finalize_search_run"
+
+
+class TestQueues:
+    """Test per-workload queue routing, worker profiles and queue wait tracking"""
+
+    @pytest.mark.parametrize("task_name, queue", [
+        ("app.tasks.scraping.run_search_task", "scrape-io"),
+        ("app.tasks.scraping.scrape_marketplace_task", "scrape-io"),
+        ("app.tasks.scraping.finalize_search_run", "scrape-io"),
+        ("app.tasks.alerts.trigger_alerts_task", "alerts"),
+        ("app.tasks.scraping.cleanup_old_listings", "maintenance"),
+    ])
+    def test_tasks_are_routed_by_workload(self, task_name, queue):
+        route = celery_app.amqp.router.route({}, task_name)
+
+        assert route["queue"].name == queue
+
+    def test_worker_profiles_come_from_settings(self, monkeypatch):
+        """The I/O profile runs a wide threads pool that also serves fan-out queues"""
+        monkeypatch.setattr(scraping.settings, "CELERY_SCRAPE_CONCURRENCY", 80)
+        monkeypatch.setattr(scraping.settings, "SCRAPING_MARKETPLACE_QUEUES", "facebook:scrape.facebook")
+
+        profiles = worker_profiles()
+
+        assert profiles["scrape-io"].argv()[3:] == [
+            "-Q", "scrape-io,scrape.facebook", "-P", "threads", "-c", "80", "--prefetch-multiplier", "4"
+        ]
+        assert profiles["maintenance"].pool == "prefork"
+        assert sorted(profiles) == ["alerts", "maintenance", "scrape-io"]
+
+    def test_queue_waits_are_exported_as_counters(self):
+        """Fleet-wide wait totals are typed as counters, so rate() over them is valid"""
+        track_queue_stats("scrape-io", 3, 2.5, 4)
+
+        assert {family.type for family in celery_queue_waits.collect()} == {"counter"}
+        assert REGISTRY.get_sample_value("celery_queue_wait_seconds_total", {"queue": "scrape-io"}) == 2.5
+        assert REGISTRY.get_sample_value("celery_queue_tasks_started_total", {"queue": "scrape-io"}) == 4
+
+    def test_http_clients_close_on_worker_shutdown(self):
+        """Threads-pool workers (no child processes) still close their pooled clients"""
+        client = http.get_client()
+
+        worker_shutdown.send(sender=None)
+
+        assert client.is_closed
+
+    def test_queue_wait_is_recorded_fleet_wide(self, monkeypatch, fake_redis):
+        """Workers add each task's publish-to-start wait to per-queue totals"""
+        stats = QueueStats(redis=fake_redis)
+        monkeypatch.setattr("app.tasks.queues.queue_stats", stats)
+        headers = {}
+        stamp_publish_time(headers=headers)
+        task = SimpleNamespace(request=SimpleNamespace(
+            published_at=headers["published_at"] - 2, delivery_info={"routing_key": "scrape-io"}
+        ))
+
+        record_queue_wait(task=task)
+        record_queue_wait(task=task)
+
+        wait_seconds, started = stats.totals()["scrape-io"]
+        assert started == 2
+        assert 4 <= wait_seconds < 5
+
+
+class TestRunLock:
+    """Test the per-search run lock and duplicate run collapsing"""
+
+    @pytest.fixture
+    def lock(self, monkeypatch):
+        lock = LeaseLock(redis=LockRedis(), ttl=60, prefix="lock:search-run")
+        monkeypatch.setattr(scraping, "search_run_lock", lock)
+        return lock
+
+    def test_only_holder_can_release(self, lock):
+        token = lock.acquire(1)
+
+        assert token is not None
+        assert lock.acquire(1) is None
+        assert not lock.release(1, "someone-else")
+        assert lock.release(1, token)
+        assert lock.acquire(1) is not None
+
+    def test_lease_is_renewed_while_running(self):
+        lock = LeaseLock(redis=LockRedis(), ttl=0.15)
+        token = lock.acquire(1)
+
+        with lock.keep_alive(1, token):
+            time.sleep(0.2)
+
+        assert lock.redis.renewals >= 2
+
+    def test_duplicate_runs_collapse_into_one_follow_up(self, monkeypatch, lock):
+        """Dispatches during a run are absorbed; at most one follow-up runs after it"""
+        monkeypatch.setattr(scraping.settings, "SEARCH_RUN_FOLLOW_UP", True)
+        dispatched = []
+        monkeypatch.setattr(scraping.run_search_task, "delay", dispatched.append)
+        token = lock.acquire(7)
+
+        first = scraping.run_search_task(7)
+        second = scraping.run_search_task(7)
+
+        assert first == {"search_id": 7, "status": "duplicate", "follow_up_queued": True}
+        assert second["follow_up_queued"] is False
+
+        scraping.finish_search_run(7, token)
+        assert dispatched == [7]
+        assert lock.acquire(7) is not None
+
+    def test_follow_up_can_be_disabled(self, monkeypatch, lock):
+        monkeypatch.setattr(scraping.settings, "SEARCH_RUN_FOLLOW_UP", False)
+        dispatched = []
+        monkeypatch.setattr(scraping.run_search_task, "delay", dispatched.append)
+        token = lock.acquire(7)
+
+        assert scraping.run_search_task(7)["follow_up_queued"] is False
+
+        scraping.finish_search_run(7, token)
+        assert dispatched == []
+
+
+class TestRetention:
+    """Test batched, tier-aware listing retention"""
+
+    now = datetime(2026, 3, 1)
+
+    def add_search(self, db, tier):
+        user = User(email=f"{tier.value}@example.com", hashed_password="x", subscription_tier=tier)
+        db.add(user)
+        db.flush()
+        search = Search(user_id=user.id, name="Cameras", keywords="camera", marketplaces=["ebay"])
+        db.add(search)
+        db.flush()
+        return search
+
+    def add_listings(self, db, tier, ages_days, saved=()):
+        search = self.add_search(db, tier)
+        for index, age in enumerate(ages_days):
+            listing = Listing(
+                search_id=search.id,
+                external_id=f"{tier.value}-{index}",
+                marketplace="ebay",
+                title="Camera",
+                price=10.0,
+                url="https://example.com",
+                is_saved=index in saved,
+                created_at=self.now - timedelta(days=age)
+            )
+            db.add(listing)
+            db.flush()
+            db.add(SearchListing(
+                search_id=search.id,
+                listing_id=listing.id,
+                user_id=search.user_id,
+                is_saved=index in saved,
+                first_seen_at=listing.created_at
+            ))
+        db.commit()
+        return search
+
+    def remaining(self, db):
+        return sorted(external_id for (external_id,) in db.query(Listing.external_id))
+
+    def test_deletes_in_batches_and_keeps_saved(self, db):
+        """Expired listings go in bounded batches; saved ones survive"""
+        self.add_listings(db, SubscriptionTier.FREE, [40, 35, 31, 40, 5], saved={3})
+
+        result = purge_expired_listings(db, now=self.now, batch_size=2, pause=0)
+
+        assert result.deleted["free"] == 3
+        assert result.listings_deleted == 3
+        assert result.batches == 2
+        assert result.complete
+        assert self.remaining(db) == ["free-3", "free-4"]
+
+    def test_per_tier_windows(self, monkeypatch, db):
+        monkeypatch.setattr(scraping.settings, "LISTING_RETENTION_DAYS_BY_TIER", "free:7,business:90")
+        self.add_listings(db, SubscriptionTier.FREE, [10, 3])
+        self.add_listings(db, SubscriptionTier.PRO, [40, 10])
+        self.add_listings(db, SubscriptionTier.BUSINESS, [40, 100])
+
+        result = purge_expired_listings(db, now=self.now, pause=0)
+
+        assert result.deleted == {"free": 1, "starter": 0, "pro": 1, "business": 1}
+        assert self.remaining(db) == ["business-0", "free-1", "pro-1"]
+
+    def test_shared_listing_outlives_the_shorter_window(self, monkeypatch, db):
+        """Only the expired search's link goes while another search still uses the listing"""
+        monkeypatch.setattr(scraping.settings, "LISTING_RETENTION_DAYS_BY_TIER", "free:7")
+        self.add_listings(db, SubscriptionTier.FREE, [10])
+        pro_search = self.add_search(db, SubscriptionTier.PRO)
+        listing = db.query(Listing).one()
+        db.add(SearchListing(
+            search_id=pro_search.id,
+            listing_id=listing.id,
+            user_id=pro_search.user_id,
+            first_seen_at=self.now - timedelta(days=10)
+        ))
+        db.commit()
+
+        result = purge_expired_listings(db, now=self.now, pause=0)
+
+        assert result.deleted["free"] == 1
+        assert result.listings_deleted == 0
+        assert [link.search_id for link in db.query(SearchListing)] == [pro_search.id]
+
+    def test_dashboard_counters_follow_retirement(self, monkeypatch, db):
+        """Retired listings leave the owner's dashboard counts"""
+        monkeypatch.setattr(scraping.settings, "LISTING_RETENTION_DAYS_BY_TIER", "free:7")
+        search = self.add_listings(db, SubscriptionTier.FREE, [1, 10, 10])
+        reconcile_user_stats(db, [search.user_id])
+
+        purge_expired_listings(db, now=self.now, pause=0)
+
+        db.expire_all()
+        assert get_user_stats(db, search.user_id)["total_listings"] == 1
+
+    def test_unlinked_listings_are_swept(self, db):
+        """Listings left behind by deleted searches go too"""
+        self.add_listings(db, SubscriptionTier.FREE, [1, 1])
+        db.query(SearchListing).delete()
+        db.commit()
+
+        result = purge_expired_listings(db, now=self.now, pause=0)
+
+        assert result.listings_deleted == 2
+        assert self.remaining(db) == []
+
+    def test_stops_when_runtime_budget_is_spent(self, monkeypatch, db):
+        """A run out of time stops between batches and reports it"""
+        self.add_listings(db, SubscriptionTier.FREE, [40, 40, 40])
+        clock = iter(range(0, 1000, 10))
+        monkeypatch.setattr("app.core.retention.time.monotonic", lambda: next(clock))
+
+        result = purge_expired_listings(db, now=self.now, batch_size=1, pause=0, max_runtime=25)
+
+        assert not result.complete
+        assert 0 < result.deleted["free"] < 3
+
+
+class RecordingSession:
+    """Captures the SQL a maintenance helper runs"""
+
+    def __init__(self):
+        self.statements = []
+
+    def execute(self, statement, params=None):
+        self.statements.append(str(statement))
+
+    def commit(self):
+        pass
+
+
+class TestListingPartitions:
+    """Test weekly listings partition maintenance"""
+
+    def test_partition_names_round_trip(self):
+        start = week_start(date(2026, 10, 16))
+
+        assert start == date(2026, 10, 12)
+        assert partition_name(start) == "listings_recent_p20261012"
+        assert partition_start("listings_recent_p20261012") == start
+        assert partition_start("listings_saved") is None
+
+    def test_ensure_creates_missing_future_weeks(self, monkeypatch):
+        monkeypatch.setattr(partitions, "list_partitions", lambda db: ["listings_recent_p20261012"])
+        db = RecordingSession()
+
+        created = partitions.ensure_partitions(db, date(2026, 10, 16), weeks_ahead=2)
+
+        assert created == ["listings_recent_p20261019", "listings_recent_p20261026"]
+        assert db.statements[0] == (
+            "CREATE TABLE IF NOT EXISTS listings_recent_p20261019 PARTITION OF listings_recent "
+            "FOR VALUES FROM ('2026-10-19') TO ('2026-10-26')"
+        )
+
+    def test_drops_only_fully_expired_weeks(self, monkeypatch):
+        """A partition goes once its whole week is past the cutoff, keys included"""
+        monkeypatch.setattr(partitions, "list_partitions", lambda db: [
+            "listings_recent_p20260907", "listings_recent_p20260914", "listings_recent_p20260921"
+        ])
+        db = RecordingSession()
+
+        dropped = partitions.drop_partitions_before(db, date(2026, 9, 24))
+
+        assert dropped == ["listings_recent_p20260907", "listings_recent_p20260914"]
+        assert db.statements[:4] == [
+            "ALTER TABLE listings_recent DETACH PARTITION listings_recent_p20260907",
+            "DELETE FROM listing_keys k USING listings_recent_p20260907 p "
+            "WHERE k.marketplace = p.marketplace AND k.external_id = p.external_id",
+            "DELETE FROM search_listings s USING listings_recent_p20260907 p WHERE s.listing_id = p.id",
+            "DROP TABLE listings_recent_p20260907",
+        ]
+
+    @pytest.fixture
+    def keys_table(self, db):
+        listing_keys.create(bind=db.get_bind(), checkfirst=True)
+        yield
+        listing_keys.drop(bind=db.get_bind())
+
+    def test_partitioned_retention_leaves_longest_window_to_partitions(self, monkeypatch, db, keys_table):
+        """Row deletes only cover shorter tier windows, and free the uniqueness keys"""
+        monkeypatch.setattr(scraping.settings, "LISTINGS_PARTITIONED", True)
+        monkeypatch.setattr(scraping.settings, "LISTING_RETENTION_DAYS_BY_TIER", "free:7")
+        retention = TestRetention()
+        retention.add_listings(db, SubscriptionTier.FREE, [10])
+        retention.add_listings(db, SubscriptionTier.PRO, [40])
+        db.execute(listing_keys.insert().values([
+            {"marketplace": "EBAY", "external_id": "free-0"},
+            {"marketplace": "EBAY", "external_id": "pro-0"},
+        ]))
+        db.commit()
+
+        result = purge_expired_listings(db, now=retention.now, pause=0)
+
+        assert result.deleted == {"free": 1}
+        assert retention.remaining(db) == ["pro-0"]
+        assert [key.external_id for key in db.execute(listing_keys.select())] == ["pro-0"]
+
+
+class FailingCommitSession:
+    """Session whose commit fails, like a flush worker dying mid-batch"""
+
+    def __init__(self, db):
+        self.db = db
+
+    def __getattr__(self, name):
+        return getattr(self.db, name)
+
+    def commit(self):
+        raise RuntimeError("worker lost")
+
+
+class UnavailableStreamRedis(FakeRedis):
+    def xadd(self, *args, **kwargs):
+        raise RedisError("connection refused")
+
+
+class TestTaskLogSink:
+    """Test buffered TaskLog writes"""
+
+    @pytest.fixture
+    def sink(self, monkeypatch):
+        monkeypatch.setattr(scraping.settings, "TASK_LOG_SINK", "redis")
+        return TaskLogSink(redis=StreamRedis())
+
+    def test_transitions_are_written_in_one_batch(self, db, sink):
+        """A task's start and finish are buffered, then stored as one row"""
+        sink.record(db, "run-1", "run_search_task", status="running", search_id=3, started_at=datetime(2026, 1, 1))
+        sink.record(
+            db, "run-1", "run_search_task",
+            status="failed", completed_at=datetime(2026, 1, 1, 0, 1), error="boom"
+        )
+        sink.record(db, "run-2", "run_search_task", status="running", search_id=4)
+
+        assert db.query(TaskLog).count() == 0
+        assert sink.flush(db) == 3
+
+        logs = {log.task_id: log for log in db.query(TaskLog)}
+        assert logs["run-1"].status == "failed"
+        assert logs["run-1"].search_id == 3
+        assert logs["run-1"].error == "boom"
+        assert logs["run-2"].status == "running"
+        assert sink.backlog() == 0
+
+    def test_finished_task_is_not_reopened(self, db, sink):
+        sink.record(db, "run-1", "run_search_task", status="success", completed_at=datetime(2026, 1, 1, 0, 1))
+        sink.flush(db)
+        sink.record(db, "run-1", "run_search_task", status="running", started_at=datetime(2026, 1, 1))
+        sink.flush(db)
+
+        assert db.query(TaskLog).one().status == "success"
+
+    def test_entries_of_a_crashed_flush_are_retried(self, db, sink):
+        """Entries stay in the stream until written; another flush takes them over once idle"""
+        sink.record(db, "run-1", "run_search_task", status="failed", error="boom")
+
+        with pytest.raises(RuntimeError):
+            sink.flush(FailingCommitSession(db))
+        assert sink.flush(db, claim_idle=60) == 0
+
+        sink.redis.idle_ms = 60_000
+        assert sink.flush(db, claim_idle=60) == 1
+        assert db.query(TaskLog).one().status == "failed"
+
+    def test_writes_directly_without_redis(self, monkeypatch, db):
+        monkeypatch.setattr(scraping.settings, "TASK_LOG_SINK", "redis")
+        sink = TaskLogSink(redis=UnavailableStreamRedis())
+
+        sink.record(db, "run-1", "run_search_task", status="running", search_id=3)
+
+        assert db.query(TaskLog).one().status == "running"
+
+
+class TestTaskLogRollups:
+    """Test hourly TaskLog rollups and raw log pruning"""
+
+    now = datetime(2026, 3, 10, 12, 30)
+
+    def add_run(self, db, task_id, created_at, seconds, status="success", result=None):
+        db.add(TaskLog(
+            task_id=task_id,
+            task_name="run_search_task",
+            status=status,
+            result=result,
+            started_at=created_at,
+            completed_at=created_at + timedelta(seconds=seconds) if seconds is not None else None,
+            created_at=created_at
+        ))
+        db.commit()
+
+    def rollups(self, db):
+        return {
+            (rollup.hour, rollup.marketplace): rollup
+            for rollup in db.query(TaskLogRollup)
+        }
+
+    def test_runs_are_summarized_per_hour_and_marketplace(self, db):
+        hour = datetime(2026, 3, 10, 12)
+        for i, seconds in enumerate([10, 20, 30, 40]):
+            self.add_run(db, f"run-{i}", hour + timedelta(minutes=i), seconds, result={
+                "total_listings": 3,
+                "failed_marketplaces": ["ebay"] if i == 0 else [],
+                "listings_by_marketplace": {"ebay": 1, "gumtree": 2}
+            })
+        self.add_run(db, "run-failed", hour + timedelta(minutes=5), 50, status="failed")
+        self.add_run(db, "run-older", hour - timedelta(minutes=1), 5)
+
+        assert update_task_log_rollups(db, now=self.now) == 2
+
+        rollups = self.rollups(db)
+        total = rollups[(hour, "all")]
+        assert (total.runs, total.failures, total.listings_found) == (5, 1, 12)
+        assert (total.duration_p50, total.duration_p95) == (30, 50)
+        assert (rollups[(hour, "ebay")].runs, rollups[(hour, "ebay")].failures) == (4, 1)
+        assert rollups[(hour, "gumtree")].listings_found == 8
+        assert rollups[(hour - timedelta(hours=1), "all")].runs == 1
+
+    def test_late_finishing_runs_are_recounted(self, db):
+        self.add_run(db, "run-1", datetime(2026, 3, 10, 11, 50), None, status="running")
+        update_task_log_rollups(db, now=self.now)
+
+        log = db.query(TaskLog).one()
+        log.status = "failed"
+        log.completed_at = datetime(2026, 3, 10, 12, 5)
+        db.commit()
+        update_task_log_rollups(db, now=self.now)
+
+        rollup = self.rollups(db)[(datetime(2026, 3, 10, 11), "all")]
+        assert (rollup.runs, rollup.failures, rollup.duration_p50) == (1, 1, 900)
+        assert failed_tasks_since(db, self.now - timedelta(hours=1)) == 1
+
+    def test_failed_tasks_count_exactly_the_window(self, db):
+        """Whole rolled-up hours come from rollups, the rest from raw logs"""
+        for task_id, minutes in [("too-old", 90), ("rolled-up", 45), ("this-hour", 20)]:
+            self.add_run(db, task_id, self.now - timedelta(minutes=minutes), 5, status="failed")
+        update_task_log_rollups(db, now=self.now)
+        self.add_run(db, "not-rolled-up", self.now - timedelta(minutes=5), 5, status="failed")
+
+        assert failed_tasks_since(db, self.now - timedelta(hours=1)) == 3
+        assert failed_tasks_since(db, self.now - timedelta(hours=3)) == 4
+
+    def test_only_summarized_logs_are_pruned(self, db):
+        self.add_run(db, "run-old", self.now - timedelta(days=8), 10)
+        self.add_run(db, "run-new", self.now - timedelta(days=1), 10)
+
+        assert prune_task_logs(db, now=self.now, keep_days=7) == 0
+
+        update_task_log_rollups(db, now=self.now)
+        assert prune_task_logs(db, now=self.now, keep_days=7) == 1
+        assert [log.task_id for log in db.query(TaskLog)] == ["run-new"]
+        assert self.rollups(db)[(datetime(2026, 3, 2, 12), "all")].runs == 1